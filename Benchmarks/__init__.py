@@ -0,0 +1,2 @@
+from .suite import BENCHMARKS, run_benchmarks
+from .report import save_results, load_results, compare_results, print_results
@@ -0,0 +1,68 @@
+import json
+import platform
+import subprocess
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .suite import Results
+
+# (name, baseline value, current value, relative change, regressed)
+Comparison = Tuple[str, float, float, float, bool]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def save_results(path: str, results: Results) -> None:
+    """Writes the results, with the machine and revision they were measured on, as JSON"""
+    report = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.platform(),
+        },
+        'results': results,
+    }
+    with open(path, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+
+
+def load_results(path: str) -> Results:
+    with open(path, 'r') as report_file:
+        return json.load(report_file)['results']
+
+
+def compare_results(baseline: Results, results: Results, threshold: float) -> List[Comparison]:
+    """
+    Compares the results measured by both runs. A benchmark regressed when it got worse than the baseline
+    by more than threshold, relative to the baseline (e.g. 0.1 for 10% fewer ticks/s or 10% more seconds)
+    """
+    comparisons = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old, new = baseline[name]['value'], result['value']
+        change = (new - old) / old
+        worse = -change if result['higher_is_better'] else change
+        comparisons.append((name, old, new, change, worse > threshold))
+    return comparisons
+
+
+def print_results(results: Results, comparisons: List[Comparison] = ()) -> None:
+    changes: Dict[str, Comparison] = {comparison[0]: comparison for comparison in comparisons}
+    width = max(len(name) for name in results)
+    for name, result in results.items():
+        line = f"{name:<{width}}  {result['value']:>14.6g} {result['unit']:<11}"
+        if name in changes:
+            _, old, _, change, regressed = changes[name]
+            line += f" {change:+8.1%} vs {old:.6g}{'  REGRESSION' if regressed else ''}"
+        print(line)
@@ -0,0 +1,214 @@
+import contextlib
+import functools
+import io
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from Reinf_Learn import Environment, Q_Learn, DenseQLearn
+from Reinf_Learn.utils import ALPHA, EPSILON, GAMMA, store_q_data, retrieve_q_data, run_training_session
+from Reinf_Learn.serving import load_served_policy
+from TrafficSimulator import two_way_intersection_setup, grid_network_setup, VehicleEngine
+
+# {benchmark name: {'value': measurement, 'unit': unit, 'higher_is_better': bool}}
+Results = Dict[str, Dict]
+
+VEHICLE_RATES = [10, 35, 70]  # Vehicles per minute, from sparse to saturated demand
+LEGACY_MODEL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model_10000.dat')
+
+
+def _best_time(function: Callable[[], None], repeat: int) -> float:
+    """Returns the fastest of repeat runs, in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def _rate(value: float, unit: str) -> Dict:
+    return {'value': value, 'unit': unit, 'higher_is_better': True}
+
+
+def _duration(value: float) -> Dict:
+    return {'value': value, 'unit': 's', 'higher_is_better': False}
+
+
+def bench_simulation_update(quick: bool) -> Results:
+    """Simulation.update() ticks per second, on a warmed-up map at several vehicle densities"""
+    n_ticks = 300 if quick else 1800
+    results = {}
+    for vehicle_rate in VEHICLE_RATES:
+        for engine in (False, True):
+            np.random.seed(0)
+            sim = two_way_intersection_setup(engine=VehicleEngine() if engine else None, vehicle_rate=vehicle_rate)
+            for tick in range(1800):
+                if tick % 180 == 0:
+                    sim._update_signals()
+                sim.update()
+            warm_state = sim.snapshot()
+
+            def run():
+                sim.restore(warm_state)
+                for _ in range(n_ticks):
+                    sim.update()
+
+            name = f"simulation.update[rate={vehicle_rate}{',engine' if engine else ''}]"
+            results[name] = _rate(n_ticks / _best_time(run, 3), 'ticks/s')
+    return results
+
+
+def bench_environment_step(quick: bool) -> Results:
+    """Environment.perform_step() control steps per second, with random actions, with and without the vehicle
+    engine"""
+    n_steps = 30 if quick else 200
+    results = {}
+    for vectorized in (False, True):
+        env = Environment(vectorized=vectorized)
+
+        def run():
+            np.random.seed(0)
+            rng = random.Random(0)
+            env.restart_environment()
+            for _ in range(n_steps):
+                _, _, done, _ = env.perform_step(rng.choice(env.action_space))
+                if done:
+                    env.restart_environment()
+
+        name = f"environment.perform_step{'[engine]' if vectorized else ''}"
+        results[name] = _rate(n_steps / _best_time(run, 3), 'steps/s')
+    return results
+
+
+def bench_training(quick: bool) -> Results:
+    """run_training_session() episodes per second"""
+    n_episodes = 2 if quick else 10
+    env = Environment()
+    with tempfile.TemporaryDirectory() as directory:
+        def run():
+            np.random.seed(0)
+            model = Q_Learn(ALPHA, EPSILON, GAMMA, env.action_space, rng=np.random.default_rng(0))
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_training_session(model, env, os.path.join(directory, 'model.qtb'), n_episodes)
+
+        episodes_per_second = n_episodes / _best_time(run, 1 if quick else 2)
+    return {'training.episodes': _rate(episodes_per_second, 'episodes/s')}
+
+
+def bench_grid(quick: bool) -> Results:
+    """Grid network build time, Simulation.update() ticks per second and Environment.perform_step() steps
+    per second, with one random action per signal, as the number of signals grows"""
+    sizes = [2, 5] if quick else [2, 5, 10]
+    n_ticks = 100 if quick else 600
+    n_steps = 5 if quick else 20
+    results = {}
+    for size in sizes:
+        grid = f'{size}x{size}'
+        results[f'grid.build[{grid}]'] = _duration(_best_time(lambda: grid_network_setup(size, size), 1))
+
+        for engine in (False, True):
+            np.random.seed(0)
+            sim = grid_network_setup(size, size, engine=VehicleEngine() if engine else None)
+            for _ in range(1800):
+                sim.update()
+            warm_state = sim.snapshot()
+
+            def run():
+                sim.restore(warm_state)
+                for _ in range(n_ticks):
+                    sim.update()
+
+            name = f"grid.update[{grid}{',engine' if engine else ''}]"
+            results[name] = _rate(n_ticks / _best_time(run, 3), 'ticks/s')
+
+        env = Environment(engine=VehicleEngine(), network=functools.partial(grid_network_setup, size, size))
+
+        def run_environment():
+            np.random.seed(0)
+            rng = np.random.default_rng(0)
+            env.restart_environment()
+            for _ in range(n_steps):
+                _, _, done, _ = env.perform_step(rng.integers(0, 2, env.n_signals))
+                if done:
+                    env.restart_environment()
+
+        results[f'grid.perform_step[{grid}]'] = _rate(n_steps / _best_time(run_environment, 1), 'steps/s')
+    return results
+
+
+def _sample_transitions(n: int) -> List:
+    """Random (state, action, next state, reward) transitions over the Environment observation space"""
+    rng = random.Random(0)
+
+    def state():
+        return rng.random() < 0.5, rng.randrange(20), rng.randrange(20), rng.random() < 0.5
+
+    return [(state(), rng.randrange(2), state(), rng.uniform(-1, 1)) for _ in range(n)]
+
+
+def bench_q_learning(quick: bool) -> Results:
+    """learn() and select_action() calls per second, for the dict and dense Q-tables"""
+    transitions = _sample_transitions(5000 if quick else 50000)
+    results = {}
+    for name, model_class in (('q_learn', Q_Learn), ('dense_q_learn', DenseQLearn)):
+        model = model_class(ALPHA, EPSILON, GAMMA, [0, 1], rng=np.random.default_rng(0))
+
+        def learn():
+            for state, action, next_state, reward in transitions:
+                model.learn(state, action, next_state, reward)
+
+        def select():
+            for state, _, _, _ in transitions:
+                model.select_action(state)
+
+        results[f'{name}.learn'] = _rate(len(transitions) / _best_time(learn, 3), 'calls/s')
+        results[f'{name}.select_action'] = _rate(len(transitions) / _best_time(select, 3), 'calls/s')
+    return results
+
+
+def bench_model_io(quick: bool) -> Results:
+    """store_q_data(), retrieve_q_data() and load_served_policy() (memory-mapped greedy policy) duration, for
+    the shipped model"""
+    if os.path.exists(LEGACY_MODEL):
+        q_data = retrieve_q_data(LEGACY_MODEL)
+    else:
+        model = Q_Learn(ALPHA, EPSILON, GAMMA, [0, 1])
+        for state, action, next_state, reward in _sample_transitions(5000):
+            model.learn(state, action, next_state, reward)
+        q_data = model.q_data
+
+    repeat = 3 if quick else 10
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'model.qtb')
+        results = {
+            'model.store': _duration(_best_time(lambda: store_q_data(path, q_data), repeat)),
+            'model.retrieve': _duration(_best_time(lambda: retrieve_q_data(path), repeat)),
+            'model.load_policy': _duration(_best_time(lambda: load_served_policy(path), repeat)),
+        }
+    if os.path.exists(LEGACY_MODEL):
+        results['model.retrieve_legacy'] = _duration(_best_time(lambda: retrieve_q_data(LEGACY_MODEL), repeat))
+    return results
+
+
+BENCHMARKS: Dict[str, Callable[[bool], Results]] = {
+    'simulation': bench_simulation_update,
+    'environment': bench_environment_step,
+    'grid': bench_grid,
+    'training': bench_training,
+    'q_learning': bench_q_learning,
+    'model_io': bench_model_io,
+}
+
+
+def run_benchmarks(names: List[str] = None, quick: bool = False) -> Results:
+    """Runs the given benchmark groups (all of them by default) and returns their results"""
+    results = {}
+    for name in names or BENCHMARKS:
+        print(f"Running {name} benchmarks...")
+        results.update(BENCHMARKS[name](quick))
+    return results
@@ -1,15 +1,51 @@
-import random
+from typing import Iterator, Optional
+
+import numpy as np
+
+from TrafficSimulator.instrumentation import hot_path
+
+UNIFORM_BLOCK_SIZE = 1024
+
 
 class Q_Learn:
     """Implementation of Q-learning reinforcement algorithm"""
     
-    def __init__(self, learning_parameter, exploration_parameter, discount_parameter, action_space):
+    def __init__(self, learning_parameter, exploration_parameter, discount_parameter, action_space,
+                 rng: Optional[np.random.Generator] = None):
+        """
+        :param rng: generator of the exploration and tie-breaking draws, e.g. an RngContext stream. None for a
+        generator seeded from fresh entropy
+        """
         self.alpha = float(learning_parameter)
         self.epsilon = float(exploration_parameter)
         self.gamma = float(discount_parameter)
         self.actions = action_space
+        self.rng = rng if rng is not None else np.random.default_rng()
         self.q_data = {}
 
+    def __len__(self) -> int:
+        """Number of learned state-action pairs"""
+        return len(self.q_data)
+
+    @property
+    def rng(self) -> np.random.Generator:
+        return self._rng
+
+    @rng.setter
+    def rng(self, rng: np.random.Generator) -> None:
+        self._rng = rng
+        self._uniforms: Iterator[float] = iter(())  # Uniform draws, generated in blocks as single draws are slower
+
+    def _uniform(self) -> float:
+        try:
+            return next(self._uniforms)
+        except StopIteration:
+            self._uniforms = iter(self._rng.random(UNIFORM_BLOCK_SIZE).tolist())
+            return next(self._uniforms)
+
+    def _random_choice(self, options):
+        return options[int(self._uniform() * len(options))]
+
     def get_action_value(self, state, action):
         """Retrieves Q-value for state-action pair"""
         if (state, action) not in self.q_data:
@@ -21,9 +57,7 @@ class Q_Learn:
         if not self.actions:
             return 0.0
             
-        action_values = [self.get_action_value(state, act) for act in self.actions]
-        random.shuffle(action_values)  # Prevent bias for equal values
-        return max(action_values) if action_values else 0.0
+        return max(self.get_action_value(state, act) for act in self.actions)
 
     def determine_optimal_action(self, state):
         """Identifies best action according to current policy"""
@@ -36,20 +70,22 @@ class Q_Learn:
         
         # Select randomly among equally optimal actions
         best_actions = [act for act, val in action_value_pairs if val == max_value]
-        return random.choice(best_actions)
+        return self._random_choice(best_actions)
 
+    @hot_path('q_learn.select_action')
     def select_action(self, state):
         """Chooses action using epsilon-greedy strategy"""
         if not self.actions:
             return None
             
         # Exploration case
-        if random.random() < self.epsilon:
-            return random.choice(self.actions)
+        if self._uniform() < self.epsilon:
+            return self._random_choice(self.actions)
         # Exploitation case
         else:
             return self.determine_optimal_action(state)
 
+    @hot_path('q_learn.learn')
     def learn(self, state, action, next_state, reward):
         """Updates Q-values using temporal difference learning"""
         current_q = self.get_action_value(state, action)
@@ -60,4 +96,27 @@ class Q_Learn:
             reward + self.gamma * best_future_value
         )
         
-        self.q_data[(state, action)] = new_q
\ No newline at end of file
+        self.q_data[(state, action)] = new_q
+
+    @hot_path('q_learn.learn_batch')
+    def learn_batch(self, states, actions, next_states, rewards, dones=None, weights=None):
+        """
+        Applies a minibatch of temporal difference updates, and returns their TD errors.
+        The targets bootstrap from the values before the batch, so the order of the transitions doesn't matter.
+        Updates of the same state-action pair move it towards their mean target, as much as that many successive
+        updates towards the same target would. Terminal transitions (dones) aren't bootstrapped, weights scale
+        each update (importance sampling). DenseQLearn.learn_batch() implements the same update in vectorized form
+        """
+        td_errors = np.zeros(len(states))
+        pair_steps = {}  # {(state, action): [sum of the update steps, number of updates]}
+        for i, (state, action, next_state, reward) in enumerate(zip(states, actions, next_states, rewards)):
+            best_future_value = 0.0 if dones is not None and dones[i] else self.compute_state_value(next_state)
+            td_errors[i] = reward + self.gamma * best_future_value - self.get_action_value(state, action)
+            steps = pair_steps.setdefault((state, action), [0.0, 0])
+            steps[0] += td_errors[i] if weights is None else td_errors[i] * weights[i]
+            steps[1] += 1
+
+        # Q-learning update rule: Q(s,a) = (1-α)*Q(s,a) + α*(r + γ*max_Q(s',a')), for the distinct pairs
+        for pair, (step_sum, count) in pair_steps.items():
+            self.q_data[pair] = self.get_action_value(*pair) + (1 - (1 - self.alpha) ** count) * step_sum / count
+        return td_errors
\ No newline at end of file
@@ -1,3 +1,8 @@
 from .environment import Environment
 from .Q_Learn import Q_Learn
+from .dense_q import DenseQLearn
+from .multi_agent import IndependentQLearners
+from .replay import ReplayBuffer
+from .policy import FrozenPolicy, compile_policy, load_policy
+from .vector_env import VectorEnv
 from .utils import launch_q_learning_simulation
@@ -0,0 +1,189 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .Q_Learn import Q_Learn
+from TrafficSimulator.instrumentation import hot_path
+
+
+class StateEncoder:
+    """Bounded mapping of observation tuples to dense integer indices, in order of first appearance"""
+
+    def __init__(self, capacity: int):
+        self.capacity: int = capacity
+        self._indexes: Dict[Tuple, int] = {}
+        self._states: List[Tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    @property
+    def states(self) -> List[Tuple]:
+        """Encoded states, by index"""
+        return self._states
+
+    def encode(self, state: Tuple) -> int:
+        """Returns the state index, assigning the next free index to new states"""
+        index = self._indexes.get(state)
+        if index is None:
+            if len(self._states) == self.capacity:
+                raise OverflowError(f"State encoder is full ({self.capacity} states)")
+            index = len(self._states)
+            self._indexes[state] = index
+            self._states.append(state)
+        return index
+
+    def lookup(self, state: Tuple) -> Optional[int]:
+        """Returns the state index, None for states that were never encoded"""
+        return self._indexes.get(state)
+
+    def decode(self, index: int) -> Tuple:
+        return self._states[index]
+
+
+class DenseQLearn(Q_Learn):
+    """
+    Q-learning with the Q-values stored in a preallocated (n_states, n_actions) array.
+    States are mapped to rows by a bounded StateEncoder, and every row's maximum value, best action and
+    number of tied best actions are maintained incrementally as the values change, so action selection
+    and state values don't scan the actions. Same public API as Q_Learn.
+    """
+
+    def __init__(self, learning_parameter, exploration_parameter, discount_parameter, action_space,
+                 n_states: int = 1 << 14, rng: Optional[np.random.Generator] = None):
+        self.encoder = StateEncoder(n_states)
+        self.values = np.zeros((n_states, len(action_space)))
+        self._visited = np.zeros((n_states, len(action_space)), dtype=bool)
+        self._best_value = np.zeros(n_states)
+        self._best_action = np.zeros(n_states, dtype=np.int64)
+        self._n_best = np.full(n_states, len(action_space), dtype=np.int64)
+        self._action_indexes: Dict = {action: i for i, action in enumerate(action_space)}
+        super().__init__(learning_parameter, exploration_parameter, discount_parameter, action_space, rng)
+
+    def __len__(self) -> int:
+        """Number of learned state-action pairs, without building q_data"""
+        return int(np.count_nonzero(self._visited))
+
+    @property
+    def q_data(self) -> Dict:
+        """Q-values of the learned state-action pairs, in the Q_Learn dict layout"""
+        states, actions = np.nonzero(self._visited[:len(self.encoder)])
+        return {(self.encoder.decode(s), self.actions[a]): self.values[s, a].item()
+                for s, a in zip(states.tolist(), actions.tolist())}
+
+    @q_data.setter
+    def q_data(self, q_data: Dict) -> None:
+        self.encoder = StateEncoder(self.encoder.capacity)
+        self.values[:] = 0
+        self._visited[:] = False
+        for (state, action), value in q_data.items():
+            s, a = self.encoder.encode(state), self._action_indexes[action]
+            self.values[s, a] = value
+            self._visited[s, a] = True
+        for s in range(len(self.encoder)):
+            self._refresh_best(s)
+        self._best_value[len(self.encoder):] = 0
+        self._best_action[len(self.encoder):] = 0
+        self._n_best[len(self.encoder):] = len(self.actions)
+
+    def get_action_value(self, state, action):
+        """Retrieves Q-value for state-action pair"""
+        s = self.encoder.lookup(state)
+        if s is None:
+            return 0.0
+        return self.values.item(s, self._action_indexes[action])
+
+    def compute_state_value(self, state):
+        """Calculates maximum value across possible actions in state"""
+        s = self.encoder.lookup(state)
+        if s is None or not self.actions:
+            return 0.0
+        return self._best_value.item(s)
+
+    def determine_optimal_action(self, state):
+        """Identifies best action according to current policy"""
+        if not self.actions:
+            return None
+        s = self.encoder.lookup(state)
+        if s is None:
+            return self._random_choice(self.actions)
+        if self._n_best[s] == 1:
+            return self.actions[self._best_action[s]]
+
+        # Select randomly among equally optimal actions
+        best_actions = np.flatnonzero(self.values[s] == self._best_value[s])
+        return self.actions[self._random_choice(best_actions.tolist())]
+
+    @hot_path('q_learn.learn')
+    def learn(self, state, action, next_state, reward):
+        """Updates Q-values using temporal difference learning"""
+        s, a = self.encoder.encode(state), self._action_indexes[action]
+        current_q = self.values.item(s, a)
+        best_future_value = self.compute_state_value(next_state)
+
+        # Q-learning update rule: Q(s,a) = (1-α)*Q(s,a) + α*(r + γ*max_Q(s',a'))
+        new_q = (1 - self.alpha) * current_q + self.alpha * (
+            reward + self.gamma * best_future_value
+        )
+
+        self._set_value(s, a, new_q)
+
+    @hot_path('q_learn.learn_batch')
+    def learn_batch(self, states, actions, next_states, rewards, dones=None, weights=None):
+        """
+        Applies a minibatch of temporal difference updates in vectorized form, and returns their TD errors.
+        Same update as Q_Learn.learn_batch()
+        """
+        s = np.array([self.encoder.encode(state) for state in states], dtype=np.int64)
+        next_s = np.array([self.encoder.encode(state) for state in next_states], dtype=np.int64)
+        return self.learn_encoded(s, actions, next_s, rewards, dones, weights)
+
+    def learn_encoded(self, s: np.ndarray, actions, next_s: np.ndarray, rewards, dones=None,
+                      weights=None) -> np.ndarray:
+        """learn_batch() with the states already encoded by this model's encoder"""
+        a = np.array([self._action_indexes[action] for action in actions], dtype=np.int64)
+        best_future_values = self._best_value[next_s]
+        if dones is not None:
+            best_future_values = np.where(dones, 0.0, best_future_values)
+        td_errors = np.asarray(rewards, dtype=float) + self.gamma * best_future_values - self.values[s, a]
+
+        # Q-learning update rule: Q(s,a) = (1-α)*Q(s,a) + α*(r + γ*max_Q(s',a')), for the distinct pairs
+        steps = td_errors if weights is None else td_errors * weights
+        flat_indexes, inverse, counts = np.unique(s * len(self.actions) + a, return_inverse=True,
+                                                  return_counts=True)
+        mean_steps = np.bincount(inverse, weights=steps) / counts
+        self.values.flat[flat_indexes] += (1 - (1 - self.alpha) ** counts) * mean_steps
+        self._visited.flat[flat_indexes] = True
+
+        # Best values, best actions and number of best actions of the updated rows
+        row_values = self.values[s]
+        self._best_value[s] = row_values.max(axis=1)
+        self._best_action[s] = row_values.argmax(axis=1)
+        self._n_best[s] = np.count_nonzero(row_values == self._best_value[s, None], axis=1)
+        return td_errors
+
+    def _set_value(self, s: int, a: int, value: float) -> None:
+        """Sets a Q-value and updates the row's best value, best action and number of best actions"""
+        old_value = self.values.item(s, a)
+        best_value = self._best_value.item(s)
+        self.values[s, a] = value
+        self._visited[s, a] = True
+
+        if value > best_value:
+            self._best_value[s], self._best_action[s], self._n_best[s] = value, a, 1
+        elif old_value < best_value:
+            if value == best_value:
+                self._n_best[s] += 1
+        elif value < best_value:
+            # A best action's value decreased
+            if self._n_best[s] > 1 and self._best_action[s] != a:
+                self._n_best[s] -= 1
+            else:
+                self._refresh_best(s)
+
+    def _refresh_best(self, s: int) -> None:
+        row = self.values[s]
+        best_value = row.max()
+        self._best_value[s] = best_value
+        self._best_action[s] = row.argmax()
+        self._n_best[s] = np.count_nonzero(row == best_value)
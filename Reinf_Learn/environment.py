@@ -1,4 +1,6 @@
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
 import sys
 import os
 current_dir = os.path.dirname(os.path.abspath(__file__)) 
@@ -8,25 +10,59 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
     
 from TrafficSimulator.two_way_intersection import two_way_intersection_setup 
+from TrafficSimulator.vehicle_engine import VehicleEngine
+from TrafficSimulator.instrumentation import hot_path
+from TrafficSimulator.rng import RngContext, generator_of
 
 
 class Environment:
-    def __init__(self):
-        self.action_space: List = [0, 1]
+    def __init__(self, vectorized: bool = False, engine: Optional[VehicleEngine] = None,
+                 max_dt: Optional[float] = None, render_fps: Optional[float] = None,
+                 network: Callable = two_way_intersection_setup, max_gen: int = 50,
+                 rng: Optional[RngContext] = None):
+        """
+        :param network: builds the simulation, called with (max_gen, engine, max_dt, rng=arrivals generator),
+        e.g. a functools.partial of grid_network_setup. With several traffic signals, the observations are
+        tuples of per-signal observations, and the actions are joint actions with one action per signal
+        :param rng: random streams of the environment, the vehicle arrivals being drawn from its 'traffic'
+        stream. None to draw them from the global numpy random state
+        """
+        self.action_space: List = [0, 1]  # Actions of each traffic signal
         self.sim = None
-        self.max_gen: int = 50
+        self.network: Callable = network
+        self.max_gen: int = max_gen
+        self.rng: Optional[RngContext] = rng
+        self.vectorized: bool = vectorized or engine is not None  # Whether to use the batched vehicle engine
+        self._shared_engine: Optional[VehicleEngine] = engine  # Engine shared with other environments
+        self.max_dt: Optional[float] = max_dt  # Adaptive time-stepping limit, None for fixed time steps
+        self.render_fps: Optional[float] = render_fps  # Renderer process frame rate cap, None to draw every update
+        self._past_ticks: int = 0  # Simulation updates computed in the previous episodes
         self._last_state_vehicle_count: int = 0 
-
+        # Per-signal rewards of the last step on multi-signal networks, each signal's own congestion change
+        self.signal_rewards: Optional[np.ndarray] = None
+        self._last_signal_vehicle_counts = 0
+        self.trip_listener = None  # Passed to the simulation, called with each vehicle completing its journey
+        # Headless recording of the episodes: output directory (None to not record), updates between frames
+        # and frame format, see Simulation.start_recording()
+        self.record_dir: Optional[str] = None
+        self.record_every: int = 10
+        self.record_format: str = 'png'
+
+    @hot_path('environment.step')
     def perform_step(self, control_signal) -> Tuple[Tuple, float, bool, bool]:
         """Processes one control interval in the simulation."""
         self.sim.run(control_signal)
+        return self.complete_step()
 
+    def complete_step(self) -> Tuple[Tuple, float, bool, bool]:
+        """Builds the step results once the simulation ran the control interval."""
         current_state: Tuple = self._capture_environment_state()
         performance_score: float = self._determine_performance(current_state)
 
         # Update vehicle count cache for next reward calculation
-        n_west_east_vehicles, n_south_north_vehicles = current_state[1], current_state[2]
-        self._last_state_vehicle_count = n_west_east_vehicles + n_south_north_vehicles
+        self._last_state_vehicle_count = self._queued_vehicles(current_state)
+        if isinstance(current_state[0], tuple):
+            self.signal_rewards = self._determine_signal_performance(current_state)
 
         # Whether a terminal state is reached
         simulation_ended: bool = self.sim.completed
@@ -37,37 +73,38 @@ class Environment:
         return current_state, performance_score, simulation_ended, visualization_terminated
 
     
+    @hot_path('environment.observation')
     def _capture_environment_state(self) -> Tuple:
         """
         Captures current intersection status:
         (signal_state, lane_a_count, lane_b_count, internal_traffic_present)
+        or a tuple of those, one per traffic signal, if the network has several.
+        Read from the simulation vehicle counters, its cost doesn't depend on the number of roads
         """
-        state = []
-        for traffic_signal in self.sim.traffic_signals:
-            junction = []
-            traffic_signal_state = traffic_signal.current_cycle[0]
-            junction.append(traffic_signal_state)
+        n_signals = len(self.sim.traffic_signals)
+        if n_signals == 1:
+            return self._capture_signal_state(0)
+        return tuple(self._capture_signal_state(i) for i in range(n_signals))
 
-            for direction in traffic_signal.roads:
-                junction.append(sum(len(road.vehicles) for road in direction))
+    def _capture_signal_state(self, signal_index: int) -> Tuple:
+        traffic_signal_state = self.sim.traffic_signals[signal_index].current_cycle[0]
+        n_direction_1_vehicles, n_direction_2_vehicles = self.sim.signal_vehicle_counts(signal_index)
+        non_empty_junction = bool(self.sim.junction_vehicle_count(signal_index))
+        return traffic_signal_state, n_direction_1_vehicles, n_direction_2_vehicles, non_empty_junction
 
-            n_direction_1_vehicles, n_direction_2_vehicles = junction[1], junction[2]
-            out_bound_vehicles = sum(len(self.sim.roads[i].vehicles) for i in self.sim.outbound_roads)
-            non_empty_junction = bool(self.sim.n_vehicles_on_map - out_bound_vehicles -
-                                      n_direction_1_vehicles - n_direction_2_vehicles)
-            junction.append(non_empty_junction)
-            state.append(junction)
-        state = state[0]  # Optimization for a single junction simulation setup
-        return tuple(state)
+    @staticmethod
+    def _queued_vehicles(state_observation: Tuple) -> int:
+        """Number of vehicles on the signal roads, over every signal of a multi-signal observation"""
+        if isinstance(state_observation[0], tuple):
+            return sum(signal_state[1] + signal_state[2] for signal_state in state_observation)
+        return state_observation[1] + state_observation[2]
 
 
     def _determine_performance(self, state_observation: Tuple) -> float:
         """
         reward: penalizes congestion at each step.
         """
-        _, n_direction_1_vehicles, n_direction_2_vehicles, _= state_observation
-
-        current_vehicle_count = n_direction_1_vehicles + n_direction_2_vehicles
+        current_vehicle_count = self._queued_vehicles(state_observation)
 
         prev_count = max(1, self._last_state_vehicle_count)
         reward = (prev_count - current_vehicle_count) / prev_count
@@ -76,15 +113,53 @@ class Environment:
 
 
 
-    def restart_environment(self, enable_display: bool = False) -> Tuple:
-        """Resets traffic simulation and returns initial conditions."""
-        self.sim = two_way_intersection_setup(self.max_gen)
+    def _determine_signal_performance(self, state_observation: Tuple) -> np.ndarray:
+        """
+        Per-signal rewards of a multi-signal observation, computed like the reward from each signal's vehicles
+        """
+        current_vehicle_counts = np.array([signal_state[1] + signal_state[2] for signal_state in state_observation])
+        prev_counts = np.maximum(1, self._last_signal_vehicle_counts)
+        self._last_signal_vehicle_counts = current_vehicle_counts
+        return (prev_counts - current_vehicle_counts) / prev_counts
+
+    def restart_environment(self, enable_display: bool = False, rng: Optional[RngContext] = None) -> Tuple:
+        """
+        Resets traffic simulation and returns initial conditions.
+        :param rng: random streams of the new episode and the following ones, e.g. a seeded evaluation episode
+        """
+        if rng is not None:
+            self.rng = rng
+            if self.sim:
+                self.sim.reseed(rng.generator('traffic'))
+        if self.sim:
+            # The road network is built once, only its dynamic state is reset
+            self._past_ticks += self.sim.n_ticks
+            self.sim.reset()
+            self.sim.max_gen, self.sim.max_dt = self.max_gen, self.max_dt
+        else:
+            engine = None
+            if self._shared_engine:
+                engine = self._shared_engine
+            elif self.vectorized:
+                engine = VehicleEngine()
+            self.sim = self.network(self.max_gen, engine, self.max_dt, rng=generator_of(self.rng, 'traffic'))
+        self.sim.trip_listener = self.trip_listener
         if enable_display:
-            self.sim.init_gui()
+            self.sim.init_gui(self.render_fps)
+        if self.record_dir:
+            self.sim.start_recording(self.record_dir, self.record_every, self.record_format)
         starting_state = self._capture_environment_state()
         self._last_state_vehicle_count = 0  # Reset the counter
+        self._last_signal_vehicle_counts = 0
+        self.signal_rewards = None
         return starting_state
 
+    def close(self) -> None:
+        """Closes the simulation display and finishes its recording, if any"""
+        if self.sim:
+            self.sim.close_gui()
+            self.sim.stop_recording()
+
     def retrieve_current_conditions(self) -> Tuple:
         """Provides current environmental observation."""
         return self._capture_environment_state()
@@ -110,6 +185,16 @@ class Environment:
     def action_set(self):
         return self.action_space
     
+    @property
+    def n_signals(self) -> int:
+        """Number of traffic signals of the network, once the environment was restarted"""
+        return len(self.sim.traffic_signals)
+
+    @property
+    def n_ticks(self) -> int:
+        """Number of simulation updates computed over every episode"""
+        return self._past_ticks + (self.sim.n_ticks if self.sim else 0)
+
     @property
     def traffic_model(self):
         return self.sim
\ No newline at end of file
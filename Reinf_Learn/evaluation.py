@@ -0,0 +1,156 @@
+"""
+Parallel headless evaluation of a trained model, for assessing candidates on thousands of episodes.
+
+The episodes are spread over a pool of worker processes, or run in the calling process with a single worker,
+each loading the model once as a greedy policy: a FrozenPolicy, or IndependentQLearners without exploration
+for a grid network. Every episode is seeded from its own stream spawned from the evaluation seed, so its
+outcome doesn't depend on the worker running it nor on the number of workers. The episodes' reward, average
+wait time, throughput and collisions are aggregated with percentile bootstrap confidence intervals.
+"""
+import functools
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .environment import Environment
+from .metrics import trip_record
+from .model_format import is_model_file, load_model, read_legacy_model
+from .multi_agent import IndependentQLearners
+from .serving import load_served_policy
+from TrafficSimulator import grid_network_setup
+from TrafficSimulator.rng import RngContext
+
+# Aggregated columns of the episode results, with their display names
+EVALUATION_METRICS = {'reward': 'Reward', 'wait_time': 'Average wait time (s)',
+                      'throughput': 'Throughput (vehicles/s)', 'collision': 'Collision rate'}
+EPISODE_COLUMNS = ('seed', 'reward', 'steps', 'truncated', 'wait_time', 'throughput', 'collision')
+
+# Policy and environment of a worker process, set once by _init_worker
+_worker_policy = None
+_worker_environment: Optional[Environment] = None
+
+
+def load_evaluated_policy(model_path: str, grid: Optional[Tuple[int, int]] = None, shared_table: bool = False):
+    """
+    Loads the greedy policy of a model file: a FrozenPolicy, or for a (n_rows, n_cols) grid network, the
+    IndependentQLearners of its signals with a zero exploration rate
+    """
+    if not grid:
+        return load_served_policy(model_path)
+    learners = IndependentQLearners(0.0, 0.0, 0.0, Environment().action_set, grid[0] * grid[1], shared_table)
+    learners.q_data = load_model(model_path).to_q_data() if is_model_file(model_path) else read_legacy_model(model_path)
+    return learners
+
+
+def evaluation_environment(max_dt: Optional[float] = None, max_gen: int = 50,
+                           grid: Optional[Tuple[int, int]] = None) -> Environment:
+    """Builds the headless environment of the evaluated model: the two-way intersection, or a grid network"""
+    if grid:
+        return Environment(max_dt=max_dt, max_gen=max_gen, network=functools.partial(grid_network_setup, *grid))
+    return Environment(max_dt=max_dt, max_gen=max_gen)
+
+
+def _init_worker(model_path: str, max_dt: Optional[float], max_gen: int, grid: Optional[Tuple[int, int]],
+                 shared_table: bool) -> None:
+    global _worker_policy, _worker_environment
+    _worker_policy = load_evaluated_policy(model_path, grid, shared_table)
+    _worker_environment = evaluation_environment(max_dt, max_gen, grid)
+
+
+def run_episode(policy, environment: Environment, seed: int, max_steps: Optional[int] = None,
+                record_trips: bool = False) -> Dict:
+    """
+    Runs a seeded greedy episode, returns its results: reward, steps, the simulation's average wait time,
+    throughput of vehicles completing their journey per simulated second, and whether a collision ended it.
+    With max_steps, longer episodes are truncated. With record_trips, the results also hold the trip_record()
+    of every vehicle completing its journey
+    """
+    rng = RngContext(seed)
+    policy.rng = rng.generator('policy')  # Unknown states' ties are broken independently of the previous episodes
+    trips = []
+    if record_trips:
+        environment.trip_listener = lambda vehicle, sim_t: trips.append(trip_record(vehicle, sim_t))
+    observation = environment.restart_environment(rng=rng)
+    episode_reward = 0
+    step_count = 0
+    terminated = False
+    while not terminated and (max_steps is None or step_count < max_steps):
+        observation, reward, terminated, _ = environment.perform_step(policy.select_action(observation))
+        episode_reward += reward
+        step_count += 1
+
+    sim = environment.sim
+    n_completed = sim.n_vehicles_generated - sim.n_vehicles_on_map
+    results = {'seed': seed, 'reward': episode_reward, 'steps': step_count, 'truncated': not terminated,
+               'wait_time': sim.current_average_wait_time, 'throughput': n_completed / sim.t if sim.t else 0.0,
+               'collision': sim.collision_detected}
+    if record_trips:
+        results['trips'] = trips
+    return results
+
+
+def _run_episodes(seeds: Sequence[int], max_steps: Optional[int], record_trips: bool) -> List[Dict]:
+    return [run_episode(_worker_policy, _worker_environment, seed, max_steps, record_trips) for seed in seeds]
+
+
+def episode_seeds(n_episodes: int, seed: int = 0) -> List[int]:
+    """Independent episode seeds, reproducible from the evaluation seed"""
+    return [int(stream.generate_state(1)[0]) for stream in np.random.SeedSequence(seed).spawn(n_episodes)]
+
+
+def run_parallel_evaluation(model_path: str, n_episodes: int, n_workers: int, seed: int = 0,
+                            max_dt: Optional[float] = None, max_gen: int = 50, max_steps: Optional[int] = None,
+                            chunk_size: int = 16, grid: Optional[Tuple[int, int]] = None,
+                            shared_table: bool = False, record_trips: bool = False) -> pd.DataFrame:
+    """
+    Evaluates the greedy policy of a model file (.qtb, legacy .dat, or frozen policy .npz) on n_episodes
+    seeded episodes, in n_workers processes each loading the model once, or in this process with a single
+    worker. Returns the results of every episode, see run_episode(), in episode order
+    :param grid: (n_rows, n_cols) of the grid network controlled by the model, see load_evaluated_policy()
+    """
+    seeds = episode_seeds(n_episodes, seed)
+    columns = [*EPISODE_COLUMNS, 'trips'] if record_trips else EPISODE_COLUMNS
+    if n_workers <= 1:
+        policy = load_evaluated_policy(model_path, grid, shared_table)
+        environment = evaluation_environment(max_dt, max_gen, grid)
+        try:
+            return pd.DataFrame([run_episode(policy, environment, episode_seed, max_steps, record_trips)
+                                 for episode_seed in seeds], columns=columns)
+        finally:
+            environment.close()
+
+    chunks = [seeds[i:i + chunk_size] for i in range(0, n_episodes, chunk_size)]
+    context = mp.get_context('spawn')
+    with ProcessPoolExecutor(n_workers, mp_context=context, initializer=_init_worker,
+                             initargs=(model_path, max_dt, max_gen, grid, shared_table)) as pool:
+        results = [result for chunk_results in pool.map(_run_episodes, chunks, [max_steps] * len(chunks),
+                                                        [record_trips] * len(chunks))
+                   for result in chunk_results]
+    return pd.DataFrame(results, columns=columns)
+
+
+def bootstrap_ci(values, confidence: float = 0.95, n_resamples: int = 10000,
+                 seed: Optional[int] = 0) -> Tuple[float, float, float]:
+    """Returns the mean of the values and its percentile bootstrap confidence interval, (mean, low, high)"""
+    values = np.asarray(values, dtype=float)
+    rng = np.random.default_rng(seed)
+    means = np.empty(n_resamples)
+    # Resamples are drawn in chunks bounding the memory used by thousands of episodes
+    chunk = max(1, (1 << 22) // max(len(values), 1))
+    for start in range(0, n_resamples, chunk):
+        stop = min(start + chunk, n_resamples)
+        means[start:stop] = values[rng.integers(0, len(values), (stop - start, len(values)))].mean(axis=1)
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(means, [tail, 100 - tail])
+    return float(values.mean()), float(low), float(high)
+
+
+def summarize_evaluation(results: pd.DataFrame, confidence: float = 0.95, n_resamples: int = 10000,
+                         seed: Optional[int] = 0) -> pd.DataFrame:
+    """Aggregates the episode results: mean and bootstrap confidence interval of every evaluation metric"""
+    rows = [(name, *bootstrap_ci(results[column], confidence, n_resamples, seed))
+            for column, name in EVALUATION_METRICS.items()]
+    return pd.DataFrame(rows, columns=['metric', 'mean', 'ci_low', 'ci_high']).set_index('metric')
@@ -0,0 +1,147 @@
+import os
+import queue
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Tables of a metrics log directory, and their columns
+EPISODE_COLUMNS = ('session', 'episode', 'reward', 'steps', 'epsilon', 'q_table_size')
+TRIP_COLUMNS = ('session', 'episode', 'vehicle', 'path', 'wait_time', 'travel_time')
+TABLES = {'episodes': EPISODE_COLUMNS, 'trips': TRIP_COLUMNS}
+
+
+class MetricsLog:
+    """
+    Streams per-episode and per-vehicle trip records to a directory of append-only columnar chunks.
+
+    Records are buffered column by column, chunk_size rows at a time, and full chunks are written by a
+    background thread, each as a <table>/<chunk number>.npz file holding one array per column. Logging
+    never blocks: a chunk arriving while queue_size chunks are already waiting for the writer is dropped,
+    and counted in n_dropped_records. Memory is bounded by (queue_size + 1) chunks per table.
+    A chunk the writer fails to write is counted in n_failed_records, and the last error kept in write_error.
+    """
+
+    def __init__(self, directory: str, chunk_size: int = 4096, queue_size: int = 16):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.n_dropped_records = 0
+        self.n_failed_records = 0  # Only updated by the writer thread
+        self.write_error: Optional[Exception] = None
+        self._buffers: Dict[str, Dict[str, List]] = {}
+        self._n_chunks: Dict[str, int] = {}
+        for table, columns in TABLES.items():
+            os.makedirs(os.path.join(directory, table), exist_ok=True)
+            self._buffers[table] = {column: [] for column in columns}
+            self._n_chunks[table] = len(_chunk_paths(directory, table))  # Appends to an existing log
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._writer = threading.Thread(target=self._write_chunks, name='metrics-writer', daemon=True)
+        self._writer.start()
+
+    def log_episode(self, session: str, episode: int, reward: float, steps: int, epsilon: float,
+                    q_table_size: int) -> None:
+        """Records a completed episode"""
+        self._append('episodes', (session, episode, reward, steps, epsilon, q_table_size))
+
+    def log_trip(self, session: str, episode: int, vehicle, sim_t: float) -> None:
+        """Records the trip of a vehicle leaving the map at simulation time sim_t"""
+        self._append('trips', (session, episode, *trip_record(vehicle, sim_t)))
+
+    def log_trips(self, session: str, episode: int, records: Sequence[Tuple]) -> None:
+        """Records the trips of an episode, given as trip_record() tuples, e.g. returned by a worker process"""
+        for record in records:
+            self._append('trips', (session, episode, *record))
+
+    def trip_recorder(self, session: str, episode: int):
+        """Returns a Simulation trip listener, recording the trips of an episode"""
+        def record(vehicle, sim_t):
+            self.log_trip(session, episode, vehicle, sim_t)
+        return record
+
+    def _append(self, table: str, record: Sequence) -> None:
+        buffer = self._buffers[table]
+        for column, value in zip(buffer.values(), record):
+            column.append(value)
+        if len(buffer['session']) >= self.chunk_size:
+            self._flush(table)
+
+    def _flush(self, table: str) -> None:
+        """Hands the buffered records of a table to the writer thread"""
+        buffer = self._buffers[table]
+        n_records = len(buffer['session'])
+        if not n_records:
+            return
+        self._buffers[table] = {column: [] for column in buffer}
+        try:
+            self._queue.put_nowait((table, self._n_chunks[table], buffer))
+            self._n_chunks[table] += 1
+        except queue.Full:
+            self.n_dropped_records += n_records
+
+    def _write_chunks(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            table, chunk_number, buffer = item
+            path = os.path.join(self.directory, table, f'{chunk_number:06d}.npz')
+            temp_path = path + '.tmp.npz'
+            try:
+                np.savez(temp_path, **{column: np.asarray(values) for column, values in buffer.items()})
+                os.replace(temp_path, path)  # Readers only ever see complete chunks
+            except Exception as error:  # Keeps draining the queue, so neither logging nor close() blocks
+                self.n_failed_records += len(buffer['session'])
+                self.write_error = error
+
+    def close(self) -> None:
+        """Writes the buffered records and waits for the writer thread to finish"""
+        for table in self._buffers:
+            self._flush(table)
+        while self._writer.is_alive():
+            try:
+                self._queue.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        self._writer.join()
+        if self.n_dropped_records:
+            print(f"Warning: {self.n_dropped_records} metrics records were dropped, the writer fell behind")
+        if self.n_failed_records:
+            print(f"Warning: {self.n_failed_records} metrics records could not be written: {self.write_error!r}")
+
+    def __enter__(self) -> 'MetricsLog':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def trip_record(vehicle, sim_t: float) -> Tuple:
+    """Trip of a vehicle leaving the map at simulation time sim_t: (vehicle, path, wait_time, travel_time)"""
+    return (vehicle.index, '-'.join(map(str, vehicle.path)), vehicle.get_wait_time(sim_t),
+            sim_t - vehicle.generation_time)
+
+
+def _chunk_paths(directory: str, table: str) -> List[str]:
+    table_directory = os.path.join(directory, table)
+    if not os.path.isdir(table_directory):
+        return []
+    return [os.path.join(table_directory, name) for name in sorted(os.listdir(table_directory))
+            if name.endswith('.npz') and not name.endswith('.tmp.npz')]
+
+
+def iter_log(directory: str, table: str, columns: Optional[Sequence[str]] = None) -> Iterator[pd.DataFrame]:
+    """Lazily yields a metrics log table chunk by chunk, reading only the requested columns"""
+    columns = columns or TABLES[table]
+    for path in _chunk_paths(directory, table):
+        with np.load(path) as chunk:
+            yield pd.DataFrame({column: chunk[column] for column in columns})
+
+
+def read_log(directory: str, table: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Loads a metrics log table ('episodes' or 'trips') as a DataFrame, reading only the requested columns"""
+    chunks = list(iter_log(directory, table, columns))
+    if not chunks:
+        return pd.DataFrame(columns=list(columns or TABLES[table]))
+    return pd.concat(chunks, ignore_index=True)
@@ -0,0 +1,225 @@
+"""
+Binary Q-table model format.
+
+Layout (little-endian), every section starting on an 8 bytes boundary:
+    header        magic (4s), version (uint16), state width (uint16), number of states (uint64),
+                  number of actions (uint64)
+    field kinds   uint8[state width], 0 for bool state fields and 1 for int state fields
+    actions       int64[number of actions]
+    states        int64[number of states, state width], the state-key table
+    visited       uint8[number of states, number of actions], whether a state-action pair was learned
+    values        float64[number of states, number of actions]
+
+The arrays are loaded with numpy.memmap, so loading doesn't parse the file, and processes
+loading the same model share its memory pages. States are looked up in the state-key table with a
+StateIndex, without decoding the table into Python objects.
+"""
+import ast
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b'QTBL'
+VERSION = 1
+_HEADER = struct.Struct('<4sHHQQ')
+_BOOL_FIELD, _INT_FIELD = 0, 1
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+
+def _layout(width: int, n_states: int, n_actions: int) -> Dict[str, Tuple[int, np.dtype, Tuple]]:
+    """Returns {section name: (offset, dtype, shape)}"""
+    sections = [
+        ('field_kinds', np.dtype(np.uint8), (width,)),
+        ('actions', np.dtype('<i8'), (n_actions,)),
+        ('states', np.dtype('<i8'), (n_states, width)),
+        ('visited', np.dtype(np.uint8), (n_states, n_actions)),
+        ('values', np.dtype('<f8'), (n_states, n_actions)),
+    ]
+    layout = {}
+    offset = _aligned(_HEADER.size)
+    for name, dtype, shape in sections:
+        layout[name] = (offset, dtype, shape)
+        offset = _aligned(offset + dtype.itemsize * int(np.prod(shape)))
+    return layout
+
+
+class StateIndex:
+    """
+    Vectorized lookup of states in a state-key table: every row is mapped to a mixed-radix integer key, and
+    the keys are sorted, so a batch of states is looked up with one binary search
+    """
+
+    def __init__(self, states: np.ndarray):
+        """
+        :param states: (n_states, state width) state-key table, e.g. memory-mapped from a model file
+        """
+        width = states.shape[1]
+        if len(states):
+            self._lows: np.ndarray = states.min(axis=0)
+            self._radixes: np.ndarray = states.max(axis=0) - self._lows + 1
+        else:
+            self._lows, self._radixes = np.zeros(width, dtype=np.int64), np.ones(width, dtype=np.int64)
+        self._strides: np.ndarray = np.concatenate([np.cumprod(self._radixes[::-1])[::-1][1:], [1]]).astype(np.int64)
+        keys = (states - self._lows) @ self._strides if len(states) else np.zeros(0, dtype=np.int64)
+        self._order: np.ndarray = np.argsort(keys)
+        self._sorted_keys: np.ndarray = keys[self._order]
+        self._key_rows: Optional[Dict[int, int]] = None  # {key: row}, built by the first single lookup
+        self._fields: List[Tuple[int, int, int]] = list(zip(self._lows.tolist(), self._radixes.tolist(),
+                                                            self._strides.tolist()))
+
+    def __len__(self) -> int:
+        return len(self._sorted_keys)
+
+    def rows(self, states) -> np.ndarray:
+        """Returns the table rows of a batch of states, given as tuples or an (n, width) array, -1 if unknown"""
+        states = np.asarray(states, dtype=np.int64)
+        states = states.reshape(len(states), -1)
+        rows = np.full(len(states), -1, dtype=np.int64)
+        if not len(self):
+            return rows
+        offsets = states - self._lows
+        known = np.all((offsets >= 0) & (offsets < self._radixes), axis=1)
+        keys = np.where(known, offsets @ self._strides, -1)
+        positions = np.minimum(np.searchsorted(self._sorted_keys, keys), len(self) - 1)
+        known &= self._sorted_keys[positions] == keys
+        rows[known] = self._order[positions[known]]
+        return rows
+
+    def row(self, state: Tuple) -> int:
+        """Returns the table row of a single state, -1 if unknown, faster than rows() for one state"""
+        if self._key_rows is None:
+            self._key_rows = dict(zip(self._sorted_keys.tolist(), self._order.tolist()))
+        if len(state) != len(self._fields):
+            return -1
+        key = 0
+        for value, (low, radix, stride) in zip(state, self._fields):
+            offset = value - low
+            if not 0 <= offset < radix:
+                return -1
+            key += offset * stride
+        return self._key_rows.get(key, -1)
+
+
+class QTable:
+    """Read-only Q-table, memory-mapped from a model file"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as model_file:
+            magic, version, width, n_states, n_actions = _HEADER.unpack(model_file.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a Q-table model file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported Q-table model version {version}")
+
+        arrays = {}
+        for name, (offset, dtype, shape) in _layout(width, n_states, n_actions).items():
+            if 0 in shape:
+                arrays[name] = np.zeros(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+        self.field_kinds: np.ndarray = arrays['field_kinds']
+        self.actions: List[int] = arrays['actions'].tolist()
+        self.states: np.ndarray = arrays['states']
+        self.visited: np.ndarray = arrays['visited']
+        self.values: np.ndarray = arrays['values']
+        self._index: Optional[StateIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    @property
+    def index(self) -> StateIndex:
+        """Lookup of the state-key table rows, built on first use"""
+        if self._index is None:
+            self._index = StateIndex(self.states)
+        return self._index
+
+    def rows(self, states) -> np.ndarray:
+        """Returns the table rows of a batch of states, -1 for the states the model never learned"""
+        return self.index.rows(states)
+
+    def state(self, index: int) -> Tuple:
+        """Decodes the state-key table row back to the observation tuple"""
+        return tuple(bool(value) if kind == _BOOL_FIELD else value
+                     for kind, value in zip(self.field_kinds.tolist(), self.states[index].tolist()))
+
+    def to_q_data(self) -> Dict:
+        """
+        Returns the learned Q-values in the Q_Learn dict layout, for loading a learner. Decodes every entry,
+        greedy policies are compiled from the table itself, see compile_policy()
+        """
+        states, actions = np.nonzero(self.visited)
+        decoded = {}
+        q_data = {}
+        for s, a in zip(states.tolist(), actions.tolist()):
+            if s not in decoded:
+                decoded[s] = self.state(s)
+            q_data[(decoded[s], self.actions[a])] = self.values[s, a].item()
+        return q_data
+
+
+def save_model(path: str, q_data: Dict) -> None:
+    """Writes a Q_Learn dict of {(state, action): value} in the binary model format"""
+    state_indexes: Dict[Tuple, int] = {}
+    action_indexes: Dict[int, int] = {}
+    for state, action in q_data:
+        state_indexes.setdefault(state, len(state_indexes))
+        action_indexes.setdefault(action, len(action_indexes))
+    states = list(state_indexes)
+    actions = sorted(action_indexes)
+    action_indexes = {action: i for i, action in enumerate(actions)}
+    width = len(states[0]) if states else 0
+
+    field_kinds = np.full(width, _BOOL_FIELD, dtype=np.uint8)
+    for state in states:
+        if len(state) != width:
+            raise ValueError("All the states must have the same number of fields")
+        for i, value in enumerate(state):
+            if not isinstance(value, (bool, np.bool_)):
+                if not isinstance(value, (int, np.integer)):
+                    raise ValueError(f"Unsupported state field type: {type(value).__name__}")
+                field_kinds[i] = _INT_FIELD
+
+    arrays = {
+        'field_kinds': field_kinds,
+        'actions': np.array(actions, dtype='<i8'),
+        'states': np.array(states, dtype='<i8').reshape(len(states), width),
+        'visited': np.zeros((len(states), len(actions)), dtype=np.uint8),
+        'values': np.zeros((len(states), len(actions)), dtype='<f8'),
+    }
+    for (state, action), value in q_data.items():
+        s, a = state_indexes[state], action_indexes[action]
+        arrays['visited'][s, a] = 1
+        arrays['values'][s, a] = value
+
+    with open(path, 'wb') as model_file:
+        model_file.write(_HEADER.pack(MAGIC, VERSION, width, len(states), len(actions)))
+        for name, (offset, dtype, shape) in _layout(width, len(states), len(actions)).items():
+            model_file.write(b'\0' * (offset - model_file.tell()))
+            model_file.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+
+
+def load_model(path: str) -> QTable:
+    """Memory-maps a binary model file"""
+    return QTable(path)
+
+
+def is_model_file(path: str) -> bool:
+    """Whether a file is in the binary model format, rather than the legacy text format"""
+    with open(path, 'rb') as model_file:
+        return model_file.read(len(MAGIC)) == MAGIC
+
+
+def read_legacy_model(path: str) -> Dict:
+    """Reads a legacy .dat model, the repr() of the Q_Learn dict, without evaluating it as code"""
+    with open(path, 'r') as model_file:
+        return ast.literal_eval(model_file.read().strip())
+
+
+def convert_legacy_model(source_path: str, destination_path: str) -> None:
+    """Converts a legacy .dat model to the binary model format"""
+    save_model(destination_path, read_legacy_model(source_path))
@@ -0,0 +1,121 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .dense_q import StateEncoder
+from TrafficSimulator.instrumentation import hot_path
+
+
+class IndependentQLearners:
+    """
+    One Q-learner per traffic signal, each learning from its own local observation and reward.
+
+    The Q-values of every learner are stored in a single (n_tables, n_states, n_actions) array, so all the
+    learners select their actions and learn a step's transitions in one batched call, and the cost of a step
+    grows linearly with the number of signals. With shared_table, homogeneous junctions share one table.
+    Also usable through the Q_Learn API, with joint states and actions holding one entry per learner.
+    """
+
+    def __init__(self, learning_parameter, exploration_parameter, discount_parameter, action_space,
+                 n_agents: int, shared_table: bool = False, n_states: int = 1 << 12,
+                 rng: Optional[np.random.Generator] = None):
+        self.alpha = float(learning_parameter)
+        self.epsilon = float(exploration_parameter)
+        self.gamma = float(discount_parameter)
+        self.actions = action_space
+        self.n_agents: int = n_agents
+        self.shared_table: bool = shared_table
+        self.rng: np.random.Generator = rng if rng is not None else np.random.default_rng()
+        n_tables = 1 if shared_table else n_agents
+        self.values = np.zeros((n_tables, n_states, len(action_space)))
+        self._visited = np.zeros((n_tables, n_states, len(action_space)), dtype=bool)
+        self._tables = np.zeros(n_agents, dtype=np.int64) if shared_table else np.arange(n_agents)
+        self._reset_encoders()
+        self._action_indexes: Dict = {action: i for i, action in enumerate(action_space)}
+        self._action_array = np.array(action_space)
+
+    def _reset_encoders(self) -> None:
+        n_tables, n_states, _ = self.values.shape
+        self.encoders: List[StateEncoder] = [StateEncoder(n_states) for _ in range(n_tables)]
+        self._agent_encoders: List[StateEncoder] = [self.encoders[t] for t in self._tables.tolist()]
+
+    def __len__(self) -> int:
+        """Number of learned state-action pairs over every table, without building q_data"""
+        return int(np.count_nonzero(self._visited))
+
+    @property
+    def q_data(self) -> Dict:
+        """
+        Q-values of the learned state-action pairs in the Q_Learn dict layout, saved by store_q_data().
+        Without a shared table, the states are prefixed by their learner index: ((agent, *state), action)
+        """
+        q_data = {}
+        for t, encoder in enumerate(self.encoders):
+            states, actions = np.nonzero(self._visited[t, :len(encoder)])
+            for s, a in zip(states.tolist(), actions.tolist()):
+                state = encoder.decode(s)
+                key = state if self.shared_table else (t, *state)
+                q_data[(key, self.actions[a])] = self.values[t, s, a].item()
+        return q_data
+
+    @q_data.setter
+    def q_data(self, q_data: Dict) -> None:
+        self._reset_encoders()
+        self.values[:] = 0
+        self._visited[:] = False
+        for (state, action), value in q_data.items():
+            t, state = (0, state) if self.shared_table else (state[0], tuple(state[1:]))
+            s, a = self.encoders[t].encode(state), self._action_indexes[action]
+            self.values[t, s, a] = value
+            self._visited[t, s, a] = True
+
+    def _encode(self, states: Sequence[Tuple]) -> np.ndarray:
+        return np.array([encoder.encode(state) for encoder, state in zip(self._agent_encoders, states)])
+
+    @hot_path('multi_agent.select_actions')
+    def select_actions(self, states: Sequence[Tuple]) -> List:
+        """Chooses every learner's action using epsilon-greedy strategy, with one local state per learner"""
+        rows = self.values[self._tables, self._encode(states)]
+
+        # Select randomly among equally optimal actions
+        best = rows == rows.max(axis=1, keepdims=True)
+        action_indexes = np.argmax(best * self.rng.random(best.shape), axis=1)
+
+        # Exploration case
+        exploring = self.rng.random(self.n_agents) < self.epsilon
+        action_indexes[exploring] = self.rng.integers(0, len(self.actions), np.count_nonzero(exploring))
+        return self._action_array[action_indexes].tolist()
+
+    @hot_path('multi_agent.learn')
+    def learn_batch(self, states: Sequence[Tuple], actions: Sequence, next_states: Sequence[Tuple],
+                    rewards) -> None:
+        """
+        Updates the Q-values of every learner's transition, rewards being one reward per learner or a
+        single shared reward. Learners updating the same state-action pair of a shared table move it towards
+        their mean target, as much as that many successive updates towards the same target would
+        """
+        tables = self._tables
+        s, next_s = self._encode(states), self._encode(next_states)
+        a = np.array([self._action_indexes[action] for action in actions])
+        best_future_values = self.values[tables, next_s].max(axis=1)
+        targets = np.asarray(rewards, dtype=float) + self.gamma * best_future_values
+
+        # Q-learning update rule: Q(s,a) = (1-α)*Q(s,a) + α*(r + γ*max_Q(s',a'))
+        flat_indexes = np.ravel_multi_index((tables, s, a), self.values.shape)
+        if self.shared_table:
+            flat_indexes, inverse, counts = np.unique(flat_indexes, return_inverse=True, return_counts=True)
+            targets = np.bincount(inverse, weights=targets) / counts
+            learning_rates = 1 - (1 - self.alpha) ** counts
+        else:
+            learning_rates = self.alpha
+        current_q = self.values.flat[flat_indexes]
+        self.values.flat[flat_indexes] = current_q + learning_rates * (targets - current_q)
+        self._visited.flat[flat_indexes] = True
+
+    def select_action(self, state: Tuple) -> List:
+        """Q_Learn API: chooses the joint action of a joint state"""
+        return self.select_actions(state)
+
+    def learn(self, state: Tuple, action: Sequence, next_state: Tuple, reward) -> None:
+        """Q_Learn API: learns the transitions of a joint state, every learner receiving the reward"""
+        self.learn_batch(state, action, next_state, reward)
@@ -0,0 +1,142 @@
+import math
+import multiprocessing as mp
+import traceback
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .environment import Environment
+from .Q_Learn import Q_Learn
+from TrafficSimulator.rng import RngContext
+
+# (state, action, next_state, reward)
+Transition = Tuple[Tuple, int, Tuple, float]
+
+
+def decayed_epsilon(epsilon: float, n_episodes: int, epsilon_min: float, epsilon_decay: float) -> float:
+    """Returns the exploration rate after n_episodes of per-episode decay, as applied by the training loops"""
+    if epsilon <= epsilon_min:
+        return epsilon
+    if epsilon_min <= 0 or epsilon_decay >= 1:  # Epsilon never reaches epsilon_min
+        return epsilon * epsilon_decay ** n_episodes
+    # Number of decays until epsilon reaches epsilon_min, after which it stops decaying
+    n_decays = math.ceil(math.log(epsilon_min / epsilon) / math.log(epsilon_decay))
+    return epsilon * epsilon_decay ** min(n_episodes, n_decays)
+
+
+def policy_episodes(episode: int, refresh_interval: int) -> int:
+    """
+    Returns the number of learned episodes of the policy playing an episode, given its 0-based number in the
+    learning order: the policy published one refresh interval earlier, so the actors run ahead of the learner
+    """
+    return max(0, (episode // refresh_interval - 1) * refresh_interval)
+
+
+def _run_actor(worker_id: int, n_episodes: int, parameters: Dict, q_data: Dict, rng: RngContext,
+               n_workers: int, refresh_interval: int, epsilon_min: float, epsilon_decay: float,
+               max_dt: Optional[float], transitions_queue: mp.Queue, policy_queue: mp.Queue) -> None:
+    """Actor process: runs episodes with a local copy of the policy and streams the transitions to the learner"""
+    try:
+        environment = Environment(max_dt=max_dt, rng=rng)
+        model = Q_Learn(action_space=environment.action_set, rng=rng.generator('learner'), **parameters)
+        model.q_data = q_data
+        initial_epsilon = model.epsilon
+        learned_episodes = 0  # Of the local policy
+
+        for local_episode in range(n_episodes):
+            # The learner applies the episodes round-robin over the workers
+            episode = local_episode * n_workers + worker_id
+            # Wait for the policy this episode is played with, whatever the timing of the processes
+            while learned_episodes < policy_episodes(episode, refresh_interval):
+                model.q_data, learned_episodes = policy_queue.get()
+            model.epsilon = decayed_epsilon(initial_epsilon, episode, epsilon_min, epsilon_decay)
+
+            transitions: List[Transition] = []
+            total_reward = 0
+            current_observation = environment.restart_environment()
+            terminated = False
+            while not terminated:
+                action_taken = model.select_action(current_observation)
+                new_observation, reward, terminated, _ = environment.perform_step(action_taken)
+                transitions.append((current_observation, action_taken, new_observation, reward))
+                current_observation = new_observation
+                total_reward += reward
+
+            transitions_queue.put(('episode', worker_id, (local_episode, transitions, total_reward,
+                                                          len(transitions))))
+        transitions_queue.put(('done', worker_id, None))
+    except Exception:
+        transitions_queue.put(('error', worker_id, traceback.format_exc()))
+
+
+class ActorPool:
+    """
+    Spawns actor processes, each running its own Environment with a local copy of the policy.
+    The actors stream every episode's transitions to the learner process, which iterates over the pool,
+    and receive the learner's updated Q-values through refresh() every refresh_interval episodes.
+
+    The learner gets the episodes round-robin over the actors, whatever order they complete in, and every
+    episode is played with the policy published one refresh interval before it, see policy_episodes(): a
+    seeded run learns the same Q-values bit for bit.
+    """
+
+    def __init__(self, n_workers: int, total_episodes: int, model: Q_Learn,
+                 epsilon_min: float, epsilon_decay: float, max_dt: Optional[float] = None,
+                 rng: Optional[RngContext] = None, refresh_interval: int = 20):
+        """
+        :param rng: random streams of the run, each actor getting an independent child context. None for fresh
+        entropy
+        """
+        context = mp.get_context('spawn')
+        self.n_workers: int = n_workers
+        self.refresh_interval: int = refresh_interval
+        self._transitions_queue = context.Queue()
+        self._policy_queues = [context.Queue() for _ in range(n_workers)]
+
+        parameters = {'learning_parameter': model.alpha, 'exploration_parameter': model.epsilon,
+                      'discount_parameter': model.gamma}
+        worker_rngs = (rng if rng is not None else RngContext()).spawn(n_workers)
+        self._processes = []
+        for worker_id in range(n_workers):
+            n_episodes = total_episodes // n_workers + (worker_id < total_episodes % n_workers)
+            process = context.Process(
+                target=_run_actor,
+                args=(worker_id, n_episodes, parameters, model.q_data, worker_rngs[worker_id], n_workers,
+                      refresh_interval, epsilon_min, epsilon_decay, max_dt, self._transitions_queue,
+                      self._policy_queues[worker_id]),
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+    def __iter__(self) -> Iterator[Tuple[List[Transition], float, int]]:
+        """Yields (transitions, total reward, step count) for every completed episode, round-robin over the actors"""
+        completed: Dict[Tuple[int, int], Tuple[List[Transition], float, int]] = {}  # Episodes arrived early
+        episode = 0
+        n_running = self.n_workers
+        while n_running:
+            message, worker_id, payload = self._transitions_queue.get()
+            if message == 'episode':
+                local_episode, *results = payload
+                completed[(worker_id, local_episode)] = tuple(results)
+                while (episode % self.n_workers, episode // self.n_workers) in completed:
+                    yield completed.pop((episode % self.n_workers, episode // self.n_workers))
+                    episode += 1
+            elif message == 'done':
+                n_running -= 1
+            else:
+                raise RuntimeError(f"Actor {worker_id} failed:\n{payload}")
+
+    def refresh(self, q_data: Dict, n_episodes: int) -> None:
+        """
+        Publishes the learner's Q-values and completed episodes count to every actor, after every
+        refresh_interval episodes
+        """
+        for policy_queue in self._policy_queues:
+            policy_queue.put((q_data, n_episodes))
+
+    def close(self) -> None:
+        for policy_queue in self._policy_queues:
+            policy_queue.cancel_join_thread()  # Finished actors leave their last refresh unread
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
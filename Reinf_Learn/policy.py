@@ -0,0 +1,128 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .model_format import _BOOL_FIELD, _INT_FIELD, QTable, StateIndex
+from TrafficSimulator.instrumentation import hot_path
+
+
+class FrozenPolicy:
+    """
+    Read-only greedy policy compiled from a Q-table, see compile_policy().
+
+    Holds the best action of every known state, so a decision is a single lookup, and act() decides a
+    whole batch of states with vectorized array lookups. States the Q-table never saw are ties between all
+    the actions, broken like the known states' ties: by picking the first action, or at random with the
+    policy's seeded generator. Compiled from a model file, the state table stays memory-mapped, so the
+    processes serving or evaluating the same model share its pages.
+    """
+
+    def __init__(self, states: np.ndarray, field_kinds: np.ndarray, action_indexes: np.ndarray,
+                 actions: Sequence[int], seed: Optional[int] = None):
+        """
+        :param states: (n_states, state width) state-key table
+        :param field_kinds: per state field, 0 for bool and 1 for int fields
+        :param action_indexes: index in actions of the best action of every state
+        """
+        self.states: np.ndarray = states
+        self.field_kinds: np.ndarray = field_kinds
+        self.action_indexes: np.ndarray = action_indexes
+        self.actions: List[int] = list(actions)
+        self.seed: Optional[int] = seed
+        self.epsilon: float = 0.0  # Greedy, for the Q_Learn interface
+        self.rng: np.random.Generator = np.random.default_rng(seed)  # Ties of the unknown states, with a seed
+        self._action_array = np.array(self.actions)
+        self._index = StateIndex(states)
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def _unknown_state_action(self) -> int:
+        return self.actions[0] if self.seed is None else self.actions[int(self.rng.random() * len(self.actions))]
+
+    def select_action(self, state: Tuple) -> int:
+        """Returns the action of a state, as Q_Learn.select_action() with a zero exploration rate"""
+        row = self._index.row(state)
+        return self._unknown_state_action() if row < 0 else self.actions[self.action_indexes.item(row)]
+
+    @hot_path('policy.act')
+    def act(self, states) -> np.ndarray:
+        """Returns the actions of a batch of states, given as a sequence of tuples or an (n, width) array"""
+        rows = self._index.rows(states)
+        known = rows >= 0
+        action_indexes = np.zeros(len(rows), dtype=np.int64)
+        action_indexes[known] = self.action_indexes[rows[known]]
+        n_unknown = len(rows) - np.count_nonzero(known)
+        if n_unknown and self.seed is not None:
+            action_indexes[~known] = self.rng.integers(0, len(self.actions), n_unknown)
+        return self._action_array[action_indexes]
+
+    def save(self, path: str) -> None:
+        """
+        Writes the policy as an uncompressed .npz archive, loaded by load_policy() without the learner.
+        The state table and the action indexes are stored with the smallest integer type holding them
+        """
+        def compact(array: np.ndarray) -> np.ndarray:
+            return array.astype(np.min_scalar_type(array.max() if array.size else 0))
+
+        with open(path, 'wb') as policy_file:
+            np.savez(policy_file, states=compact(self.states), field_kinds=self.field_kinds,
+                     action_indexes=compact(self.action_indexes), actions=self._action_array,
+                     seed=np.array(-1 if self.seed is None else self.seed))
+
+
+def compile_policy(q_data: Union[Dict, QTable], actions: Sequence[int], seed: Optional[int] = None) -> FrozenPolicy:
+    """
+    Compiles a Q_Learn dict of {(state, action): value}, or a QTable loaded from a model file, into a greedy
+    FrozenPolicy. Unlearned state-action pairs count as 0, as in Q_Learn. Ties are broken by picking the first
+    action, or at random with the given seed. A QTable is compiled with array operations on its memory-mapped
+    state table and values, which the policy keeps, without decoding them
+    """
+    actions = list(actions)
+    action_positions = {action: i for i, action in enumerate(actions)}
+    if isinstance(q_data, QTable):
+        states, field_kinds = q_data.states, q_data.field_kinds
+        if q_data.actions == actions:
+            values = q_data.values
+        else:
+            values = np.zeros((len(states), len(actions)))
+            for a, action in enumerate(q_data.actions):
+                values[:, action_positions[action]] = q_data.values[:, a]
+    else:
+        states, field_kinds, values = _q_data_arrays(q_data, action_positions)
+
+    best = values == values.max(axis=1, keepdims=True) if len(states) else np.zeros((0, len(actions)), dtype=bool)
+    if seed is None:
+        action_indexes = best.argmax(axis=1)
+    else:
+        action_indexes = np.argmax(best * np.random.default_rng(seed).random(best.shape), axis=1)
+    return FrozenPolicy(states, field_kinds, action_indexes.astype(np.int64), actions, seed)
+
+
+def _q_data_arrays(q_data: Dict, action_positions: Dict) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns the state-key table, field kinds and (n_states, n_actions) values of a Q_Learn dict"""
+    state_indexes: Dict[Tuple, int] = {}
+    for state, _ in q_data:
+        state_indexes.setdefault(state, len(state_indexes))
+    states = list(state_indexes)
+    width = len(states[0]) if states else 0
+
+    values = np.zeros((len(states), len(action_positions)))
+    for (state, action), value in q_data.items():
+        values[state_indexes[state], action_positions[action]] = value
+
+    field_kinds = np.full(width, _BOOL_FIELD, dtype=np.uint8)
+    for state in states:
+        for i, value in enumerate(state):
+            if not isinstance(value, (bool, np.bool_)):
+                field_kinds[i] = _INT_FIELD
+    return np.array(states, dtype=np.int64).reshape(len(states), width), field_kinds, values
+
+
+def load_policy(path: str) -> FrozenPolicy:
+    """Loads a policy saved by FrozenPolicy.save()"""
+    with np.load(path) as archive:
+        seed = int(archive['seed'])
+        return FrozenPolicy(archive['states'].astype(np.int64), archive['field_kinds'],
+                            archive['action_indexes'].astype(np.int64), archive['actions'].tolist(),
+                            None if seed < 0 else seed)
@@ -0,0 +1,106 @@
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .dense_q import StateEncoder
+
+
+class ReplayBatch(NamedTuple):
+    states: np.ndarray  # Encoded states, see ReplayBuffer.decode()
+    actions: np.ndarray
+    next_states: np.ndarray
+    rewards: np.ndarray
+    dones: np.ndarray
+    indexes: np.ndarray  # Buffer slots of the transitions, for update_priorities()
+    weights: np.ndarray  # Importance sampling weights, ones for uniform sampling
+
+
+class ReplayBuffer:
+    """
+    Fixed-capacity ring buffer of transitions, the oldest being overwritten once full.
+
+    States are stored as integer indices of a StateEncoder, next to action, reward and done arrays, so a
+    transition costs a few array writes. Sharing the encoder of a DenseQLearn model lets it learn the sampled
+    states without decoding them. Minibatches are sampled uniformly, or, with prioritized, in proportion
+    to |TD error| ** priority_exponent, new transitions getting the highest priority seen so far. Prioritized
+    batches come with importance sampling weights correcting the bias, annealed by importance_exponent.
+    Minibatches are drawn from rng, a numpy Generator, seeded from fresh entropy if None.
+    """
+
+    def __init__(self, capacity: int, prioritized: bool = False, priority_exponent: float = 0.6,
+                 importance_exponent: float = 0.4, n_states: int = 1 << 16,
+                 encoder: Optional[StateEncoder] = None, rng: Optional[np.random.Generator] = None):
+        self.capacity: int = capacity
+        self.prioritized: bool = prioritized
+        self.priority_exponent: float = priority_exponent
+        self.importance_exponent: float = importance_exponent
+        self.encoder: StateEncoder = encoder if encoder is not None else StateEncoder(n_states)
+        self.rng: np.random.Generator = rng if rng is not None else np.random.default_rng()
+        self._states = np.zeros(capacity, dtype=np.int64)
+        self._actions = np.zeros(capacity, dtype=np.int64)
+        self._next_states = np.zeros(capacity, dtype=np.int64)
+        self._rewards = np.zeros(capacity)
+        self._dones = np.zeros(capacity, dtype=bool)
+        self._priorities = np.zeros(capacity)
+        self._max_priority: float = 1.0
+        self._next_index: int = 0  # Slot of the next transition
+        self._size: int = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, state: Tuple, action: int, next_state: Tuple, reward: float, done: bool) -> None:
+        i = self._next_index
+        self._states[i] = self.encoder.encode(state)
+        self._actions[i] = action
+        self._next_states[i] = self.encoder.encode(next_state)
+        self._rewards[i] = reward
+        self._dones[i] = done
+        self._priorities[i] = self._max_priority
+        self._next_index = (i + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def sample(self, batch_size: int) -> ReplayBatch:
+        """Draws a minibatch of stored transitions, with replacement"""
+        if not self._size:
+            raise ValueError("Cannot sample an empty replay buffer")
+        if self.prioritized:
+            probabilities = self._priorities[:self._size] ** self.priority_exponent
+            cumulative = np.cumsum(probabilities)
+            indexes = np.searchsorted(cumulative, self.rng.random(batch_size) * cumulative[-1],
+                                      side='right')
+            indexes = np.minimum(indexes, self._size - 1)
+            weights = (self._size * probabilities[indexes] / cumulative[-1]) ** -self.importance_exponent
+            weights /= weights.max()
+        else:
+            indexes = self.rng.integers(0, self._size, batch_size)
+            weights = np.ones(batch_size)
+        return ReplayBatch(self._states[indexes], self._actions[indexes], self._next_states[indexes],
+                           self._rewards[indexes], self._dones[indexes], indexes, weights)
+
+    def decode(self, states: np.ndarray) -> List[Tuple]:
+        """Returns the observation tuples of encoded states"""
+        return [self.encoder.decode(s) for s in states.tolist()]
+
+    def replay(self, model, batch_size: int) -> np.ndarray:
+        """
+        Samples a minibatch, has the model learn it in one batched update, and updates the priorities.
+        Returns the TD errors
+        """
+        batch = self.sample(batch_size)
+        if getattr(model, 'encoder', None) is self.encoder:
+            td_errors = model.learn_encoded(batch.states, batch.actions.tolist(), batch.next_states, batch.rewards,
+                                            batch.dones, batch.weights)
+        else:
+            td_errors = model.learn_batch(self.decode(batch.states), batch.actions.tolist(),
+                                          self.decode(batch.next_states), batch.rewards, batch.dones,
+                                          batch.weights)
+        if self.prioritized:
+            self.update_priorities(batch.indexes, td_errors)
+        return td_errors
+
+    def update_priorities(self, indexes: np.ndarray, td_errors: np.ndarray) -> None:
+        """Sets the priorities of sampled transitions from their new TD errors"""
+        priorities = np.abs(td_errors) + 1e-6  # Every transition keeps a chance to be replayed
+        self._priorities[indexes] = priorities
+        self._max_priority = max(self._max_priority, priorities.max())
@@ -0,0 +1,216 @@
+"""
+Local policy serving, for driving external simulators and replay tools from a trained model.
+
+The server holds one frozen policy in memory and answers action requests over a local TCP or Unix socket,
+with newline-delimited JSON: a request is a state, e.g. [false, 3, 1, false], answered by {"action": 1}, and
+the "stats" request is answered by the decision statistics. Requests may be pipelined, and are answered in
+order. The requests arriving while a batch is being decided, from every connection, are decided together in
+the next batch, with one FrozenPolicy.act() call.
+"""
+import asyncio
+import collections
+import json
+import socket
+import time
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .environment import Environment
+from .policy import FrozenPolicy, compile_policy, load_policy
+from .model_format import is_model_file, load_model, read_legacy_model
+
+STATS_REQUEST = 'stats'
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1  # Range of the state values, decided as int64 arrays
+
+
+def load_served_policy(path: str, seed: Optional[int] = 0) -> FrozenPolicy:
+    """
+    Loads a frozen policy file, or compiles the greedy policy of a model file (.qtb or legacy .dat). A .qtb
+    model is compiled from its memory-mapped table, without decoding it
+    """
+    if path.endswith('.npz'):
+        return load_policy(path)
+    q_data = load_model(path) if is_model_file(path) else read_legacy_model(path)
+    return compile_policy(q_data, Environment().action_set, seed)
+
+
+class PolicyServer:
+    """Serves the actions of a frozen policy with asyncio, see the module docstring"""
+
+    def __init__(self, policy: FrozenPolicy, max_batch_size: int = 1024, n_latencies: int = 100_000):
+        """
+        :param max_batch_size: largest number of requests decided together
+        :param n_latencies: number of the latest decision latencies kept for the percentiles
+        """
+        self.policy: FrozenPolicy = policy
+        self.max_batch_size: int = max_batch_size
+        self.n_decisions: int = 0
+        self.n_batches: int = 0
+        self._state_width: Optional[int] = policy.states.shape[1] if len(policy) else None
+        self._latencies: Deque[float] = collections.deque(maxlen=n_latencies)  # Seconds, receipt to response
+        self._pending: Optional[asyncio.Queue] = None  # (state, future) of the requests to decide
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765, path: Optional[str] = None) -> None:
+        """Starts listening on a TCP port, or on a Unix socket path if given"""
+        self._pending = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._decide_batches())
+        if path:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port)
+
+    @property
+    def address(self):
+        """Address the server listens on: (host, port), or the Unix socket path"""
+        return self._server.sockets[0].getsockname()
+
+    async def close(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+        self._batcher.cancel()
+
+    async def _decide_batches(self) -> None:
+        while True:
+            batch = [await self._pending.get()]
+            while len(batch) < self.max_batch_size and not self._pending.empty():
+                batch.append(self._pending.get_nowait())
+            try:
+                results = self.policy.act([state for state, _ in batch]).tolist()
+            except Exception as error:
+                # A batch failing must not stop the server: its requests are answered with the error
+                results = [{'error': f"Decision failed: {error!r}"}] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.cancelled():
+                    future.set_result(result)
+            self.n_decisions += len(batch)
+            self.n_batches += 1
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # Responses are written in request order by a separate task, so pipelined requests are batched
+        responses: asyncio.Queue = asyncio.Queue()
+        responder = asyncio.create_task(self._write_responses(responses, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                received = time.perf_counter()
+                future = asyncio.get_running_loop().create_future()
+                try:
+                    request = json.loads(line)
+                except ValueError as error:
+                    future.set_result({'error': f"Invalid request: {error}"})
+                else:
+                    if request == STATS_REQUEST:
+                        future.set_result(self.stats())
+                    elif not self._is_state(request):
+                        future.set_result({'error': f"Invalid state: {request}"})
+                    else:
+                        self._pending.put_nowait((request, future))
+                responses.put_nowait((future, received))
+        finally:
+            responses.put_nowait(None)
+            await responder
+
+    def _is_state(self, request) -> bool:
+        return (isinstance(request, list) and len(request) == (self._state_width or len(request))
+                and all(isinstance(value, int) and INT64_MIN <= value <= INT64_MAX for value in request))
+
+    async def _write_responses(self, responses: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                item = await responses.get()
+                if item is None:
+                    break
+                future, received = item
+                result = await future
+                response = {'action': result} if isinstance(result, int) else result
+                writer.write(json.dumps(response).encode() + b'\n')
+                if isinstance(result, int):
+                    self._latencies.append(time.perf_counter() - received)
+                if responses.empty():
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def stats(self) -> Dict:
+        """Number of decisions and batches, and the p50 and p99 decision latencies in milliseconds"""
+        stats = {'decisions': self.n_decisions, 'batches': self.n_batches,
+                 'mean_batch_size': self.n_decisions / self.n_batches if self.n_batches else 0.0}
+        if self._latencies:
+            p50, p99 = np.percentile(np.fromiter(self._latencies, dtype=float), [50, 99]) * 1e3
+            stats.update(p50_ms=float(p50), p99_ms=float(p99))
+        return stats
+
+
+async def serve(policy: FrozenPolicy, host: str = '127.0.0.1', port: int = 8765, path: Optional[str] = None,
+                max_batch_size: int = 1024, report_interval: float = 10) -> None:
+    """Serves a policy until cancelled, printing the decision statistics every report_interval seconds"""
+    server = PolicyServer(policy, max_batch_size)
+    await server.start(host, port, path)
+    print(f"Serving {len(policy)} states on {server.address}")
+    reported_decisions = 0
+    try:
+        while True:
+            await asyncio.sleep(report_interval)
+            if server.n_decisions != reported_decisions:
+                reported_decisions = server.n_decisions
+                print(format_stats(server.stats()))
+    finally:
+        print(format_stats(server.stats()))
+        await server.close()
+
+
+def format_stats(stats: Dict) -> str:
+    text = f"{stats['decisions']} decisions in {stats['batches']} batches ({stats['mean_batch_size']:.1f} per batch)"
+    if 'p50_ms' in stats:
+        text += f" - latency p50: {stats['p50_ms']:.3f} ms, p99: {stats['p99_ms']:.3f} ms"
+    return text
+
+
+class PolicyClient:
+    """Blocking client of a PolicyServer, e.g. for a simulator process or a loopback test"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, path: Optional[str] = None):
+        if path:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(path)
+        else:
+            self._socket = socket.create_connection((host, port))
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._socket.makefile('rwb')
+
+    def _request(self, requests: Sequence) -> List[Dict]:
+        self._file.write(b''.join(json.dumps(request).encode() + b'\n' for request in requests))
+        self._file.flush()
+        responses = [json.loads(self._file.readline()) for _ in requests]
+        for response in responses:
+            if 'error' in response:
+                raise ValueError(response['error'])
+        return responses
+
+    def act(self, state: Tuple) -> int:
+        """Returns the action of a state"""
+        return self._request([state])[0]['action']
+
+    def act_many(self, states: Sequence[Tuple]) -> List[int]:
+        """Returns the actions of several states, sent in a single pipelined write"""
+        return [response['action'] for response in self._request(states)]
+
+    def stats(self) -> Dict:
+        return self._request([STATS_REQUEST])[0]
+
+    def close(self) -> None:
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self) -> 'PolicyClient':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,140 @@
+"""
+Hyperparameter sweeps: trains one model per configuration of a grid or random search space, in a process
+pool, and collects every trial's final rolling Avg(100) reward into a single results table.
+
+Unpromising trials are stopped early with the median stopping rule, see MedianStopping: trials report their
+rolling average reward at regular checkpoints, through a dict shared by the pool's processes.
+"""
+import contextlib
+import functools
+import io
+import itertools
+import multiprocessing as mp
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .environment import Environment
+from .Q_Learn import Q_Learn
+from .dense_q import DenseQLearn
+from .utils import ALPHA, EPSILON, GAMMA, EPSILON_MIN, EPSILON_DECAY, run_training_session
+from TrafficSimulator.rng import RngContext
+
+# Tuned hyperparameters and their defaults
+DEFAULTS = {'alpha': ALPHA, 'gamma': GAMMA, 'epsilon': EPSILON, 'epsilon_min': EPSILON_MIN,
+            'epsilon_decay': EPSILON_DECAY}
+RESULT_COLUMNS = ('trial', *DEFAULTS, 'seed', 'episodes', 'stopped_early', 'avg_reward', 'best_reward',
+                  'q_table_size', 'duration')
+
+# {parameter: values to try, or (low, high) range sampled uniformly by random search}
+SearchSpace = Dict[str, Union[List[float], Tuple[float, float]]]
+
+
+def parse_parameter(text: str) -> Tuple[str, Union[List[float], Tuple[float, float]]]:
+    """Parses a name=v1,v2,... list of values, or a name=low:high range"""
+    name, _, values = text.partition('=')
+    if name not in DEFAULTS:
+        raise ValueError(f"Unknown hyperparameter {name!r}, expected one of {', '.join(DEFAULTS)}")
+    if ':' in values:
+        low, high = map(float, values.split(':'))
+        return name, (low, high)
+    return name, [float(value) for value in values.split(',')]
+
+
+def sweep_configs(space: SearchSpace, n_random: Optional[int] = None, seed: int = 0) -> List[Dict]:
+    """
+    Returns the configurations of a search: every combination of the listed values (grid search), or
+    n_random configurations sampling every parameter independently (random search). Parameters missing from
+    the space keep their default value
+    """
+    if n_random is None:
+        if any(isinstance(values, tuple) for values in space.values()):
+            raise ValueError("Ranges can only be sampled by a random search")
+        names = list(space)
+        combinations = itertools.product(*(space[name] for name in names))
+        return [{**DEFAULTS, **dict(zip(names, combination))} for combination in combinations]
+
+    rng = random.Random(seed)
+    return [{**DEFAULTS, **{name: rng.uniform(*values) if isinstance(values, tuple) else rng.choice(values)
+                            for name, values in space.items()}}
+            for _ in range(n_random)]
+
+
+class MedianStopping:
+    """
+    Early stopping rule shared by the trials of a sweep: every checkpoint_interval episodes after the first
+    grace_episodes, a trial reports its rolling Avg(100) reward, and stops if it is below the median of the
+    other trials' averages at the same episode, once at least min_trials of them reported it
+    """
+
+    def __init__(self, checkpoints, grace_episodes: int = 300, checkpoint_interval: int = 100,
+                 min_trials: int = 3):
+        """
+        :param checkpoints: dict shared by the trial processes, e.g. a multiprocessing Manager dict
+        """
+        self.checkpoints = checkpoints  # {(trial, episode): rolling average reward}
+        self.grace_episodes: int = grace_episodes
+        self.checkpoint_interval: int = checkpoint_interval
+        self.min_trials: int = min_trials
+
+    def should_stop(self, trial: int, episode: int, average_reward: float) -> bool:
+        if episode < self.grace_episodes or episode % self.checkpoint_interval:
+            return False
+        self.checkpoints[(trial, episode)] = average_reward
+        others = [average for (other, other_episode), average in self.checkpoints.items()
+                  if other_episode == episode and other != trial]
+        return len(others) >= self.min_trials and average_reward < statistics.median(others)
+
+
+def run_trial(trial: int, config: Dict, n_episodes: int, seed: int, stopping: Optional[MedianStopping] = None,
+              dense: bool = False, max_dt: Optional[float] = None, max_gen: int = 50) -> Dict:
+    """Trains a model with the configuration's hyperparameters, returns its row of the results table"""
+    start = time.perf_counter()
+    rng = RngContext(seed)
+    environment = Environment(max_dt=max_dt, max_gen=max_gen, rng=rng)
+    model_class = DenseQLearn if dense else Q_Learn
+    model = model_class(config['alpha'], config['epsilon'], config['gamma'], environment.action_set,
+                        rng=rng.generator('learner'))
+
+    should_stop = functools.partial(stopping.should_stop, trial) if stopping else None
+    with contextlib.redirect_stdout(io.StringIO()):  # The sweep reports the trials' results instead
+        episodes, avg_reward, best_reward = run_training_session(
+            model, environment, None, n_episodes, epsilon_min=config['epsilon_min'],
+            epsilon_decay=config['epsilon_decay'], should_stop=should_stop)
+
+    return {'trial': trial, **config, 'seed': seed, 'episodes': episodes, 'stopped_early': episodes < n_episodes,
+            'avg_reward': avg_reward, 'best_reward': best_reward, 'q_table_size': len(model),
+            'duration': time.perf_counter() - start}
+
+
+def run_sweep(configs: Sequence[Dict], n_episodes: int, n_workers: int, output_path: str, seed: int = 0,
+              early_stopping: bool = True, grace_episodes: int = 300, checkpoint_interval: int = 100,
+              dense: bool = False, max_dt: Optional[float] = None, max_gen: int = 50) -> pd.DataFrame:
+    """
+    Trains every configuration in a pool of n_workers processes, stopping unpromising trials early (see
+    MedianStopping). The results table, one row per trial sorted by decreasing Avg(100) reward, is saved as
+    CSV to output_path as the trials complete
+    """
+    context = mp.get_context('spawn')
+    # Independent training seeds, reproducible from the sweep seed
+    seeds = [int(seed.generate_state(1)[0]) for seed in np.random.SeedSequence(seed).spawn(len(configs))]
+    rows = []
+    results = pd.DataFrame(columns=RESULT_COLUMNS)
+    with context.Manager() as manager, ProcessPoolExecutor(n_workers, mp_context=context) as pool:
+        stopping = MedianStopping(manager.dict(), grace_episodes, checkpoint_interval) if early_stopping else None
+        trials = [pool.submit(run_trial, trial, config, n_episodes, seeds[trial], stopping, dense, max_dt, max_gen)
+                  for trial, config in enumerate(configs)]
+        for completed in as_completed(trials):
+            row = completed.result()
+            rows.append(row)
+            print(f"Trial {row['trial'] + 1}/{len(configs)} - Avg(100): {row['avg_reward']:.2f} - "
+                  f"Episodes: {row['episodes']}{' (stopped early)' if row['stopped_early'] else ''} - "
+                  + ', '.join(f"{name}={row[name]:g}" for name in DEFAULTS))
+            results = pd.DataFrame(rows, columns=RESULT_COLUMNS).sort_values('avg_reward', ascending=False)
+            results.to_csv(output_path, index=False)
+    return results
@@ -1,31 +1,117 @@
 from .environment import Environment
 from .Q_Learn import Q_Learn
+from .dense_q import DenseQLearn
+from .vector_env import VectorEnv
+from .parallel import ActorPool
+from .model_format import save_model, load_model, is_model_file, read_legacy_model, convert_legacy_model
+from .metrics import MetricsLog
+from .multi_agent import IndependentQLearners
+from .replay import ReplayBuffer
+from .policy import compile_policy
+from .evaluation import run_parallel_evaluation, summarize_evaluation
+from TrafficSimulator import grid_network_setup, RngContext
+import functools
 import os
+import numpy as np
+from collections import deque
 # Hyperparameter configuration
 ALPHA = 0.125
 GAMMA = 0.5
 EPSILON = 0.1
 EPSILON_MIN = 0.01  # Minimum epsilon
 EPSILON_DECAY = 0.995  # Decay rate per episode
+REPLAY_BATCH_SIZE = 32  # Transitions per replayed minibatch
+REPLAY_RATIO = 4  # Minibatches replayed per simulated step
 
 def store_q_data(destination_path, q_data):
-    """Persists Q-learning model data to storage"""
-    with open(destination_path, 'w') as storage_file:
-        storage_file.write(repr(q_data))
+    """Persists Q-learning model data to storage, in the binary model format"""
+    save_model(destination_path, q_data)
 
 def retrieve_q_data(source_path):
-    """Retrieves Q-learning model data from storage"""
-    with open(source_path, 'r') as storage_file:
-        return eval(storage_file.read().strip())
+    """Retrieves Q-learning model data from storage, binary or legacy text format"""
+    if is_model_file(source_path):
+        return load_model(source_path).to_q_data()
+    return read_legacy_model(source_path)
 
-def run_training_session(model, simulation_env, save_location, total_episodes: int, display: bool = False):
-    """Orchestrates the model training process"""
+class _TrainingProgress:
+    """
+    Episode bookkeeping shared by the training sessions: keeps the rewards of the last 100 episodes and the best
+    one, logs the episodes to metrics if given, decays the model's epsilon, reports the progress every 100 episodes
+    and asks should_stop whether to stop early
+    """
+
+    def __init__(self, model, total_episodes: int, metrics: MetricsLog = None, epsilon_min: float = EPSILON_MIN,
+                 epsilon_decay: float = EPSILON_DECAY, should_stop=None):
+        self.model = model
+        self.total_episodes = total_episodes
+        self.metrics = metrics
+        self.epsilon_min = epsilon_min
+        self.epsilon_decay = epsilon_decay
+        self.should_stop = should_stop
+        self.episode_rewards = deque(maxlen=100)  # Rewards of the last 100 episodes
+        self.best_reward = float('-inf')
+        self.n_episodes = 0
+
+    @property
+    def average_reward(self) -> float:
+        """Average reward of the last 100 episodes"""
+        return sum(self.episode_rewards) / len(self.episode_rewards) if self.episode_rewards else 0.0
+
+    def end_episode(self, total_reward: float, step_count: int) -> bool:
+        """Records a completed episode, returns whether the training should stop"""
+        self.n_episodes += 1
+        episode_num = self.n_episodes
+        self.episode_rewards.append(total_reward)
+        self.best_reward = max(self.best_reward, total_reward)
+        if self.metrics:
+            self.metrics.log_episode('training', episode_num, total_reward, step_count, self.model.epsilon,
+                                     len(self.model))
+
+        # Epsilon decay
+        if self.model.epsilon > self.epsilon_min:
+            self.model.epsilon *= self.epsilon_decay
+
+        if episode_num % 100 == 0:
+            print(f"Episode {episode_num}/{self.total_episodes} - Reward: {total_reward:.2f} - "
+                  f"Avg(100): {self.average_reward:.2f} - Best: {self.best_reward:.2f} - "
+                  f"Epsilon: {self.model.epsilon:.4f} - Steps: {step_count}")
+
+        if self.should_stop and self.should_stop(episode_num, self.average_reward):
+            print(f"Stopped early after {episode_num} episodes")
+            return True
+        return False
+
+    def finish(self, save_location):
+        """
+        Saves the model and prints the training summary.
+        Returns the number of episodes run, the average reward of the last 100 and the best reward
+        :param save_location: where the model is saved, None to keep it in memory only
+        """
+        if save_location is not None:
+            store_q_data(save_location, self.model.q_data)
+        print(f"\nTraining completed!")
+        print(f"Best episode reward: {self.best_reward:.2f}")
+        print(f"Average last 100 episodes: {self.average_reward:.2f}")
+        print(f"Q-table size: {len(self.model)} state-action pairs")
+        return self.n_episodes, self.average_reward, self.best_reward
+
+def run_training_session(model, simulation_env, save_location, total_episodes: int, display: bool = False,
+                         metrics: MetricsLog = None, epsilon_min: float = EPSILON_MIN,
+                         epsilon_decay: float = EPSILON_DECAY, should_stop=None):
+    """
+    Orchestrates the model training process, logging the episodes and trips to metrics if given.
+    Returns the number of episodes run, the average reward of the last 100 and the best reward
+    :param save_location: where the model is saved, None to keep it in memory only
+    :param should_stop: called after every episode with its number and the rolling Avg(100) reward, stops
+    the training early when it returns True, e.g. MedianStopping
+    """
     print(f"\nStarting {total_episodes} training episodes...")
     
-    episode_rewards = []
-    best_reward = float('-inf')
+    progress = _TrainingProgress(model, total_episodes, metrics, epsilon_min, epsilon_decay, should_stop)
     
     for episode_num in range(1, total_episodes + 1):
+        if metrics:
+            simulation_env.trip_listener = metrics.trip_recorder('training', episode_num)
         current_observation = simulation_env.restart_environment(enable_display=display)        
         total_reward = 0
         terminated = False
@@ -57,46 +143,174 @@ def run_training_session(model, simulation_env, save_location, total_episodes: i
             total_reward += reward
             step_count += 1
         
-        episode_rewards.append(total_reward)
-        
-        # Track best performance
-        if total_reward > best_reward:
-            best_reward = total_reward
-        
-        # Epsilon decay
-        if model.epsilon > EPSILON_MIN:
-            model.epsilon *= EPSILON_DECAY
-        
         if episode_num == 1:
             print(f"\nTotal steps in episode: {step_count}")
             print(f"Total reward: {total_reward:.2f}")
             print("======================\n")
-        
-        if episode_num % 100 == 0:
-            avg_reward_last_100 = sum(episode_rewards[-100:]) / 100
-            print(f"Episode {episode_num}/{total_episodes} - Reward: {total_reward:.2f} - "
-                  f"Avg(100): {avg_reward_last_100:.2f} - Best: {best_reward:.2f} - "
-                  f"Epsilon: {model.epsilon:.4f} - Steps: {step_count}")
 
-    store_q_data(save_location, model.q_data)
-    print(f"\nTraining completed!")
-    print(f"Best episode reward: {best_reward:.2f}")
-    print(f"Average last 100 episodes: {sum(episode_rewards[-100:]) / 100:.2f}")
-    print(f"Q-table size: {len(model.q_data)} state-action pairs")
+        if progress.end_episode(total_reward, step_count):
+            break
 
-    store_q_data(save_location, model.q_data)
+    results = progress.finish(save_location)
     print("Training session completed")
+    return results
+
+def run_replay_training_session(model, simulation_env, save_location, total_episodes: int, replay: ReplayBuffer,
+                                batch_size: int = REPLAY_BATCH_SIZE, replay_ratio: int = REPLAY_RATIO,
+                                metrics: MetricsLog = None, epsilon_min: float = EPSILON_MIN,
+                                epsilon_decay: float = EPSILON_DECAY, should_stop=None):
+    """
+    Trains the model on minibatches replayed from a buffer of past transitions, so every simulated
+    transition is learned several times. Takes and returns the same as run_training_session()
+    """
+    print(f"\nStarting {total_episodes} training episodes with experience replay "
+          f"({replay_ratio} minibatches of {batch_size} per step)...")
+
+    progress = _TrainingProgress(model, total_episodes, metrics, epsilon_min, epsilon_decay, should_stop)
+
+    for episode_num in range(1, total_episodes + 1):
+        if metrics:
+            simulation_env.trip_listener = metrics.trip_recorder('training', episode_num)
+        current_observation = simulation_env.restart_environment()
+        total_reward = 0
+        terminated = False
+        step_count = 0
+
+        while not terminated:
+            action_taken = model.select_action(current_observation)
+            new_observation, reward, terminated, interrupted = simulation_env.perform_step(action_taken)
+
+            if interrupted:
+                raise SystemExit("Simulation interrupted")
+
+            replay.add(current_observation, action_taken, new_observation, reward, terminated)
+            if len(replay) >= batch_size:
+                for _ in range(replay_ratio):
+                    replay.replay(model, batch_size)
+
+            current_observation = new_observation
+            total_reward += reward
+            step_count += 1
+
+        if progress.end_episode(total_reward, step_count):
+            break
+
+    return progress.finish(save_location)
+
+def run_vector_training_session(model, vector_env, save_location, total_episodes: int,
+                                metrics: MetricsLog = None, epsilon_min: float = EPSILON_MIN,
+                                epsilon_decay: float = EPSILON_DECAY, should_stop=None):
+    """
+    Trains the model on several environments stepped in lockstep by a VectorEnv, the episodes are counted in the
+    order they end. Takes and returns the same as run_training_session()
+    """
+    print(f"\nStarting {total_episodes} training episodes on {vector_env.n_envs} environments...")
+
+    progress = _TrainingProgress(model, total_episodes, metrics, epsilon_min, epsilon_decay, should_stop)
+    running_rewards = [0.0] * vector_env.n_envs
+    running_steps = [0] * vector_env.n_envs
+    states = [vector_env.observation_tuple(row) for row in vector_env.reset()]
+    stopped = total_episodes <= 0
+
+    while not stopped:
+        actions = [model.select_action(state) for state in states]
+        observations, rewards, dones, final_observations = vector_env.step(actions)
 
-def run_evaluation_session(model, simulation_env, total_episodes: int, display: bool = False):
-    """Assesses trained model performance"""
+        for i in range(vector_env.n_envs):
+            reward = float(rewards[i])
+            model.learn(states[i], actions[i], vector_env.observation_tuple(final_observations[i]), reward)
+            running_rewards[i] += reward
+            running_steps[i] += 1
+            states[i] = vector_env.observation_tuple(observations[i])
+
+            if dones[i] and not stopped:
+                stopped = (progress.end_episode(running_rewards[i], running_steps[i])
+                           or progress.n_episodes >= total_episodes)
+                running_rewards[i], running_steps[i] = 0.0, 0
+
+    return progress.finish(save_location)
+
+def run_parallel_training_session(model, save_location, total_episodes: int, n_workers: int,
+                                  refresh_interval: int = 20, max_dt=None, metrics: MetricsLog = None,
+                                  rng: RngContext = None, epsilon_min: float = EPSILON_MIN,
+                                  epsilon_decay: float = EPSILON_DECAY, should_stop=None):
+    """
+    Trains the model on transitions streamed by actor processes, each running its own environment with an
+    independent child context of rng. The episodes are learned in a fixed order, see ActorPool, so a seeded
+    run is reproducible whatever the timing of the processes. Returns the same as run_training_session()
+    """
+    print(f"\nStarting {total_episodes} training episodes on {n_workers} workers...")
+
+    progress = _TrainingProgress(model, total_episodes, metrics, epsilon_min, epsilon_decay, should_stop)
+
+    pool = ActorPool(n_workers, total_episodes, model, epsilon_min, epsilon_decay, max_dt, rng, refresh_interval)
+    try:
+        for episode_num, (transitions, total_reward, step_count) in enumerate(pool, start=1):
+            for current_observation, action_taken, new_observation, reward in transitions:
+                model.learn(current_observation, action_taken, new_observation, reward)
+
+            if progress.end_episode(total_reward, step_count):
+                break
+
+            # Publish the updated policy to the actors, at fixed episode numbers
+            if episode_num % refresh_interval == 0:
+                pool.refresh(model.q_data, episode_num)
+    finally:
+        pool.close()
+
+    return progress.finish(save_location)
+
+def run_multi_agent_training_session(learners, simulation_env, save_location, total_episodes: int,
+                                     metrics: MetricsLog = None, epsilon_min: float = EPSILON_MIN,
+                                     epsilon_decay: float = EPSILON_DECAY, should_stop=None):
+    """
+    Trains one learner per traffic signal of a multi-signal environment, on the per-signal rewards.
+    Takes and returns the same as run_training_session()
+    """
+    print(f"\nStarting {total_episodes} training episodes with {learners.n_agents} signal agents...")
+
+    progress = _TrainingProgress(learners, total_episodes, metrics, epsilon_min, epsilon_decay, should_stop)
+
+    for episode_num in range(1, total_episodes + 1):
+        if metrics:
+            simulation_env.trip_listener = metrics.trip_recorder('training', episode_num)
+        current_observation = simulation_env.restart_environment()
+        total_reward = 0
+        terminated = False
+        step_count = 0
+
+        while not terminated:
+            actions_taken = learners.select_actions(current_observation)
+            new_observation, reward, terminated, interrupted = simulation_env.perform_step(actions_taken)
+
+            if interrupted:
+                raise SystemExit("Simulation interrupted")
+
+            learners.learn_batch(current_observation, actions_taken, new_observation,
+                                 simulation_env.signal_rewards)
+            current_observation = new_observation
+            total_reward += reward
+            step_count += 1
+
+        if progress.end_episode(total_reward, step_count):
+            break
+
+    return progress.finish(save_location)
+
+def run_evaluation_session(model, simulation_env, total_episodes: int, display: bool = False,
+                           metrics: MetricsLog = None):
+    """Assesses trained model performance, logging the episodes and trips to metrics if given"""
     print(f"\nEvaluating model over {total_episodes} episodes...")
     
     total_reward_sum = 0
-    episode_rewards = []
+    best_reward, worst_reward = float('-inf'), float('inf')
 
     for episode_num in range(1, total_episodes + 1):
+        if metrics:
+            simulation_env.trip_listener = metrics.trip_recorder('evaluation', episode_num)
         current_observation = simulation_env.restart_environment(enable_display=display)
         episode_reward = 0
+        step_count = 0
         terminal_state = False
 
         while not terminal_state:
@@ -107,38 +321,172 @@ def run_evaluation_session(model, simulation_env, total_episodes: int, display:
                 raise SystemExit("Simulation interrupted")
             
             episode_reward += reward
+            step_count += 1
 
-        episode_rewards.append(episode_reward)
+        best_reward, worst_reward = max(best_reward, episode_reward), min(worst_reward, episode_reward)
         total_reward_sum += episode_reward
+        if metrics:
+            q_table_size = len(model)
+            metrics.log_episode('evaluation', episode_num, episode_reward, step_count, model.epsilon, q_table_size)
         print(f"Episode {episode_num}: Total reward: {episode_reward:.2f}")
     
     print(f"\nEvaluation Results ({total_episodes} episodes):")
     print(f"Average reward per episode: {total_reward_sum/total_episodes:.2f}")
-    print(f"Best episode reward: {max(episode_rewards):.2f}")
-    print(f"Worst episode reward: {min(episode_rewards):.2f}")
+    print(f"Best episode reward: {best_reward:.2f}")
+    print(f"Worst episode reward: {worst_reward:.2f}")
+
+def run_parallel_evaluation_session(model_path: str, total_episodes: int, n_workers: int, seed: int = 0,
+                                    max_dt=None, metrics: MetricsLog = None, q_table_size: int = None,
+                                    grid=None, shared_table: bool = False):
+    """
+    Assesses a saved model's greedy policy on seeded episodes spread over worker processes, or run in this
+    process with a single worker, and reports every evaluation metric with its 95% bootstrap confidence
+    interval. The episodes and trips are logged to metrics if given
+    :param q_table_size: size of the evaluated model logged with the episodes, the model's number of states
+    or of state-action pairs
+    :param grid: (n_rows, n_cols) of the grid network controlled by the model, see run_parallel_evaluation()
+    """
+    print(f"\nEvaluating {model_path} over {total_episodes} episodes with {n_workers} "
+          f"worker{'s' if n_workers > 1 else ''}...")
+    results = run_parallel_evaluation(model_path, total_episodes, n_workers, seed, max_dt, grid=grid,
+                                      shared_table=shared_table, record_trips=metrics is not None)
+    if metrics:
+        for episode_num, episode in enumerate(results.itertuples(), 1):
+            metrics.log_episode('evaluation', episode_num, episode.reward, episode.steps, 0.0, q_table_size)
+            metrics.log_trips('evaluation', episode_num, episode.trips)
 
-def launch_q_learning_simulation(num_episodes: int, render: bool, mode: bool):
-    sim_env = Environment()
+    print(f"\nEvaluation Results ({total_episodes} episodes, seed {seed}):")
+    for metric, (mean, low, high) in summarize_evaluation(results).iterrows():
+        print(f"{metric}: {mean:.3f} (95% CI {low:.3f} to {high:.3f})")
+    print(f"Best episode reward: {results['reward'].max():.2f}")
+    print(f"Worst episode reward: {results['reward'].min():.2f}")
+    return results
+
+def check_training_options(n_envs: int = 1, n_workers: int = 1, dense: bool = False, grid=None,
+                           replay_capacity: int = 0) -> None:
+    """Raises ValueError for a combination of training options launch_q_learning_simulation() can't run together"""
+    options = [name for name, enabled in (('replay', replay_capacity), ('grid', grid), ('workers', n_workers > 1),
+                                          ('envs', n_envs > 1)) if enabled]
+    if len(options) > 1:
+        raise ValueError(f"Options {' and '.join(options)} can't be combined, they select different training loops")
+    if dense and grid:
+        raise ValueError("Option dense doesn't apply to a grid, whose learners store their Q-tables in arrays")
+
+def launch_q_learning_simulation(num_episodes: int, render: bool, mode: bool, n_envs: int = 1,
+                                 n_workers: int = 1, dense: bool = False, max_dt=None, metrics_dir=None,
+                                 render_fps=None, record_dir=None, record_every: int = 10,
+                                 record_format: str = 'png', grid=None, shared_table: bool = False,
+                                 replay_capacity: int = 0, prioritized: bool = False, policy_path=None,
+                                 training_cycles: int = 10000, eval_workers: int = 1, eval_seed: int = 0,
+                                 seed=None):
+    """
+    :param grid: (n_rows, n_cols) to control a grid network with one learner per traffic signal, see
+    IndependentQLearners, instead of the two-way intersection with a single learner
+    :param replay_capacity: trains with experience replay from a buffer of that many transitions, if not 0
+    :param prioritized: with replay_capacity, replays the transitions with prioritized sampling
+    :param policy_path: where to save the evaluated model compiled into a frozen policy, see FrozenPolicy
+    :param training_cycles: number of training episodes, which also names the saved model
+    :param eval_workers: evaluates the saved model headless in that many processes, or in this process if 1,
+    see run_parallel_evaluation_session(). Rendered and recorded evaluations run in this process
+    :param eval_seed: seed of the headless evaluation episodes
+    :param seed: seed of the random streams of the simulations, learners and actor processes, see RngContext.
+    None for fresh entropy
+    """
+    if grid and grid[0] * grid[1] < 2:
+        raise ValueError("A grid network needs several junctions, a 1x1 grid is the two-way intersection")
+    check_training_options(n_envs, n_workers, dense, grid, replay_capacity)
+    rng = RngContext(seed)
+    if grid:
+        sim_env = Environment(max_dt=max_dt, render_fps=render_fps,
+                              network=functools.partial(grid_network_setup, *grid), rng=rng)
+    else:
+        sim_env = Environment(max_dt=max_dt, render_fps=render_fps, rng=rng)
     action_options = sim_env.action_set
     
-    q_model = Q_Learn(
-        learning_parameter=ALPHA,
-        exploration_parameter=EPSILON,
-        discount_parameter=GAMMA,
-        action_space=action_options
-    )
-    
-    training_cycles = 10000
-    model_storage_path = f"model_{training_cycles}.dat"
+    if grid:
+        q_model = IndependentQLearners(ALPHA, EPSILON, GAMMA, action_options, grid[0] * grid[1], shared_table,
+                                       rng=rng.generator('learner'))
+    else:
+        model_class = DenseQLearn if dense else Q_Learn
+        q_model = model_class(
+            learning_parameter=ALPHA,
+            exploration_parameter=EPSILON,
+            discount_parameter=GAMMA,
+            action_space=action_options,
+            rng=rng.generator('learner')
+        )
     
-    if mode:  # Più pythonic che "mode == True"
-        run_training_session(q_model, sim_env, model_storage_path, training_cycles, False)
+    model_name = f"model_{training_cycles}"
+    if grid:
+        model_name += f"_grid{grid[0]}x{grid[1]}{'_shared' if shared_table else ''}"
+    model_storage_path = f"{model_name}.qtb"
+    legacy_model_path = f"{model_name}.dat"
     
+    metrics = MetricsLog(metrics_dir) if metrics_dir else None
+    try:
+        if mode:  # Più pythonic che "mode == True"
+            if grid:
+                run_multi_agent_training_session(q_model, sim_env, model_storage_path, training_cycles, metrics)
+            elif replay_capacity:
+                run_replay_training_session(q_model, sim_env, model_storage_path, training_cycles,
+                                            ReplayBuffer(replay_capacity, prioritized,
+                                                         encoder=getattr(q_model, 'encoder', None),
+                                                         rng=rng.generator('replay')),
+                                            metrics=metrics)
+                print(f"Simulation updates computed: {sim_env.n_ticks}")
+            elif n_workers > 1:
+                run_parallel_training_session(q_model, model_storage_path, training_cycles, n_workers,
+                                              max_dt=max_dt, metrics=metrics, rng=rng)
+            elif n_envs > 1:
+                run_vector_training_session(q_model, VectorEnv(n_envs, rng), model_storage_path, training_cycles,
+                                            metrics=metrics)
+            else:
+                run_training_session(q_model, sim_env, model_storage_path, training_cycles, False, metrics)
+                print(f"Simulation updates computed: {sim_env.n_ticks}")
+        # Only the evaluation episodes are recorded
+        sim_env.record_dir, sim_env.record_every, sim_env.record_format = record_dir, record_every, record_format
+        _evaluate_saved_model(q_model, sim_env, model_storage_path, legacy_model_path, num_episodes, render,
+                              metrics, policy_path, eval_workers, eval_seed, headless=not render and not record_dir,
+                              grid=grid, shared_table=shared_table)
+    finally:
+        sim_env.close()
+        if metrics:
+            metrics.close()
+
+def _evaluate_saved_model(q_model, sim_env, model_storage_path, legacy_model_path, num_episodes, render,
+                          metrics, policy_path=None, eval_workers: int = 1, eval_seed: int = 0,
+                          headless: bool = True, grid=None, shared_table: bool = False):
+    """
+    Loads the saved model, if any, and evaluates its greedy policy: on seeded episodes in eval_workers
+    processes if headless, see run_parallel_evaluation_session(), otherwise in sim_env
+    """
+    # Convert the model saved in the legacy text format
+    if not os.path.exists(model_storage_path) and os.path.exists(legacy_model_path):
+        print(f"Converting {legacy_model_path} to {model_storage_path}")
+        convert_legacy_model(legacy_model_path, model_storage_path)
+
     # ✅ FIX: Solo carica se il file esiste
-    if os.path.exists(model_storage_path):
-        saved_q_data = retrieve_q_data(model_storage_path)
-        q_model.q_data = saved_q_data
-    else:
+    if not os.path.exists(model_storage_path):
         print(f"Warning: Model file {model_storage_path} not found. Using untrained model.")
-    
-    run_evaluation_session(q_model, sim_env, num_episodes, render)
\ No newline at end of file
+        run_evaluation_session(q_model, sim_env, num_episodes, render, metrics)
+        return
+    if isinstance(q_model, IndependentQLearners):
+        if not headless:
+            q_model.q_data = retrieve_q_data(model_storage_path)
+            q_model.epsilon = 0.0  # Greedy, without the exploration left over from training
+            run_evaluation_session(q_model, sim_env, num_episodes, render, metrics)
+            return
+        q_table_size = int(np.count_nonzero(load_model(model_storage_path).visited))
+    else:
+        # Evaluation only needs the greedy policy, compiled from the memory-mapped table into a read-only lookup
+        policy = compile_policy(load_model(model_storage_path), q_model.actions, seed=0)
+        if policy_path:
+            policy.save(policy_path)
+            print(f"Frozen policy saved to {policy_path}")
+        if not headless:
+            run_evaluation_session(policy, sim_env, num_episodes, render, metrics)
+            return
+        q_table_size = len(policy)
+    # The workers memory-map the model file, sharing its pages
+    run_parallel_evaluation_session(model_storage_path, num_episodes, eval_workers, eval_seed, sim_env.max_dt,
+                                    metrics, q_table_size, grid, shared_table)
\ No newline at end of file
@@ -0,0 +1,75 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .environment import Environment
+from TrafficSimulator.rng import RngContext
+from TrafficSimulator.vehicle_engine import VehicleEngine
+
+
+class VectorEnv:
+    """
+    Runs n independent two-way intersection environments in lockstep.
+    All the simulations share one vehicle engine, so every simulation tick advances
+    the vehicles of all the environments in a single batched engine step.
+    """
+
+    def __init__(self, n_envs: int, rng: Optional[RngContext] = None):
+        """
+        :param rng: random streams of the run, each environment getting an independent child context. None to
+        draw the vehicle arrivals from the global numpy random state
+        """
+        self.n_envs: int = n_envs
+        self.engine: VehicleEngine = VehicleEngine()
+        env_rngs = rng.spawn(n_envs) if rng is not None else [None] * n_envs
+        self.envs: List[Environment] = [Environment(engine=self.engine, rng=env_rng) for env_rng in env_rngs]
+        self.action_space: List = self.envs[0].action_space
+
+    @staticmethod
+    def observation_tuple(observation: np.ndarray) -> Tuple:
+        """Converts a stacked observation row back to the Environment state tuple."""
+        signal_state, n_direction_1_vehicles, n_direction_2_vehicles, non_empty_junction = observation.tolist()
+        return bool(signal_state), n_direction_1_vehicles, n_direction_2_vehicles, bool(non_empty_junction)
+
+    def reset(self) -> np.ndarray:
+        """Resets every environment, returns the stacked initial observations."""
+        return np.array([env.restart_environment() for env in self.envs], dtype=np.int64)
+
+    def step(self, actions: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Performs one control interval in every environment.
+        Finished environments are reset automatically: their returned observation is the initial observation
+        of the next episode, while final_observations holds the observation the episode ended with.
+        :return: (observations, rewards, dones, final_observations)
+        """
+        self._run_lockstep(actions)
+
+        observations = np.zeros((self.n_envs, 4), dtype=np.int64)
+        final_observations = np.zeros((self.n_envs, 4), dtype=np.int64)
+        rewards = np.zeros(self.n_envs)
+        dones = np.zeros(self.n_envs, dtype=bool)
+        for i, env in enumerate(self.envs):
+            state, rewards[i], dones[i], _ = env.complete_step()
+            final_observations[i] = state
+            observations[i] = env.restart_environment() if dones[i] else state
+        return observations, rewards, dones, final_observations
+
+    def _run_lockstep(self, actions: Sequence[int]) -> None:
+        """Runs Simulation.run() of every environment, stepping the shared engine once per tick."""
+        runs = {}
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            self.engine.set_running(env.sim.engine_keys, True)
+            runs[i] = env.sim.run_ticks(action)
+        dt = self.envs[0].sim.dt
+
+        while runs:
+            for i in list(runs):
+                try:
+                    next(runs[i])
+                except StopIteration:
+                    # The environment completed its control interval, freeze its vehicles
+                    del runs[i]
+                    self.engine.set_running(self.envs[i].sim.engine_keys, False)
+            if runs:
+                self.engine.regulate()
+                self.engine.step(dt)
@@ -1,5 +1,14 @@
 import numpy as np
 import unittest
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from Reinf_Learn.Q_Learn import Q_Learn
+from Reinf_Learn.dense_q import DenseQLearn
 
 
 class SimpleGridWorld:
@@ -221,6 +230,78 @@ class TestQLearning(unittest.TestCase):
     
     
 
+class TestDenseQLearn(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        states = [(bool(rng.integers(2)), int(rng.integers(5)), int(rng.integers(5)), bool(rng.integers(2)))
+                  for _ in range(2001)]
+        self.transitions = [(states[i], int(rng.integers(2)), states[i + 1], float(rng.normal()))
+                            for i in range(2000)]
+
+    def test_matches_dict_backend(self):
+        """Dense Q-table must learn exactly the same values as the dict-backed Q_Learn"""
+        dict_model = Q_Learn(0.125, 0.1, 0.5, [0, 1])
+        dense_model = DenseQLearn(0.125, 0.1, 0.5, [0, 1])
+        for transition in self.transitions:
+            dict_model.learn(*transition)
+            dense_model.learn(*transition)
+
+        self.assertEqual(dense_model.q_data, dict_model.q_data)
+        self.assertEqual(len(dense_model), len(dict_model))
+        for state, _, _, _ in self.transitions:
+            self.assertEqual(dense_model.compute_state_value(state), dict_model.compute_state_value(state))
+            values = [dict_model.get_action_value(state, action) for action in [0, 1]]
+            if values[0] != values[1]:
+                self.assertEqual(dense_model.determine_optimal_action(state), int(np.argmax(values)))
+
+    def test_q_data_round_trip(self):
+        """Loading q_data must restore the values and the incremental best actions"""
+        model = DenseQLearn(0.125, 0.1, 0.5, [0, 1])
+        for transition in self.transitions:
+            model.learn(*transition)
+
+        restored = DenseQLearn(0.125, 0.1, 0.5, [0, 1])
+        restored.q_data = model.q_data
+        self.assertEqual(restored.q_data, model.q_data)
+        for state, _, _, _ in self.transitions:
+            self.assertEqual(restored.compute_state_value(state), model.compute_state_value(state))
+
+    def test_batched_updates_match_dict_backend(self):
+        """Minibatches must learn the same values in both backends, repeated pairs and bootstrapping from pairs
+        updated in the same batch included"""
+        dict_model = Q_Learn(0.125, 0.1, 0.5, [0, 1])
+        dense_model = DenseQLearn(0.125, 0.1, 0.5, [0, 1])
+        for start in range(0, len(self.transitions), 8):
+            states, actions, next_states, rewards = map(list, zip(*self.transitions[start:start + 8]))
+            dones = [i % 3 == 0 for i in range(len(states))]
+            weights = np.linspace(0.5, 1, len(states))
+            dict_errors = dict_model.learn_batch(states, actions, next_states, rewards, dones, weights)
+            dense_errors = dense_model.learn_batch(states, actions, next_states, rewards, dones, weights)
+            np.testing.assert_allclose(dense_errors, dict_errors)
+
+        self.assertEqual(dense_model.q_data.keys(), dict_model.q_data.keys())
+        for key, value in dict_model.q_data.items():
+            self.assertAlmostEqual(dense_model.q_data[key], value)
+        for state, _, _, _ in self.transitions:
+            self.assertAlmostEqual(dense_model.compute_state_value(state), dict_model.compute_state_value(state))
+
+    def test_batched_duplicate_updates(self):
+        """Repeated pairs of a minibatch count as that many successive updates towards their mean target"""
+        for model in (Q_Learn(0.5, 0.1, 0.5, [0, 1]), DenseQLearn(0.5, 0.1, 0.5, [0, 1])):
+            state, next_state = (False, 1, 0, False), (True, 0, 0, False)
+            model.learn_batch([state] * 3, [1] * 3, [next_state] * 3, [1.0, 2.0, 3.0])
+            self.assertAlmostEqual(model.get_action_value(state, 1), (1 - 0.5 ** 3) * 2.0)
+            self.assertEqual(model.determine_optimal_action(state), 1)
+
+    def test_encoder_is_bounded(self):
+        model = DenseQLearn(0.125, 0.1, 0.5, [0, 1], n_states=2)
+        model.learn((False, 0, 0, False), 0, (False, 0, 0, False), 1.0)
+        model.learn((False, 1, 0, False), 0, (False, 0, 0, False), 1.0)
+        with self.assertRaises(OverflowError):
+            model.learn((False, 2, 0, False), 0, (False, 0, 0, False), 1.0)
+
+
 def run_visual_demo():
    
     
@@ -0,0 +1,45 @@
+import unittest
+import os
+import sys
+import tempfile
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from Benchmarks import run_benchmarks, save_results, load_results, compare_results
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def setUp(self):
+        self.baseline = {
+            'simulation.update': {'value': 1000.0, 'unit': 'ticks/s', 'higher_is_better': True},
+            'model.retrieve': {'value': 0.01, 'unit': 's', 'higher_is_better': False},
+        }
+
+    def test_regressions_respect_the_metric_direction(self):
+        results = {
+            'simulation.update': {'value': 850.0, 'unit': 'ticks/s', 'higher_is_better': True},
+            'model.retrieve': {'value': 0.005, 'unit': 's', 'higher_is_better': False},
+            'new.benchmark': {'value': 1.0, 'unit': 's', 'higher_is_better': False},
+        }
+        comparisons = {name: regressed for name, *_, regressed in compare_results(self.baseline, results, 0.1)}
+        self.assertEqual(comparisons, {'simulation.update': True, 'model.retrieve': False})
+
+        comparisons = {name: regressed for name, *_, regressed in compare_results(self.baseline, results, 0.2)}
+        self.assertFalse(comparisons['simulation.update'])
+
+    def test_results_round_trip(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'results.json')
+        save_results(path, self.baseline)
+        self.assertEqual(load_results(path), self.baseline)
+
+    def test_quick_run(self):
+        results = run_benchmarks(['q_learning'], quick=True)
+        self.assertIn('q_learn.learn', results)
+        self.assertTrue(all(result['value'] > 0 for result in results.values()))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
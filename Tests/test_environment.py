@@ -8,6 +8,7 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
 from Reinf_Learn.environment import Environment
+from Reinf_Learn.vector_env import VectorEnv
 
 class TestEnvironment(unittest.TestCase):
     
@@ -62,7 +63,10 @@ class TestEnvironment(unittest.TestCase):
         
         mock_signal.roads = [[mock_road_1], [mock_road_2]]
         mock_sim.traffic_signals = [mock_signal]
+        mock_sim.signal_vehicle_counts.return_value = [5, 3]
         mock_sim.n_vehicles_on_map = 8
+        mock_sim.n_outbound_vehicles = 0
+        mock_sim.junction_vehicle_count.return_value = 0
         mock_sim.outbound_roads = []
         mock_sim.roads = []
         
@@ -107,7 +111,10 @@ class TestEnvironment(unittest.TestCase):
         
         mock_signal.roads = [[mock_road_1], [mock_road_2]]
         mock_sim.traffic_signals = [mock_signal]
+        mock_sim.signal_vehicle_counts.return_value = [4, 6]
         mock_sim.n_vehicles_on_map = 10
+        mock_sim.n_outbound_vehicles = 0
+        mock_sim.junction_vehicle_count.return_value = 0
         mock_sim.outbound_roads = []
         mock_sim.roads = []
         
@@ -121,6 +128,36 @@ class TestEnvironment(unittest.TestCase):
         self.assertIsInstance(state[3], bool, "Element 3 must be boolean occupancy")
   
 
+class TestVectorEnv(unittest.TestCase):
+
+    def test_lockstep_step_and_auto_reset(self):
+        """VectorEnv must return stacked results and reset finished environments"""
+        vector_env = VectorEnv(3)
+        for env in vector_env.envs:
+            env.max_gen = 5
+        observations = vector_env.reset()
+        self.assertEqual(observations.shape, (3, 4))
+
+        n_done = 0
+        for _ in range(40):
+            observations, rewards, dones, final_observations = vector_env.step([1, 0, 1])
+            self.assertEqual(observations.shape, (3, 4))
+            self.assertEqual(rewards.shape, (3,))
+            self.assertEqual(dones.dtype, bool)
+            n_done += int(dones.sum())
+
+            # The shared engine must hold exactly the vehicles of the current simulations
+            n_vehicles_on_map = sum(env.sim.n_vehicles_on_map for env in vector_env.envs)
+            self.assertEqual(vector_env.engine.n_vehicles, n_vehicles_on_map)
+            for i in range(3):
+                if dones[i]:
+                    self.assertEqual(vector_env.envs[i].sim.t, 0)
+                else:
+                    self.assertTrue((observations[i] == final_observations[i]).all())
+
+        self.assertGreater(n_done, 0, "Episodes with 5 vehicles must complete within 40 steps")
+
+
 if __name__ == '__main__':
     # Run with maximum verbosity to see what's happening
     unittest.main(verbosity=2)
\ No newline at end of file
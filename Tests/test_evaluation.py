@@ -0,0 +1,88 @@
+import functools
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from Reinf_Learn import Environment, Q_Learn
+from Reinf_Learn.evaluation import bootstrap_ci, load_evaluated_policy, run_parallel_evaluation, summarize_evaluation
+from Reinf_Learn.multi_agent import IndependentQLearners
+from Reinf_Learn.utils import store_q_data
+from TrafficSimulator import grid_network_setup
+
+
+class TestParallelEvaluation(unittest.TestCase):
+
+    def test_bootstrap_ci(self):
+        """The confidence interval must contain the mean, and narrow with more samples"""
+        rng = np.random.default_rng(0)
+        mean, low, high = bootstrap_ci(rng.normal(5, 2, 100))
+        self.assertLess(low, mean)
+        self.assertLess(mean, high)
+        _, large_low, large_high = bootstrap_ci(rng.normal(5, 2, 10000), n_resamples=1000)
+        self.assertLess(large_high - large_low, high - low)
+        self.assertLess(large_low, 5)
+        self.assertGreater(large_high, 5)
+        self.assertEqual(bootstrap_ci([1.0, 1.0, 1.0]), (1.0, 1.0, 1.0))
+
+    def test_reproducible_across_workers(self):
+        """Episode results must only depend on the evaluation seed, not on the number of workers"""
+        environment = Environment(max_gen=5)
+        model = Q_Learn(0.5, 0.2, 0.5, environment.action_set)
+        for _ in range(5):
+            observation = environment.restart_environment()
+            terminated = False
+            while not terminated:
+                action = model.select_action(observation)
+                next_observation, reward, terminated, _ = environment.perform_step(action)
+                model.learn(observation, action, next_observation, reward)
+                observation = next_observation
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.qtb')
+            store_q_data(path, model.q_data)
+            serial = run_parallel_evaluation(path, 6, 1, seed=3, max_gen=5, max_steps=200, chunk_size=2,
+                                             record_trips=True)
+            parallel = run_parallel_evaluation(path, 6, 2, seed=3, max_gen=5, max_steps=200, chunk_size=2,
+                                               record_trips=True)
+            other_seed = run_parallel_evaluation(path, 6, 2, seed=4, max_gen=5, max_steps=200, chunk_size=2)
+        self.assertTrue(serial.equals(parallel))
+        self.assertFalse(serial['seed'].equals(other_seed['seed']))
+        self.assertEqual(len(serial), 6)
+        self.assertTrue((serial['throughput'] > 0).all())
+        self.assertTrue(all(len(trips) > 0 for trips in serial['trips']))
+
+        summary = summarize_evaluation(serial, n_resamples=200)
+        self.assertEqual(len(summary), 4)
+        self.assertTrue((summary['ci_low'] <= summary['mean']).all())
+        self.assertTrue((summary['mean'] <= summary['ci_high']).all())
+
+    def test_grid_model(self):
+        """Grid models must be evaluated by their learners, without exploration"""
+        environment = Environment(max_gen=5, network=functools.partial(grid_network_setup, 1, 2))
+        learners = IndependentQLearners(0.5, 0.2, 0.5, environment.action_set, 2)
+        observation = environment.restart_environment()
+        for _ in range(50):
+            actions = learners.select_action(observation)
+            next_observation, reward, terminated, _ = environment.perform_step(actions)
+            learners.learn(observation, actions, next_observation, reward)
+            observation = environment.restart_environment() if terminated else next_observation
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.qtb')
+            store_q_data(path, learners.q_data)
+            self.assertEqual(load_evaluated_policy(path, (1, 2)).epsilon, 0.0)
+            results = run_parallel_evaluation(path, 2, 1, max_gen=5, max_steps=100, grid=(1, 2))
+            self.assertTrue(results.equals(run_parallel_evaluation(path, 2, 1, max_gen=5, max_steps=100,
+                                                                   grid=(1, 2))))
+        self.assertEqual(len(results), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
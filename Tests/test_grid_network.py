@@ -0,0 +1,83 @@
+import unittest
+import functools
+import os
+import sys
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from Reinf_Learn import Environment
+from TrafficSimulator import grid_network_setup, VehicleEngine
+from TrafficSimulator.two_way_intersection import ROADS, PATHS, INTERSECTIONS_DICT, t12, t42, t72, t102
+
+
+class TestGridNetwork(unittest.TestCase):
+
+    def test_single_junction_grid_is_the_two_way_intersection(self):
+        """A 1x1 grid must lay out the two_way_intersection roads, paths and conflicts, without the left turns"""
+        sim = grid_network_setup(1, 1)
+        kept = [*range(12), *t12, *t42, *t72, *t102]
+        index = {road: i for i, road in enumerate(kept)}
+        np.testing.assert_allclose([(road.start, road.end) for road in sim.roads], [ROADS[i] for i in kept],
+                                   atol=1e-9)
+        intersections = {index[road]: {index[other] for other in others if other in index}
+                         for road, others in INTERSECTIONS_DICT.items() if road in index}
+        self.assertEqual(sim._intersections, {road: others for road, others in intersections.items() if others})
+        generated_paths = sorted(tuple(path) for generator in sim.generators for _, path in generator._paths)
+        self.assertEqual(generated_paths, sorted(tuple(index[road] for road in path) for _, path in PATHS))
+
+    def test_every_road_is_used(self):
+        """Every road of the grid must be on a generated path"""
+        sim = grid_network_setup(2, 3)
+        used = {road for generator in sim.generators for _, path in generator._paths for road in path}
+        self.assertEqual(used, set(range(len(sim.roads))))
+
+    def test_paths_are_connected(self):
+        """Every road of a generated path must start where the previous one ends"""
+        sim = grid_network_setup(3, 4)
+        self.assertEqual(len(sim.traffic_signals), 12)
+        for generator in sim.generators:
+            for _, path in generator._paths:
+                for previous, road in zip(path, path[1:]):
+                    np.testing.assert_allclose(sim.roads[previous].end, sim.roads[road].start, atol=1e-9)
+
+    def test_joint_action_switches_the_selected_signals(self):
+        sim = grid_network_setup(2, 2)
+        sim.run([1, 0, 0, 1])
+        self.assertEqual([signal.current_cycle_index for signal in sim.traffic_signals], [2, 0, 0, 2])
+        sim.run(1)
+        self.assertEqual([signal.current_cycle_index for signal in sim.traffic_signals], [0, 2, 2, 0])
+
+    def test_vehicle_counters_match_recomputation(self):
+        np.random.seed(3)
+        sim = grid_network_setup(2, 3, engine=VehicleEngine())
+        for tick in range(1500):
+            sim.update()
+            if tick % 300 == 0:
+                sim._update_signals([tick // 300 % 6])
+            if tick % 100 == 0:
+                for i, signal in enumerate(sim.traffic_signals):
+                    self.assertEqual(sim.signal_vehicle_counts(i),
+                                     [sum(len(road.vehicles) for road in group) for group in signal.roads])
+                self.assertEqual(sim.n_outbound_vehicles,
+                                 sum(len(sim.roads[i].vehicles) for i in sim.outbound_roads))
+        self.assertEqual(sum(sim._vehicle_counts), sim.n_vehicles_on_map)
+
+    def test_multi_signal_environment(self):
+        """Observations hold one tuple per signal, and the reward counts the vehicles of every signal"""
+        np.random.seed(0)
+        env = Environment(network=functools.partial(grid_network_setup, 2, 2))
+        state = env.restart_environment()
+        self.assertEqual(env.n_signals, 4)
+        self.assertEqual(len(state), 4)
+        self.assertTrue(all(len(signal_state) == 4 for signal_state in state))
+        state, reward, _, _ = env.perform_step([0, 1, 0, 0])
+        self.assertEqual(env._last_state_vehicle_count, sum(s[1] + s[2] for s in state))
+        self.assertIsInstance(reward, float)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,71 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import numpy as np
+
+from TrafficSimulator import Simulation, two_way_intersection_setup, instrumentation
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        self.original_update = Simulation.__dict__['update']
+        self.sim = two_way_intersection_setup()
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.reset()
+
+    def test_methods_are_untouched_while_disabled(self):
+        self.assertFalse(instrumentation.is_enabled())
+        for _ in range(10):
+            self.sim.update()
+        self.assertIs(Simulation.__dict__['update'], self.original_update)
+        self.assertEqual(instrumentation.stats(), {})
+
+    def test_phases_are_counted_while_enabled(self):
+        instrumentation.enable()
+        self.assertIsNot(Simulation.__dict__['update'], self.original_update)
+        for _ in range(10):
+            self.sim.update()
+        stats = instrumentation.stats()
+        self.assertEqual(stats['simulation.update'][0], 10)
+        self.assertEqual(stats['simulation.roads'][0], 10)
+        self.assertGreaterEqual(stats['simulation.update'][1], stats['simulation.roads'][1])
+        self.assertIn('simulation.update', instrumentation.summary())
+
+        instrumentation.disable()
+        self.assertIs(Simulation.__dict__['update'], self.original_update)
+        self.sim.update()
+        self.assertEqual(instrumentation.stats()['simulation.update'][0], 10)
+
+    def test_chrome_trace_export(self):
+        instrumentation.enable(trace=True, max_events=5)
+        for _ in range(10):
+            self.sim.update()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.json')
+            instrumentation.export_chrome_trace(path)
+            with open(path) as trace_file:
+                events = json.load(trace_file)['traceEvents']
+        self.assertEqual(len(events), 5)
+        for event in events:
+            self.assertEqual(event['ph'], 'X')
+            self.assertGreaterEqual(event['dur'], 0)
+
+    def test_export_requires_trace(self):
+        instrumentation.enable()
+        with self.assertRaises(RuntimeError):
+            instrumentation.export_chrome_trace(os.devnull)
+
+
+if __name__ == '__main__':
+    unittest.main()
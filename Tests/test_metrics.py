@@ -0,0 +1,75 @@
+import unittest
+import os
+import sys
+import tempfile
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import numpy as np
+
+from Reinf_Learn import Environment, Q_Learn
+from Reinf_Learn.metrics import MetricsLog, read_log, iter_log
+from Reinf_Learn.utils import run_evaluation_session, ALPHA, EPSILON, GAMMA
+
+
+class TestMetricsLog(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+
+    def test_episodes_are_written_in_chunks(self):
+        with MetricsLog(self.directory, chunk_size=4) as metrics:
+            for episode in range(1, 11):
+                metrics.log_episode('training', episode, -episode / 10, 30 + episode, 0.1, 2 * episode)
+
+        self.assertEqual(len(os.listdir(os.path.join(self.directory, 'episodes'))), 3)
+        episodes = read_log(self.directory, 'episodes')
+        self.assertEqual(list(episodes['episode']), list(range(1, 11)))
+        self.assertEqual(list(episodes['steps']), [30 + episode for episode in range(1, 11)])
+        self.assertEqual(set(episodes['session']), {'training'})
+
+        chunks = list(iter_log(self.directory, 'episodes', columns=['reward']))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+        self.assertEqual(list(chunks[0].columns), ['reward'])
+
+    def test_reopened_log_appends(self):
+        for _ in range(2):
+            with MetricsLog(self.directory) as metrics:
+                metrics.log_episode('evaluation', 1, 0.5, 10, 0.1, 4)
+        self.assertEqual(len(read_log(self.directory, 'episodes')), 2)
+
+    def test_empty_table(self):
+        MetricsLog(self.directory).close()
+        self.assertTrue(read_log(self.directory, 'trips').empty)
+
+    def test_write_errors_are_recorded(self):
+        metrics = MetricsLog(self.directory, chunk_size=2)
+        os.rmdir(os.path.join(self.directory, 'episodes'))
+        for episode in range(1, 6):
+            metrics.log_episode('training', episode, 0.0, 10, 0.1, 4)
+        metrics.close()
+
+        self.assertFalse(metrics._writer.is_alive())
+        self.assertEqual(metrics.n_failed_records + metrics.n_dropped_records, 5)
+        self.assertIsInstance(metrics.write_error, OSError)
+
+    def test_evaluation_logs_the_trips(self):
+        np.random.seed(0)
+        model = Q_Learn(ALPHA, EPSILON, GAMMA, [0, 1])
+        env = Environment()
+        with MetricsLog(self.directory) as metrics:
+            run_evaluation_session(model, env, 2, metrics=metrics)
+
+        episodes = read_log(self.directory, 'episodes')
+        self.assertEqual(list(episodes['episode']), [1, 2])
+        trips = read_log(self.directory, 'trips')
+        self.assertEqual(set(trips['episode']), {1, 2})
+        self.assertEqual(len(trips[trips['episode'] == 2]), env.sim.n_vehicles_generated - env.sim.n_vehicles_on_map)
+        self.assertTrue((trips['travel_time'] >= trips['wait_time']).all())
+        self.assertTrue((trips['travel_time'] > 0).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from Reinf_Learn.model_format import (
+    save_model,
+    load_model,
+    is_model_file,
+    read_legacy_model,
+    convert_legacy_model
+)
+from Reinf_Learn.utils import store_q_data, retrieve_q_data
+
+LEGACY_MODEL = os.path.join(parent_dir, 'model_10000.dat')
+
+
+class TestModelFormat(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.q_data = {
+            ((False, 11, 8, True), 0): 0.33808379699935287,
+            ((False, 11, 8, True), 1): -1.25,
+            ((True, 0, 6, True), 0): -2.05330376042813,
+        }
+
+    def test_round_trip(self):
+        """Saved models must load back to the exact same Q-values and state types"""
+        path = os.path.join(self.test_dir, 'model.qtb')
+        store_q_data(path, self.q_data)
+        self.assertTrue(is_model_file(path))
+
+        loaded = retrieve_q_data(path)
+        self.assertEqual(loaded, self.q_data)
+        for state, action in loaded:
+            self.assertEqual([type(value) for value in state], [bool, int, int, bool])
+
+    def test_tables_are_memory_mapped(self):
+        path = os.path.join(self.test_dir, 'model.qtb')
+        save_model(path, self.q_data)
+        table = load_model(path)
+
+        self.assertIsInstance(table.values, np.memmap)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.actions, [0, 1])
+        self.assertEqual(table.state(0), (False, 11, 8, True))
+        with self.assertRaises(ValueError):
+            table.values[0, 0] = 1.0  # Read-only
+
+    def test_state_lookup(self):
+        """States must be found in the memory-mapped table without decoding it, unknown states as -1"""
+        path = os.path.join(self.test_dir, 'model.qtb')
+        save_model(path, self.q_data)
+        table = load_model(path)
+        states = [(True, 0, 6, True), (False, 11, 8, True), (True, 11, 6, True), (False, -1, 8, True)]
+        self.assertEqual(table.rows(states).tolist(), [1, 0, -1, -1])
+        self.assertEqual([table.index.row(state) for state in states], [1, 0, -1, -1])
+        self.assertEqual(table.index.row((True, 0, 6)), -1)
+
+    def test_empty_model(self):
+        path = os.path.join(self.test_dir, 'model.qtb')
+        save_model(path, {})
+        self.assertEqual(load_model(path).to_q_data(), {})
+
+    def test_legacy_conversion(self):
+        """Converting the shipped text model must preserve every Q-value"""
+        path = os.path.join(self.test_dir, 'model_10000.qtb')
+        convert_legacy_model(LEGACY_MODEL, path)
+
+        self.assertFalse(is_model_file(LEGACY_MODEL))
+        self.assertEqual(retrieve_q_data(path), read_legacy_model(LEGACY_MODEL))
+        self.assertEqual(retrieve_q_data(LEGACY_MODEL), read_legacy_model(LEGACY_MODEL))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
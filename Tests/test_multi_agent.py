@@ -0,0 +1,94 @@
+import unittest
+import functools
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from Reinf_Learn import Environment, IndependentQLearners
+from Reinf_Learn.Q_Learn import Q_Learn
+from Reinf_Learn.utils import run_multi_agent_training_session, retrieve_q_data, _evaluate_saved_model
+from TrafficSimulator import grid_network_setup
+
+
+def random_states(n_agents, n_steps, seed=0):
+    rng = np.random.default_rng(seed)
+    return [[(bool(rng.integers(2)), int(rng.integers(4)), int(rng.integers(4)), bool(rng.integers(2)))
+             for _ in range(n_agents)] for _ in range(n_steps)]
+
+
+class TestIndependentQLearners(unittest.TestCase):
+
+    def test_batched_updates_match_separate_learners(self):
+        """Every learner must learn as a Q_Learn fed with its own transitions"""
+        n_agents = 5
+        learners = IndependentQLearners(0.125, 0.1, 0.5, [0, 1], n_agents)
+        separate = [Q_Learn(0.125, 0.1, 0.5, [0, 1]) for _ in range(n_agents)]
+        states = random_states(n_agents, 300)
+        rng = np.random.default_rng(1)
+        for state, next_state in zip(states, states[1:]):
+            actions = rng.integers(0, 2, n_agents).tolist()
+            rewards = rng.normal(size=n_agents)
+            learners.learn_batch(state, actions, next_state, rewards)
+            for i, model in enumerate(separate):
+                model.learn(state[i], actions[i], next_state[i], rewards[i])
+
+        expected = {((i, *state), action): value for i, model in enumerate(separate)
+                    for (state, action), value in model.q_data.items()}
+        self.assertEqual(learners.q_data.keys(), expected.keys())
+        for key, value in expected.items():
+            self.assertAlmostEqual(learners.q_data[key], value)
+
+    def test_shared_table_duplicate_updates(self):
+        """Learners updating the same pair of a shared table must count as that many successive updates"""
+        learners = IndependentQLearners(0.5, 0.1, 0.5, [0, 1], 3, shared_table=True)
+        state, next_state = (False, 1, 0, False), (True, 0, 0, False)
+        learners.learn_batch([state] * 3, [1, 1, 1], [next_state] * 3, 1.0)
+        self.assertAlmostEqual(learners.q_data[(state, 1)], 1 - 0.5 ** 3)
+        self.assertEqual(len(learners.encoders), 1)
+
+    def test_greedy_actions(self):
+        learners = IndependentQLearners(0.5, 0.0, 0.5, [0, 1], 2)
+        states = [(False, 1, 0, False), (False, 1, 0, False)]
+        learners.learn_batch(states, [1, 0], states, [1.0, 1.0])
+        self.assertEqual(learners.select_actions(states), [1, 0])
+
+    def test_q_data_round_trip(self):
+        for shared_table in (False, True):
+            learners = IndependentQLearners(0.125, 0.1, 0.5, [0, 1], 3, shared_table)
+            states = random_states(3, 50)
+            for state, next_state in zip(states, states[1:]):
+                learners.learn_batch(state, learners.select_actions(state), next_state, [0.5, -1.0, 0.0])
+            restored = IndependentQLearners(0.125, 0.1, 0.5, [0, 1], 3, shared_table)
+            restored.q_data = learners.q_data
+            self.assertEqual(restored.q_data, learners.q_data)
+            self.assertEqual(len(restored), len(learners.q_data))
+            np.testing.assert_array_equal(restored.values, learners.values)
+
+    def test_grid_training_session(self):
+        """Learners are trained on the per-signal rewards of a grid environment, and the model saved"""
+        np.random.seed(0)
+        env = Environment(network=functools.partial(grid_network_setup, 1, 2))
+        env.max_gen = 10
+        # Seeded: a greedy policy can keep a signal red forever, and the evaluated episode would never end
+        learners = IndependentQLearners(0.125, 0.1, 0.5, env.action_set, 2, rng=np.random.default_rng(1))
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'model.qtb')
+        run_multi_agent_training_session(learners, env, path, 2)
+        self.assertEqual(env.signal_rewards.shape, (2,))
+        self.assertEqual(retrieve_q_data(path), learners.q_data)
+        self.assertTrue(learners.q_data)
+
+        # Evaluated greedily, without the exploration left over from training
+        with patch('builtins.print'):
+            _evaluate_saved_model(learners, env, path, 'model.dat', 1, False, None, headless=False)
+        self.assertEqual(learners.epsilon, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,79 @@
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from Reinf_Learn import Q_Learn, compile_policy, load_policy
+from Reinf_Learn.model_format import load_model, save_model
+
+
+class TestFrozenPolicy(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        states = [(bool(rng.integers(2)), int(rng.integers(8)), int(rng.integers(8)), bool(rng.integers(2)))
+                  for _ in range(3001)]
+        self.model = Q_Learn(0.125, 0.0, 0.5, [0, 1])
+        for i in range(3000):
+            self.model.learn(states[i], int(rng.integers(2)), states[i + 1], float(rng.normal()))
+        self.states = sorted({state for state, _ in self.model.q_data})
+
+    def test_greedy_actions(self):
+        """The policy must pick the learner's best action, the first one on ties without a seed"""
+        policy = compile_policy(self.model.q_data, [0, 1])
+        for state in self.states:
+            values = [self.model.get_action_value(state, action) for action in [0, 1]]
+            self.assertEqual(policy.select_action(state), int(np.argmax(values)))
+        self.assertEqual(policy.select_action((True, 99, 0, False)), 0)  # Never seen
+
+    def test_batched_actions_match_single_decisions(self):
+        policy = compile_policy(self.model.q_data, [0, 1], seed=3)
+        unknown = [(True, 99, 0, False), (False, 8, 8, True)]
+        actions = policy.act(self.states + unknown)
+        self.assertEqual(actions[:-2].tolist(), [policy.select_action(state) for state in self.states])
+        self.assertTrue(set(actions[-2:].tolist()) <= {0, 1})
+        np.testing.assert_array_equal(policy.act(np.array(self.states, dtype=np.int64)), actions[:-2])
+
+    def test_seeded_tie_breaking_is_reproducible(self):
+        q_data = {((False, i, 0, False), action): 1.0 for i in range(50) for action in [0, 1]}
+        first = compile_policy(q_data, [0, 1], seed=7).act([state for state, _ in q_data])
+        second = compile_policy(q_data, [0, 1], seed=7).act([state for state, _ in q_data])
+        np.testing.assert_array_equal(first, second)
+        self.assertEqual(set(first.tolist()), {0, 1})
+
+    def test_compiled_from_the_model_file(self):
+        """A policy compiled from a memory-mapped table must match the one compiled from the dict"""
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'model.qtb')
+        save_model(path, self.model.q_data)
+        for seed in (None, 5):
+            policy = compile_policy(load_model(path), [0, 1], seed)
+            self.assertIsInstance(policy.states, np.memmap)
+            np.testing.assert_array_equal(policy.act(self.states),
+                                          compile_policy(self.model.q_data, [0, 1], seed).act(self.states))
+
+        # Actions missing from the table count as unlearned
+        only_action_1 = {(state, 1): value for (state, action), value in self.model.q_data.items() if action == 1}
+        save_model(path, only_action_1)
+        np.testing.assert_array_equal(compile_policy(load_model(path), [0, 1]).act(self.states),
+                                      compile_policy(only_action_1, [0, 1]).act(self.states))
+
+    def test_save_and_load(self):
+        policy = compile_policy(self.model.q_data, [0, 1], seed=1)
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'policy.npz')
+        policy.save(path)
+        loaded = load_policy(path)
+        self.assertEqual(len(loaded), len(policy))
+        self.assertEqual(loaded.seed, 1)
+        for state in self.states:
+            self.assertEqual(loaded.select_action(state), policy.select_action(state))
+        np.testing.assert_array_equal(loaded.act(self.states), policy.act(self.states))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,119 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # Headless display, also used by the renderer process
+
+import numpy as np
+
+from TrafficSimulator import two_way_intersection_setup
+from TrafficSimulator.recorder import Recorder
+from TrafficSimulator.renderer import Renderer
+from TrafficSimulator.window import Window
+
+
+def run_simulation(sim, n_ticks):
+    for tick in range(n_ticks):
+        if tick % 200 == 0:
+            sim._update_signals()
+        sim.update()
+
+
+class TestRendering(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        self.sim = two_way_intersection_setup()
+
+    def tearDown(self):
+        self.sim.close_gui()
+
+    def test_frame_snapshots_the_simulation(self):
+        run_simulation(self.sim, 600)
+        frame = self.sim.frame()
+        self.sim.update()
+
+        self.assertEqual(len(frame.vehicles), self.sim.n_vehicles_on_map)
+        self.assertNotEqual(frame.t, self.sim.t)  # Immutable, later updates don't change it
+        self.assertEqual(frame.signal_cycle_indexes, (self.sim.traffic_signals[0].current_cycle_index,))
+        for road_index, position, length, width in frame.vehicles:
+            self.assertLessEqual(position, self.sim.roads[road_index].length)
+
+    def test_window_draws_every_update(self):
+        self.sim.init_gui()
+        self.assertIsInstance(self.sim._gui, Window)
+        run_simulation(self.sim, 20)
+        self.assertFalse(self.sim.gui_closed)
+
+    def test_vehicle_polygons_match_the_drawn_boxes(self):
+        run_simulation(self.sim, 600)
+        self.sim.init_gui()
+        window = self.sim._gui
+        window._zoom, window._offset = 3.5, (12.3, -4.1)
+        frame = self.sim.frame()
+
+        polygons = window._vehicle_polygons(frame)
+        self.assertEqual(polygons.shape, (len(frame.vehicles), 4, 2))
+        for points, (road_index, position, length, width) in zip(polygons.tolist(), frame.vehicles):
+            road = self.sim.roads[road_index]
+            cos, sin = road.angle_cos, road.angle_sin
+            x, y = road.start[0] + cos * position, road.start[1] + sin * position
+            expected = window._convert([(x + (e1 * length * cos + e2 * width * sin) / 2,
+                                         y + (e1 * length * sin - e2 * width * cos) / 2)
+                                        for e1, e2 in [(-1, -1), (-1, 1), (1, 1), (1, -1)]])
+            self.assertEqual([tuple(point) for point in points], expected)
+
+    def test_static_layer_is_redrawn_on_zoom(self):
+        self.sim.init_gui()
+        window = self.sim._gui
+        static_layer = window._static_layer
+        self.sim.update()
+        self.assertIs(window._static_layer, static_layer)
+        window._zoom *= 2
+        self.sim.update()
+        self.assertIsNot(window._static_layer, static_layer)
+
+    def test_recording_writes_every_nth_update(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.sim.start_recording(directory, every=20)
+            self.sim._recorder._buffer_size = 1000  # Keep every frame
+            run_simulation(self.sim, 200)
+            self.sim.stop_recording()
+            self.assertEqual(sorted(os.listdir(directory)), [f'frame_{n:06d}.png' for n in range(10)])
+
+    def test_raw_recording(self):
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = Recorder(self.sim, directory, every=5, frame_format='raw', buffer_size=2)
+            for _ in range(200):
+                self.sim.update()
+                recorder.update(self.sim)
+            recorder.close()
+            with open(os.path.join(directory, 'frames.json')) as metadata_file:
+                metadata = json.load(metadata_file)
+            self.assertEqual(metadata['n_frames'] + recorder.n_dropped_frames, 40)
+            self.assertEqual(os.path.getsize(os.path.join(directory, 'frames.rgb')),
+                             metadata['n_frames'] * metadata['width'] * metadata['height'] * 3)
+            self.assertEqual(metadata['fps'], 12)
+
+    def test_renderer_skips_frames(self):
+        self.sim.init_gui(fps=20)
+        renderer = self.sim._gui
+        self.assertIsInstance(renderer, Renderer)
+        self.assertEqual(renderer.n_frames, 1)  # init_gui sends the first frame once the window is open
+
+        run_simulation(self.sim, 3000)
+        self.assertFalse(self.sim.gui_closed)
+        self.assertLess(renderer.n_frames, 3000)
+
+        self.sim.close_gui()
+        self.assertTrue(renderer.closed)
+        self.assertFalse(renderer._process.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from Reinf_Learn import DenseQLearn, ReplayBuffer
+
+
+def state(i):
+    return (bool(i % 2), i, 0, False)
+
+
+class TestReplayBuffer(unittest.TestCase):
+
+    def test_ring_buffer_keeps_the_last_transitions(self):
+        buffer = ReplayBuffer(5, rng=np.random.default_rng(0))
+        for i in range(8):
+            buffer.add(state(i), i % 2, state(i + 1), float(i), i == 7)
+        self.assertEqual(len(buffer), 5)
+
+        batch = buffer.sample(200)
+        self.assertEqual(set(batch.rewards.tolist()), {3.0, 4.0, 5.0, 6.0, 7.0})
+        for s, action, next_s, reward, done in zip(buffer.decode(batch.states), batch.actions,
+                                                   buffer.decode(batch.next_states), batch.rewards,
+                                                   batch.dones):
+            i = int(reward)
+            self.assertEqual((s, action, next_s, done), (state(i), i % 2, state(i + 1), i == 7))
+        np.testing.assert_array_equal(batch.weights, 1)
+
+    def test_prioritized_sampling(self):
+        """Transitions are drawn in proportion to their priority, and weighted against the bias"""
+        buffer = ReplayBuffer(4, prioritized=True, priority_exponent=1.0, importance_exponent=1.0,
+                              rng=np.random.default_rng(0))
+        for i in range(4):
+            buffer.add(state(i), 0, state(i + 1), float(i), False)
+        buffer.update_priorities(np.arange(4), np.array([1.0, 1.0, 1.0, 7.0]))
+
+        batch = buffer.sample(20000)
+        frequencies = np.bincount(batch.indexes, minlength=4) / 20000
+        np.testing.assert_allclose(frequencies, [0.1, 0.1, 0.1, 0.7], atol=0.02)
+        np.testing.assert_allclose(batch.weights[batch.indexes == 3], 1 / 7, rtol=1e-5)
+        np.testing.assert_allclose(batch.weights[batch.indexes == 0], 1)
+
+        # New transitions get the highest priority
+        buffer.add(state(4), 0, state(5), 4.0, False)
+        self.assertAlmostEqual(buffer._priorities[0], 7.0 + 1e-6)
+
+    def test_replay_with_the_model_encoder(self):
+        """A model sharing the buffer's encoder must learn the same values from the encoded states"""
+        shared_model = DenseQLearn(0.125, 0.1, 0.5, [0, 1])
+        model = DenseQLearn(0.125, 0.1, 0.5, [0, 1])
+        shared_buffer = ReplayBuffer(50, prioritized=True, encoder=shared_model.encoder)
+        buffer = ReplayBuffer(50, prioritized=True)
+        for i in range(100):
+            for replay_buffer in (shared_buffer, buffer):
+                replay_buffer.add(state(i % 7), i % 2, state((i + 1) % 7), float(i % 3), i % 10 == 9)
+        for seed in range(20):
+            shared_buffer.rng, buffer.rng = np.random.default_rng(seed), np.random.default_rng(seed)
+            shared_errors = shared_buffer.replay(shared_model, 16)
+            np.testing.assert_allclose(buffer.replay(model, 16), shared_errors)
+        self.assertEqual(shared_model.q_data, model.q_data)
+
+    def test_empty_buffer(self):
+        with self.assertRaises(ValueError):
+            ReplayBuffer(4).sample(1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
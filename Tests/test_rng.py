@@ -0,0 +1,75 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from Reinf_Learn import DenseQLearn, Environment, Q_Learn
+from TrafficSimulator import RngContext
+
+
+def run_episodes(rng: RngContext, model_class=Q_Learn, n_episodes: int = 3):
+    """Trains a model from the streams of a context, returns the episode rewards and the Q-values"""
+    environment = Environment(max_gen=8, rng=rng)
+    model = model_class(0.5, 0.3, 0.5, environment.action_set, rng=rng.generator('learner'))
+    rewards = []
+    for _ in range(n_episodes):
+        observation = environment.restart_environment()
+        total_reward = 0
+        terminated = False
+        while not terminated:
+            action = model.select_action(observation)
+            next_observation, reward, terminated, _ = environment.perform_step(action)
+            model.learn(observation, action, next_observation, reward)
+            observation = next_observation
+            total_reward += reward
+        rewards.append(total_reward)
+    return rewards, model.q_data
+
+
+class TestRngContext(unittest.TestCase):
+
+    def test_named_streams(self):
+        """Named streams must be reproducible, independent of each other and of their creation order"""
+        first, second = RngContext(5), RngContext(5)
+        traffic = first.generator('traffic').random(4)
+        self.assertIs(first.generator('traffic'), first.generator('traffic'))
+        second.generator('learner').random(100)
+        np.testing.assert_array_equal(second.generator('traffic').random(4), traffic)
+        self.assertFalse(np.array_equal(first.generator('learner').random(4),
+                                        RngContext(6).generator('learner').random(4)))
+
+        children = RngContext(5).spawn(2)
+        np.testing.assert_array_equal(children[1].generator('traffic').random(4),
+                                      RngContext(5).spawn(2)[1].generator('traffic').random(4))
+        self.assertFalse(np.array_equal(children[0].generator('traffic').random(4),
+                                        RngContext(5).spawn(2)[1].generator('traffic').random(4)))
+
+    def test_reproducible_training(self):
+        """Training runs seeded alike must be identical, whatever the global random states"""
+        for model_class in (Q_Learn, DenseQLearn):
+            np.random.seed(0)
+            rewards, q_data = run_episodes(RngContext(11), model_class)
+            np.random.seed(1)
+            same_rewards, same_q_data = run_episodes(RngContext(11), model_class)
+            self.assertEqual(rewards, same_rewards)
+            self.assertEqual(q_data, same_q_data)
+        other_rewards, _ = run_episodes(RngContext(12))
+        self.assertNotEqual(rewards, other_rewards)
+
+    def test_reseeded_episode(self):
+        """Restarting with a context must replay the episode's vehicle arrivals"""
+        environment = Environment(max_gen=8)
+        environment.restart_environment(rng=RngContext(3))
+        arrivals = [generator.state[1:3] for generator in environment.sim.generators]
+        environment.restart_environment()
+        environment.restart_environment(rng=RngContext(3))
+        self.assertEqual([generator.state[1:3] for generator in environment.sim.generators], arrivals)
+
+
+if __name__ == '__main__':
+    unittest.main()
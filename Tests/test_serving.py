@@ -0,0 +1,95 @@
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from Reinf_Learn import compile_policy
+from Reinf_Learn.serving import PolicyServer, PolicyClient
+
+
+class TestPolicyServer(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.states = [(bool(rng.integers(2)), int(rng.integers(8)), int(rng.integers(8)), bool(rng.integers(2)))
+                       for _ in range(200)]
+        q_data = {(state, int(rng.integers(2))): float(rng.normal()) for state in self.states}
+        self.policy = compile_policy(q_data, [0, 1], seed=0)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+    def start_server(self, **address):
+        self.server = PolicyServer(self.policy)
+        asyncio.run_coroutine_threadsafe(self.server.start(**address), self.loop).result(5)
+
+    def test_loopback_decisions(self):
+        """Pipelined and concurrent requests must get the policy's actions, decided in batches"""
+        self.start_server(port=0)
+        host, port = self.server.address[:2]
+        expected = self.policy.act(self.states).tolist()
+
+        results = {}
+
+        def run_client(i):
+            with PolicyClient(host, port) as client:
+                results[i] = client.act_many(self.states)
+
+        threads = [threading.Thread(target=run_client, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(results, {i: expected for i in range(4)})
+
+        with PolicyClient(host, port) as client:
+            self.assertEqual(client.act(self.states[0]), expected[0])
+            with self.assertRaises(ValueError):
+                client.act((True, 1))
+            stats = client.stats()
+        self.assertEqual(stats['decisions'], 4 * len(self.states) + 1)
+        self.assertLess(stats['batches'], stats['decisions'])
+        self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+
+    def test_invalid_requests(self):
+        """Invalid states must be answered with an error, and the server must keep deciding the next requests"""
+        self.start_server(port=0)
+        host, port = self.server.address[:2]
+        with PolicyClient(host, port) as client:
+            for state in ([0, 99999999999999999999999, 0, 0], [0, 1, 2], [0, 1.5, 2, 0], 'state'):
+                with self.assertRaises(ValueError):
+                    client.act(state)
+            self.assertEqual(client.act(self.states[0]), self.policy.act(self.states[:1]).item())
+
+        self.policy.act = lambda states: 1 / 0  # A failing batch
+        with PolicyClient(host, port) as client:
+            with self.assertRaises(ValueError):
+                client.act(self.states[0])
+        del self.policy.act
+        with PolicyClient(host, port) as client:
+            self.assertEqual(client.act(self.states[1]), self.policy.act(self.states[1:2]).item())
+        self.assertFalse(self.server._batcher.done())
+
+    @unittest.skipUnless(hasattr(__import__('socket'), 'AF_UNIX'), "Unix sockets are not available")
+    def test_unix_socket(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'policy.sock')
+        self.start_server(path=path)
+        with PolicyClient(path=path) as client:
+            self.assertEqual(client.act_many(self.states[:10]), self.policy.act(self.states[:10]).tolist())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,266 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from TrafficSimulator import collision, grid_network_setup, two_way_intersection_setup, VehicleEngine
+from TrafficSimulator.collision import ConflictIndex, NETWORK_CACHE_SIZE
+from TrafficSimulator.road import Road
+from TrafficSimulator.vehicle import Vehicle
+from TrafficSimulator.vehicle_generator import VehicleGenerator
+from TrafficSimulator.vehicle_engine import TOLERANCE
+
+
+def run_simulation(sim, n_ticks, signal_period=200):
+    """Runs a simulation for n_ticks, switching the traffic signals every signal_period ticks"""
+    for tick in range(n_ticks):
+        if tick % signal_period == 0:
+            sim._update_signals()
+        sim.update()
+        if sim.completed:
+            break
+    return sim
+
+
+class TestVehicleEngine(unittest.TestCase):
+
+    def test_engine_matches_scalar_dynamics(self):
+        """The vectorized engine must reproduce the per-vehicle Road.update() dynamics"""
+        np.random.seed(7)
+        scalar_sim = run_simulation(two_way_intersection_setup(), 3000)
+        np.random.seed(7)
+        engine_sim = run_simulation(two_way_intersection_setup(engine=VehicleEngine()), 3000)
+
+        self.assertEqual(scalar_sim.n_vehicles_generated, engine_sim.n_vehicles_generated)
+        self.assertEqual(scalar_sim.n_vehicles_on_map, engine_sim.n_vehicles_on_map)
+        self.assertEqual(scalar_sim.non_empty_roads, engine_sim.non_empty_roads)
+        self.assertAlmostEqual(scalar_sim.current_average_wait_time, engine_sim.current_average_wait_time, places=6)
+        for scalar_road, engine_road in zip(scalar_sim.roads, engine_sim.roads):
+            self.assertEqual(len(scalar_road.vehicles), len(engine_road.vehicles))
+            for scalar_vehicle, engine_vehicle in zip(scalar_road.vehicles, engine_road.vehicles):
+                self.assertAlmostEqual(scalar_vehicle.x, engine_vehicle.x, delta=TOLERANCE)
+                self.assertAlmostEqual(scalar_vehicle.v, engine_vehicle.v, delta=TOLERANCE)
+                self.assertEqual(scalar_vehicle.is_stopped, engine_vehicle.is_stopped)
+
+    def test_engine_releases_vehicles_leaving_the_map(self):
+        """Vehicles that completed their journey must free their engine slot"""
+        np.random.seed(7)
+        engine = VehicleEngine()
+        sim = run_simulation(two_way_intersection_setup(max_gen=10, engine=engine), 20000)
+
+        self.assertTrue(sim.completed)
+        self.assertEqual(engine.n_vehicles, sim.n_vehicles_on_map)
+
+
+class TestConflictIndex(unittest.TestCase):
+
+    def test_detect_matches_brute_force(self):
+        """Conflict windows must not miss any pair of vehicles closer than the collision radius"""
+        rng = np.random.default_rng(0)
+        sim = two_way_intersection_setup()
+        index = ConflictIndex(sim.roads, sim._intersections, radius=3)
+
+        for _ in range(300):
+            for road in sim.roads:
+                road.vehicles.clear()
+            non_empty_roads = set(int(i) for i in rng.choice(len(sim.roads), size=6, replace=False))
+            for i in non_empty_roads:
+                road = sim.roads[i]
+                for x in sorted(rng.uniform(0, road.length, size=2), reverse=True):
+                    vehicle = Vehicle([i])
+                    vehicle.x = x
+                    vehicle.position = (road.start[0] + road.angle_cos * x, road.start[1] + road.angle_sin * x)
+                    road.vehicles.append(vehicle)
+
+            intersections = {main: others & non_empty_roads for main, others in sim._intersections.items()
+                             if main in non_empty_roads and others & non_empty_roads}
+            expected = any(np.hypot(vehicle.position[0] - other.position[0],
+                                    vehicle.position[1] - other.position[1]) < 3
+                           for main, others in intersections.items()
+                           for vehicle in sim.roads[main].vehicles
+                           for i in others for other in sim.roads[i].vehicles)
+            self.assertEqual(index.detect(sim.roads, intersections), expected)
+
+    def test_network_indexes_are_bounded(self):
+        """Identical networks must share their index, and only the last networks' indexes be kept"""
+        sim = two_way_intersection_setup()
+        self.assertIs(two_way_intersection_setup()._conflicts, sim._conflicts)
+        for size in range(2, NETWORK_CACHE_SIZE + 3):
+            grid_network_setup(1, size)
+        self.assertEqual(len(collision._NETWORK_INDEXES), NETWORK_CACHE_SIZE)
+        self.assertIsNot(two_way_intersection_setup()._conflicts, sim._conflicts)
+
+
+class TestOccupancyTracker(unittest.TestCase):
+
+    def test_active_intersections_match_recomputation(self):
+        """The incrementally maintained intersections must equal the ones rebuilt from the non-empty roads"""
+        np.random.seed(3)
+        sim = two_way_intersection_setup()
+        for tick in range(3000):
+            if tick % 200 == 0:
+                sim._update_signals()
+            sim.update()
+            expected = {road: sim._intersections[road] & sim.non_empty_roads for road in sim.non_empty_roads
+                        if sim._intersections.get(road, set()) & sim.non_empty_roads}
+            self.assertEqual(sim.intersections, expected)
+
+    def test_vehicle_counters_match_recomputation(self):
+        """The incrementally maintained vehicle counters must equal the counts of the roads' vehicles"""
+        np.random.seed(5)
+        sim = two_way_intersection_setup(engine=VehicleEngine())
+        for tick in range(3000):
+            if tick % 200 == 0:
+                sim._update_signals()
+            sim.update()
+            if tick == 1500:
+                snapshot = sim.snapshot()
+            if tick % 100 == 0:
+                self.assertEqual(sim.n_outbound_vehicles,
+                                 sum(len(sim.roads[i].vehicles) for i in sim.outbound_roads))
+                self.assertEqual(sim.signal_vehicle_counts(0),
+                                 [sum(len(road.vehicles) for road in group) for group in sim.traffic_signals[0].roads])
+        sim.restore(snapshot)
+        self.assertEqual(sim.signal_vehicle_counts(0),
+                         [sum(len(road.vehicles) for road in group) for group in sim.traffic_signals[0].roads])
+        sim.reset()
+        self.assertEqual((sim.n_outbound_vehicles, sim.signal_vehicle_counts(0)), (0, [0, 0]))
+
+
+class TestVehicleGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.roads = {0: Road((0, 0), (50, 0), index=0), 1: Road((0, 10), (50, 10), index=1)}
+        self.paths = [[3, [0]], [1, [1]]]
+
+    def test_generates_only_when_due(self):
+        np.random.seed(0)
+        generator = VehicleGenerator(30, self.paths, self.roads)  # A vehicle every 2 seconds
+
+        self.assertIsNotNone(generator.update(0, 0))
+        self.assertIsNone(generator.update(1.9, 1))
+        self.assertFalse(generator.is_due(1.9, 1))
+        self.assertEqual(generator.next_generation_time, 2)
+        for road in self.roads.values():
+            road.vehicles.clear()
+        self.assertIsNotNone(generator.update(2, 1))
+
+    def test_blocked_arrival_waits_for_space(self):
+        np.random.seed(0)
+        generator = VehicleGenerator(60, [[1, [0]]], self.roads)
+        generator.update(0, 0)
+        self.assertIsNone(generator.update(1, 1))  # The first vehicle didn't move
+        self.roads[0].vehicles[-1].x = 10
+        self.assertEqual(generator.update(1.5, 1), 0)
+        self.assertEqual(len(self.roads[0].vehicles), 2)
+
+    def test_poisson_arrivals_follow_the_weights_and_rate(self):
+        np.random.seed(0)
+        generator = VehicleGenerator(30, self.paths, self.roads, arrival_process='poisson', batch_size=20000)
+
+        self.assertAlmostEqual(np.mean(generator._headways), 2, delta=0.05)
+        self.assertAlmostEqual(np.mean(np.array(generator._path_indexes) == 0), 0.75, delta=0.02)
+
+    def test_idle_ticks_are_skipped(self):
+        """Skipping the updates of an empty map must not change the simulation"""
+        np.random.seed(2)
+        updated_sim = two_way_intersection_setup(vehicle_rate=2)
+        for _ in range(20 * 180):
+            updated_sim.update()
+        np.random.seed(2)
+        skipping_sim = two_way_intersection_setup(vehicle_rate=2)
+        for _ in range(20):
+            skipping_sim.run()
+
+        self.assertLess(skipping_sim.n_ticks, updated_sim.n_ticks)
+        self.assertAlmostEqual(skipping_sim.t, updated_sim.t)  # Skipped ticks add up n * dt at once
+        self.assertEqual(skipping_sim.n_vehicles_generated, updated_sim.n_vehicles_generated)
+        for skipping_road, updated_road in zip(skipping_sim.roads, updated_sim.roads):
+            self.assertEqual([vehicle.x for vehicle in skipping_road.vehicles],
+                             [vehicle.x for vehicle in updated_road.vehicles])
+
+
+class TestSnapshot(unittest.TestCase):
+
+    @staticmethod
+    def vehicles_state(sim):
+        return [[(vehicle.x, vehicle.v, vehicle.a, vehicle.is_stopped) for vehicle in road.vehicles]
+                for road in sim.roads]
+
+    def check_restore_replays(self, engine=None):
+        np.random.seed(4)
+        sim = run_simulation(two_way_intersection_setup(engine=engine), 1000)
+        snapshot = sim.snapshot()
+        run_simulation(sim, 600, signal_period=100)
+        expected = (sim.t, sim.n_vehicles_generated, sim.non_empty_roads.copy(), self.vehicles_state(sim))
+
+        for _ in range(2):  # A snapshot can be restored several times
+            sim.restore(snapshot)
+            run_simulation(sim, 600, signal_period=100)
+            self.assertEqual((sim.t, sim.n_vehicles_generated, sim.non_empty_roads, self.vehicles_state(sim)),
+                             expected)
+            self.assertEqual(sim.intersections, {road: sim._intersections[road] & sim.non_empty_roads
+                                                 for road in sim.non_empty_roads
+                                                 if sim._intersections.get(road, set()) & sim.non_empty_roads})
+        if engine:
+            self.assertEqual(engine.n_vehicles, sim.n_vehicles_on_map)
+
+    def test_restore_replays_the_simulation(self):
+        self.check_restore_replays()
+
+    def test_restore_replays_the_engine_simulation(self):
+        self.check_restore_replays(VehicleEngine())
+
+    def test_reset_empties_the_simulation(self):
+        engine = VehicleEngine()
+        sim = run_simulation(two_way_intersection_setup(engine=engine), 1000)
+        sim.reset()
+
+        self.assertEqual((sim.t, sim.n_vehicles_generated, sim.n_vehicles_on_map, engine.n_vehicles), (0, 0, 0, 0))
+        self.assertFalse(sim.non_empty_roads or sim.intersections)
+        self.assertEqual(sim.traffic_signals[0].current_cycle_index, 0)
+        run_simulation(sim, 1000)
+        self.assertGreater(sim.n_vehicles_generated, 0)
+
+
+class TestAdaptiveTimeStepping(unittest.TestCase):
+
+    def run_intervals(self, max_dt, n_intervals=40, engine=None):
+        """Runs a light-traffic simulation for n_intervals control intervals"""
+        np.random.seed(5)
+        sim = two_way_intersection_setup(max_dt=max_dt, vehicle_rate=10, engine=engine)
+        for i in range(n_intervals):
+            sim.run(i % 4 == 0)
+        return sim
+
+    def test_fixed_time_step_by_default(self):
+        sim = self.run_intervals(None)
+        self.assertEqual(sim.n_ticks, 40 * 180 + 10 * 180)
+
+    def test_adaptive_time_step_covers_the_same_duration(self):
+        """Merged updates must cover the control intervals with fewer updates, and a similar traffic"""
+        fixed_sim = self.run_intervals(None)
+        adaptive_sim = self.run_intervals(0.25)
+
+        self.assertAlmostEqual(adaptive_sim.t, fixed_sim.t, places=6)
+        self.assertLess(adaptive_sim.n_ticks, 0.8 * fixed_sim.n_ticks)
+        self.assertFalse(adaptive_sim.collision_detected)
+        self.assertEqual(adaptive_sim.n_vehicles_generated, fixed_sim.n_vehicles_generated)
+        self.assertLessEqual(abs(adaptive_sim.n_vehicles_on_map - fixed_sim.n_vehicles_on_map), 1)
+
+    def test_engine_merges_the_same_ticks(self):
+        """The horizon computed from the engine arrays must match the one computed from the vehicles"""
+        scalar_sim = self.run_intervals(0.25)
+        engine_sim = self.run_intervals(0.25, engine=VehicleEngine())
+
+        self.assertEqual(engine_sim.n_ticks, scalar_sim.n_ticks)
+        self.assertEqual(engine_sim.n_vehicles_on_map, scalar_sim.n_vehicles_on_map)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
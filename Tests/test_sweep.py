@@ -0,0 +1,60 @@
+import unittest
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from Reinf_Learn.sweep import DEFAULTS, MedianStopping, parse_parameter, run_sweep, sweep_configs
+
+
+class TestSweep(unittest.TestCase):
+
+    def test_search_spaces(self):
+        """Grid searches must cover every combination, random searches must sample within the ranges"""
+        space = dict([parse_parameter('alpha=0.1,0.2,0.3'), parse_parameter('gamma=0.5,0.9')])
+        configs = sweep_configs(space)
+        self.assertEqual(len(configs), 6)
+        self.assertEqual({(c['alpha'], c['gamma']) for c in configs},
+                         {(a, g) for a in [0.1, 0.2, 0.3] for g in [0.5, 0.9]})
+        self.assertTrue(all(c['epsilon'] == DEFAULTS['epsilon'] for c in configs))
+
+        space = dict([parse_parameter('alpha=0.01:0.5'), parse_parameter('epsilon_decay=0.99,0.995')])
+        configs = sweep_configs(space, n_random=20, seed=1)
+        self.assertEqual(len(configs), 20)
+        self.assertTrue(all(0.01 <= c['alpha'] <= 0.5 and c['epsilon_decay'] in (0.99, 0.995) for c in configs))
+        self.assertEqual(configs, sweep_configs(space, n_random=20, seed=1))
+        with self.assertRaises(ValueError):
+            sweep_configs(space)
+        with self.assertRaises(ValueError):
+            parse_parameter('beta=0.1')
+
+    def test_median_stopping(self):
+        """Runs must only stop at checkpoints after the grace period, below the other runs' median"""
+        stopping = MedianStopping({}, grace_episodes=20, checkpoint_interval=10, min_trials=2)
+        self.assertFalse(stopping.should_stop(0, 10, -5.0))
+        self.assertFalse(stopping.should_stop(0, 20, 1.0))
+        self.assertFalse(stopping.should_stop(1, 20, 2.0))
+        self.assertFalse(stopping.should_stop(2, 25, -5.0))
+        self.assertTrue(stopping.should_stop(2, 20, 0.5))
+        self.assertFalse(stopping.should_stop(3, 20, 1.5))
+
+    def test_parallel_sweep(self):
+        """Every configuration must get a row in the saved results table"""
+        configs = sweep_configs({'alpha': [0.1, 0.5], 'gamma': [0.5, 0.9]})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.csv')
+            results = run_sweep(configs, 4, 2, path, grace_episodes=2, checkpoint_interval=2, max_gen=5)
+            saved = pd.read_csv(path)
+        self.assertEqual(sorted(saved['trial']), [0, 1, 2, 3])
+        self.assertEqual(list(saved['avg_reward']), sorted(saved['avg_reward'], reverse=True))
+        self.assertTrue(all(1 <= episodes <= 4 for episodes in results['episodes']))
+        self.assertEqual(len(set(results['seed'])), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,10 +9,20 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
+from Reinf_Learn.Q_Learn import Q_Learn
+from Reinf_Learn.parallel import decayed_epsilon
+from TrafficSimulator.rng import RngContext
 from Reinf_Learn.utils import (
     run_training_session,
     run_evaluation_session,
-    EPSILON
+    run_parallel_training_session,
+    run_vector_training_session,
+    check_training_options,
+    ALPHA,
+    GAMMA,
+    EPSILON,
+    EPSILON_MIN,
+    EPSILON_DECAY
 )
 
 class Test_Training_Running(unittest.TestCase):
@@ -28,6 +38,7 @@ class Test_Training_Running(unittest.TestCase):
         self.mock_model.q_data = {}
         self.mock_model.select_action = Mock(return_value=0)
         self.mock_model.learn = Mock()
+        self.mock_model.__len__ = Mock(return_value=0)
         
         # Create mock environment
         self.mock_env = Mock()
@@ -60,8 +71,40 @@ class Test_Training_Running(unittest.TestCase):
             # Check that best reward (30.0) was printed
             output = str(mock_print.call_args_list)
             self.assertIn("30.00", output, "Best reward should be printed")
+
+    def test_training_stops_early(self):
+        """The stop callback must end the training after the episode it returns True for"""
+        rewards = iter([1.0, 3.0, 5.0, 7.0])
+        self.mock_env.perform_step = lambda action: ((0, 3, 2, False), next(rewards), True, False)
+        checkpoints = []
+
+        def should_stop(episode, average_reward):
+            checkpoints.append((episode, average_reward))
+            return episode == 2
+
+        with patch('builtins.print'):
+            results = run_training_session(self.mock_model, self.mock_env, None, total_episodes=4,
+                                           epsilon_min=0.0, epsilon_decay=0.5, should_stop=should_stop)
+        self.assertEqual(results, (2, 2.0, 3.0))
+        self.assertEqual(checkpoints, [(1, 1.0), (2, 2.0)])
+        self.assertAlmostEqual(self.mock_model.epsilon, EPSILON * 0.25)
             
             
+    def test_vector_training_stops_early(self):
+        """The vector loop must count, decay and stop like the serial one"""
+        rewards = iter([1.0, 3.0, 5.0, 7.0])
+        vector_env = Mock(n_envs=1)
+        vector_env.reset = Mock(return_value=[(0, 5, 3, False)])
+        vector_env.observation_tuple = lambda row: row
+        vector_env.step = lambda actions: ([(0, 5, 3, False)], [next(rewards)], [True], [(0, 3, 2, False)])
+
+        with patch('builtins.print'):
+            results = run_vector_training_session(self.mock_model, vector_env, None, total_episodes=4,
+                                                  epsilon_min=0.0, epsilon_decay=0.5,
+                                                  should_stop=lambda episode, average_reward: episode == 2)
+        self.assertEqual(results, (2, 2.0, 3.0))
+        self.assertAlmostEqual(self.mock_model.epsilon, EPSILON * 0.25)
+
     def test_evaluation_accumulates_rewards_correctly(self):
         """Should accumulate rewards within each episode correctly"""
         # Episode with multiple steps
@@ -91,6 +134,58 @@ class Test_Training_Running(unittest.TestCase):
             self.assertIn("10.00", output)
 
 
+    def test_decayed_epsilon_matches_per_episode_decay(self):
+        """Actors must follow the same epsilon schedule as the serial training loop"""
+        epsilon = EPSILON
+        for n_episodes in range(1000):
+            self.assertAlmostEqual(decayed_epsilon(EPSILON, n_episodes, EPSILON_MIN, EPSILON_DECAY), epsilon)
+            if epsilon > EPSILON_MIN:
+                epsilon *= EPSILON_DECAY
+        self.assertAlmostEqual(decayed_epsilon(EPSILON, 3, 0.0, 0.5), EPSILON * 0.125)
+
+    def test_parallel_training_learns_from_every_episode(self):
+        """The learner must receive the transitions of every actor episode"""
+        model = Q_Learn(ALPHA, EPSILON, GAMMA, [0, 1])
+        with patch('builtins.print'):
+            run_parallel_training_session(model, "test_model.dat", total_episodes=3, n_workers=2)
+
+        self.assertGreater(len(model.q_data), 0)
+        self.assertAlmostEqual(model.epsilon, EPSILON * EPSILON_DECAY ** 3)
+        self.assertTrue(os.path.exists("test_model.dat"))
+
+    def test_parallel_training_stops_early(self):
+        """The parallel loop must take the serial loop's decay parameters and stop callback"""
+        model = Q_Learn(ALPHA, EPSILON, GAMMA, [0, 1])
+        with patch('builtins.print'):
+            results = run_parallel_training_session(model, None, total_episodes=6, n_workers=2, epsilon_min=0.0,
+                                                    epsilon_decay=0.5,
+                                                    should_stop=lambda episode, average_reward: episode == 2)
+        self.assertEqual(results[0], 2)
+        self.assertAlmostEqual(model.epsilon, EPSILON * 0.25)
+
+    def test_parallel_training_is_reproducible(self):
+        """Seeded runs must learn the same Q-values, whatever order the actors complete their episodes in"""
+        q_data = []
+        for _ in range(2):
+            model = Q_Learn(ALPHA, EPSILON, GAMMA, [0, 1])
+            with patch('builtins.print'):
+                run_parallel_training_session(model, "test_model.qtb", total_episodes=6, n_workers=2,
+                                              refresh_interval=2, rng=RngContext(7))
+            q_data.append(model.q_data)
+        self.assertGreater(len(q_data[0]), 0)
+        self.assertEqual(q_data[0], q_data[1])
+
+    def test_conflicting_training_options(self):
+        """Options selecting different training loops must be rejected instead of silently ignored"""
+        check_training_options(n_envs=4, dense=True)
+        check_training_options(grid=(2, 2))
+        for options in ({'replay_capacity': 100, 'grid': (2, 2)}, {'replay_capacity': 100, 'n_workers': 2},
+                        {'replay_capacity': 100, 'n_envs': 4}, {'n_workers': 2, 'n_envs': 4},
+                        {'grid': (2, 2), 'n_workers': 2}, {'grid': (2, 2), 'dense': True}):
+            with self.assertRaises(ValueError):
+                check_training_options(**options)
+
+
 if __name__ == '__main__':
     # Run with maximum verbosity to see what's happening
     unittest.main(verbosity=2)
\ No newline at end of file
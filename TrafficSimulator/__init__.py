@@ -1,2 +1,5 @@
 from .simulation import Simulation
 from .two_way_intersection import two_way_intersection_setup
+from .grid_network import grid_network_setup
+from .vehicle_engine import VehicleEngine
+from .rng import RngContext
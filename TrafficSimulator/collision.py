@@ -0,0 +1,181 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from TrafficSimulator.road import Road
+
+# (main road window start, main road window end, other road window start, other road window end)
+Window = Tuple[float, float, float, float]
+
+
+def _linear_interval(c0: float, c1: float, lo: float, hi: float) -> Optional[Tuple[float, float]]:
+    """ Returns the interval of s for which lo <= c0 + c1 * s <= hi, None if it's empty """
+    if c1 == 0:
+        return (-np.inf, np.inf) if lo <= c0 <= hi else None
+    s1, s2 = (lo - c0) / c1, (hi - c0) / c1
+    return min(s1, s2), max(s1, s2)
+
+
+def _disc_interval(origin: np.ndarray, direction: np.ndarray, center: np.ndarray,
+                   radius: float) -> Optional[Tuple[float, float]]:
+    """ Returns the interval of s for which origin + s * direction (unit vector) is within radius of center """
+    diff = origin - center
+    b = diff @ direction
+    discriminant = b * b - (diff @ diff - radius * radius)
+    if discriminant < 0:
+        return None
+    root = np.sqrt(discriminant)
+    return -b - root, -b + root
+
+
+def conflict_window(road: Road, other: Road, radius: float, margin: float) -> Optional[Tuple[float, float]]:
+    """
+    Computes the range of positions x on a road from which a vehicle can be within radius of a vehicle on
+    another road. Both roads are extended by margin on each side, to account for vehicles overshooting
+    the end of their road before being handed over to the next one.
+    :return: (x start, x end), or None if the roads are never that close
+    """
+    origin = np.array(road.start, dtype=float)
+    direction = np.array([road.angle_cos, road.angle_sin])
+    other_start = np.array(other.start, dtype=float) - margin * np.array([other.angle_cos, other.angle_sin])
+    other_direction = np.array([other.angle_cos, other.angle_sin])
+    other_length = other.length + 2 * margin
+
+    # The points within radius of the other road form a capsule: a rectangle along the road
+    # and two discs at its ends. The capsule is convex, so the line crosses it along a single interval
+    diff = origin - other_start
+    along = _linear_interval(diff @ other_direction, direction @ other_direction, 0, other_length)
+    cross = direction[0] * other_direction[1] - direction[1] * other_direction[0]
+    perpendicular = _linear_interval(diff[0] * other_direction[1] - diff[1] * other_direction[0], cross,
+                                     -radius, radius)
+    pieces = [
+        _disc_interval(origin, direction, other_start, radius),
+        _disc_interval(origin, direction, other_start + other_length * other_direction, radius)
+    ]
+    if along and perpendicular and max(along[0], perpendicular[0]) <= min(along[1], perpendicular[1]):
+        pieces.append((max(along[0], perpendicular[0]), min(along[1], perpendicular[1])))
+    pieces = [piece for piece in pieces if piece]
+    if not pieces:
+        return None
+
+    start = max(min(piece[0] for piece in pieces), -margin)
+    end = min(max(piece[1] for piece in pieces), road.length + margin)
+    return (start, end) if start <= end else None
+
+
+def _relative_geometry(road: Road, other: Road, decimals: int = 6) -> Tuple:
+    """ Returns the roads' end points relative to the first road's start, rounded, as a hashable key """
+    x0, y0 = road.start
+    return tuple(round(coordinate, decimals) for point in (road.end, other.start, other.end)
+                 for coordinate in (point[0] - x0, point[1] - y0))
+
+
+NETWORK_CACHE_SIZE = 8  # Number of conflict indexes kept for the networks built again, e.g. by VectorEnv
+# Conflict indexes of the last networks built, least recently used first
+_NETWORK_INDEXES: 'OrderedDict[Tuple, ConflictIndex]' = OrderedDict()
+
+
+class ConflictIndex:
+    """
+    Precomputed conflict zones of a road network. For every pair of intersecting roads, stores the
+    windows of positions on both roads from which two vehicles can collide, so that collision detection
+    only compares vehicles inside those windows.
+    """
+
+    def __init__(self, roads: List[Road], intersections: Dict[int, Set[int]],
+                 radius: float = 3, margin: float = 1):
+        self.radius: float = radius
+        self._windows: Dict[int, Dict[int, Window]] = {}  # {main road: {other road: window}}
+        self._spans: Dict[int, Tuple[float, float]] = {}  # {road: union of its windows}
+
+        # Windows only depend on the roads' relative geometry, computed once for repeated junctions
+        relative_windows: Dict[Tuple, Tuple] = {}
+        for main, others in intersections.items():
+            for other in others:
+                key = _relative_geometry(roads[main], roads[other])
+                if key not in relative_windows:
+                    relative_windows[key] = (conflict_window(roads[main], roads[other], radius + margin, margin),
+                                             conflict_window(roads[other], roads[main], radius + margin, margin))
+                main_window, other_window = relative_windows[key]
+                if main_window and other_window:
+                    self._windows.setdefault(main, {})[other] = (*main_window, *other_window)
+                    self._extend_span(main, main_window)
+                    self._extend_span(other, other_window)
+
+    @classmethod
+    def for_network(cls, roads: List[Road], intersections: Dict[int, Set[int]]) -> 'ConflictIndex':
+        """
+        Returns the conflict index of a road network, reusing the index of an identical network among the
+        last NETWORK_CACHE_SIZE networks
+        """
+        key = (tuple((road.start, road.end) for road in roads),
+               tuple((main, tuple(sorted(others))) for main, others in sorted(intersections.items())))
+        index = _NETWORK_INDEXES.pop(key, None)
+        if index is None:
+            index = cls(roads, intersections)
+        _NETWORK_INDEXES[key] = index
+        if len(_NETWORK_INDEXES) > NETWORK_CACHE_SIZE:
+            _NETWORK_INDEXES.popitem(last=False)
+        return index
+
+    def _extend_span(self, road: int, window: Tuple[float, float]) -> None:
+        start, end = self._spans.get(road, window)
+        self._spans[road] = (min(start, window[0]), max(end, window[1]))
+
+    @property
+    def windows(self) -> Dict[int, Dict[int, Window]]:
+        return self._windows
+
+    def span(self, road_index: int) -> Optional[Tuple[float, float]]:
+        """ Returns the (x start, x end) range covering the road's conflict windows, None if it has none """
+        return self._spans.get(road_index)
+
+    def _in_span(self, road: Road, cache: Dict[int, List[Tuple[float, Tuple]]]) -> List[Tuple[float, Tuple]]:
+        """ Returns the (x, position) of the road's vehicles that are inside one of its conflict windows """
+        if road.index in cache:
+            return cache[road.index]
+        start, end = self._spans[road.index]
+        vehicles = []
+        for vehicle in road.vehicles:  # Ordered by decreasing x
+            x = vehicle.x
+            if x < start:
+                break
+            if x <= end:
+                position = vehicle.position
+                if position[0] is not None:
+                    vehicles.append((x, position))
+        cache[road.index] = vehicles
+        return vehicles
+
+    def detect(self, roads: List[Road], intersections: Dict[int, Set[int]]) -> bool:
+        """
+        Checks whether two vehicles on intersecting roads are closer than the collision radius
+        :param intersections: {non-empty road index: non-empty intersecting roads indexes}
+        """
+        cache: Dict[int, List[Tuple[float, Tuple]]] = {}
+        first, second = [], []
+        for main, others in intersections.items():
+            windows = self._windows.get(main)
+            if not windows:
+                continue
+            main_vehicles = self._in_span(roads[main], cache)
+            if not main_vehicles:
+                continue
+            for other in others:
+                window = windows.get(other)
+                if not window:
+                    continue
+                main_start, main_end, other_start, other_end = window
+                main_positions = [position for x, position in main_vehicles if main_start <= x <= main_end]
+                if not main_positions:
+                    continue
+                for x, position in self._in_span(roads[other], cache):
+                    if other_start <= x <= other_end:
+                        first.extend(main_positions)
+                        second.extend([position] * len(main_positions))
+
+        if not first:
+            return False
+        delta = np.subtract(first, second)
+        return bool(np.any(np.hypot(delta[:, 0], delta[:, 1]) < self.radius))
@@ -0,0 +1,155 @@
+from typing import Dict, List, Optional, Set, Tuple
+
+from TrafficSimulator import Simulation
+from TrafficSimulator.curve import turn_road, TURN_RIGHT
+from TrafficSimulator.two_way_intersection import (a, b, length, n, INTERSECTIONS_DICT, CYCLE, SLOW_DISTANCE,
+                                                   SLOW_FACTOR, STOP_DISTANCE, VEHICLE_RATE)
+
+# An N×M grid of two-way intersections, each one laid out as the two_way_intersection junction, around its
+# center. Neighbouring junctions are linked by roads of the same length as the inbound and outbound roads.
+SPACING = 2 * b + length  # Distance between neighbouring junction centers
+
+# Junction sides, in the two_way_intersection order. Vehicles approach a junction from a side, and exit it
+# through another one: straight ahead through the opposite side, turning right through the next side
+WEST, SOUTH, EAST, NORTH = range(4)
+NEIGHBOUR_OFFSETS = [(0, -1), (1, 0), (0, 1), (-1, 0)]  # (row, column) offset of the junction on each side
+OUTWARDS = [(-1, 0), (0, 1), (1, 0), (0, -1)]  # Direction pointing away from the junction, on each side
+STRAIGHT_WEIGHT = 3  # Weight of going straight through the grid, relative to the turns, as in two_way_intersection
+
+# Junction road templates, around (0, 0), in the two_way_intersection road order (indexes 8 onwards). The left
+# turns are left out, as in the two_way_intersection paths: the signals have no protected left turn phase
+STOP_POINTS = [(-b, a), (a, b), (b, -a), (-a, -b)]  # End of the road approaching from each side
+EXIT_POINTS = [(-b, -a), (-a, b), (b, a), (a, -b)]  # Start of the road exiting through each side
+FIRST_JUNCTION_ROAD = 8  # Index of the first junction road in two_way_intersection.ROADS
+
+
+def _junction_roads(center: Tuple[float, float]) -> List[Tuple]:
+    """ Returns the straight roads, then the right turn curve of each approach side, of a junction """
+    def point(p):
+        return p[0] + center[0], p[1] + center[1]
+
+    roads = [(point(STOP_POINTS[side]), point(EXIT_POINTS[(side + 2) % 4])) for side in range(4)]
+    for side in range(4):
+        roads += turn_road(point(STOP_POINTS[side]), point(EXIT_POINTS[(side + 1) % 4]), TURN_RIGHT, n)
+    return roads
+
+
+def _movements(first_road: int) -> List[Dict[int, List[int]]]:
+    """ {approach side: {exit side: roads crossing the junction}}, for a junction whose roads start at first_road """
+    movements = []
+    for side in range(4):
+        right_turn = first_road + 4 + n * side
+        movements.append({
+            (side + 2) % 4: [first_road + side],
+            (side + 1) % 4: list(range(right_turn, right_turn + n)),
+        })
+    return movements
+
+
+def _junction_road(road: int) -> Optional[int]:
+    """ Returns the index among _junction_roads() of a two_way_intersection junction road, None for a left turn """
+    offset = road - FIRST_JUNCTION_ROAD
+    if offset < 4:
+        return offset
+    side, step = divmod(offset - 4, 2 * n)  # Each side has a right turn, then a left turn, of n roads each
+    return 4 + n * side + step if step < n else None
+
+
+def _junction_intersections() -> Dict[int, Set[int]]:
+    """ Returns the two_way_intersection conflicts between the roads of a junction, as _junction_road() indexes """
+    intersections = {}
+    for road, others in INTERSECTIONS_DICT.items():
+        conflicts = {_junction_road(other) for other in others} - {None}
+        if _junction_road(road) is not None and conflicts:
+            intersections[_junction_road(road)] = conflicts
+    return intersections
+
+
+JUNCTION_INTERSECTIONS = _junction_intersections()  # {road: intersecting roads}, as _junction_roads() indexes
+
+
+def grid_network_setup(n_rows: int, n_cols: int, max_gen=None, engine=None, max_dt=None,
+                       vehicle_rate=VEHICLE_RATE / 4, arrival_process='periodic', rng=None) -> Simulation:
+    """
+    Builds an N×M grid of signalized two-way intersections, with one traffic signal per junction
+    (signal index row * n_cols + column). Vehicles enter the grid at every boundary road, at vehicle_rate
+    vehicles per minute each, and cross it straight or turning right once. The arrivals are drawn from rng,
+    a numpy Generator, or from np.random if None
+    """
+    sim = Simulation(max_gen, engine, max_dt, rng)
+    junctions = [(row, col) for row in range(n_rows) for col in range(n_cols)]
+    centers = {(row, col): ((col - (n_cols - 1) / 2) * SPACING, (row - (n_rows - 1) / 2) * SPACING)
+               for row, col in junctions}
+
+    def neighbour(junction, side):
+        row, col = junction[0] + NEIGHBOUR_OFFSETS[side][0], junction[1] + NEIGHBOUR_OFFSETS[side][1]
+        return (row, col) if 0 <= row < n_rows and 0 <= col < n_cols else None
+
+    def point(junction, p):
+        return p[0] + centers[junction][0], p[1] + centers[junction][1]
+
+    def outwards(p, side):
+        return p[0] + OUTWARDS[side][0] * length, p[1] + OUTWARDS[side][1] * length
+
+    # Roads approaching every junction side: links from the neighbouring junction, or grid entries
+    roads: List[Tuple] = []
+    inbound: Dict[Tuple, int] = {}  # {(junction, side): road index}
+    for junction in junctions:
+        for side in range(4):
+            stop_point = point(junction, STOP_POINTS[side])
+            other = neighbour(junction, side)
+            start = point(other, EXIT_POINTS[(side + 2) % 4]) if other else outwards(stop_point, side)
+            inbound[junction, side] = len(roads)
+            roads.append((start, stop_point))
+
+    # Roads leaving the grid
+    outbound: Dict[Tuple, int] = {}  # {(junction, side): road index}, for the boundary sides
+    for junction in junctions:
+        for side in range(4):
+            if not neighbour(junction, side):
+                exit_point = point(junction, EXIT_POINTS[side])
+                outbound[junction, side] = len(roads)
+                roads.append((exit_point, outwards(exit_point, side)))
+
+    # Junction roads, and their conflicts
+    movements: Dict[Tuple, List[Dict[int, List[int]]]] = {}
+    intersections: Dict[int, Set[int]] = {}
+    junction_roads: Dict[Tuple, range] = {}
+    for junction in junctions:
+        first_road = len(roads)
+        roads += _junction_roads(centers[junction])
+        junction_roads[junction] = range(first_road, len(roads))
+        movements[junction] = _movements(first_road)
+        intersections.update({first_road + road: {first_road + other for other in others}
+                              for road, others in JUNCTION_INTERSECTIONS.items()})
+    sim.add_roads(roads)
+
+    def path(junction, side, turn_at=None):
+        """ Roads from the grid entry on a side of a junction to the grid exit, turning right at turn_at """
+        path_roads = [inbound[junction, side]]
+        while True:
+            exit_side = (side + 1) % 4 if junction == turn_at else (side + 2) % 4
+            path_roads += movements[junction][side][exit_side]
+            other = neighbour(junction, exit_side)
+            if not other:
+                return path_roads + [outbound[junction, exit_side]]
+            junction, side = other, (exit_side + 2) % 4
+            path_roads.append(inbound[junction, side])
+
+    # A generator at every grid entry, crossing the grid straight, or turning right at one of the junctions
+    for junction, side in outbound:
+        straight = path(junction, side)
+        crossed = [junction]
+        while neighbour(crossed[-1], (side + 2) % 4):
+            crossed.append(neighbour(crossed[-1], (side + 2) % 4))
+        paths = [[STRAIGHT_WEIGHT * len(crossed), straight]]
+        paths += [[1, path(junction, side, turn_at)] for turn_at in crossed]
+        sim.add_generator(vehicle_rate, paths, arrival_process)
+
+    for junction in junctions:
+        signal_roads = [[inbound[junction, WEST], inbound[junction, EAST]],
+                        [inbound[junction, SOUTH], inbound[junction, NORTH]]]
+        sim.add_traffic_signal(signal_roads, CYCLE, SLOW_DISTANCE, SLOW_FACTOR, STOP_DISTANCE,
+                               junction_roads[junction])
+    sim.add_intersections(intersections)
+    return sim
@@ -0,0 +1,121 @@
+"""
+Opt-in timing of the simulation and training hot paths.
+
+Methods decorated with @hot_path(phase) are left untouched while the instrumentation is disabled, so it
+costs nothing. enable() replaces them with wrappers accumulating each phase's call count and wall time
+(and optionally recording every call for a Chrome trace), and disable() puts the original methods back.
+Phase times are inclusive: a phase called from another phase counts towards both.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+_HOT_PATHS: List[Tuple[type, str, str, Callable]] = []  # (owner class, method name, phase, method)
+_stats: Dict[str, List[int]] = {}  # {phase: [calls, total nanoseconds]}
+_trace: Optional[List[Tuple[str, int, int, int]]] = None  # (phase, thread id, start, duration) in nanoseconds
+_max_events: int = 0
+_enabled: bool = False
+
+
+class _HotPath:
+    """ Registers a method as an instrumented phase once its class is created, then steps aside """
+
+    def __init__(self, phase: str, method: Callable):
+        self.phase = phase
+        self.method = method
+
+    def __set_name__(self, owner, name):
+        _HOT_PATHS.append((owner, name, self.phase, self.method))
+        setattr(owner, name, self.method)
+
+
+def hot_path(phase: str) -> Callable:
+    """ Method decorator, marking the method as an instrumented phase """
+    def decorator(method: Callable) -> _HotPath:
+        return _HotPath(phase, method)
+    return decorator
+
+
+def _timed(phase: str, method: Callable) -> Callable:
+    stats = _stats.setdefault(phase, [0, 0])
+    clock = time.perf_counter_ns
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            duration = clock() - start
+            stats[0] += 1
+            stats[1] += duration
+            if _trace is not None and len(_trace) < _max_events:
+                _trace.append((phase, threading.get_ident(), start, duration))
+    return wrapper
+
+
+def enable(trace: bool = False, max_events: int = 1_000_000) -> None:
+    """
+    Starts timing the hot paths
+    :param trace: whether to record every call, for export_chrome_trace()
+    :param max_events: maximum number of recorded calls, later calls are only accumulated
+    """
+    global _enabled, _trace, _max_events
+    if _enabled:
+        disable()
+    _trace = [] if trace else None
+    _max_events = max_events
+    for owner, name, phase, method in _HOT_PATHS:
+        setattr(owner, name, _timed(phase, method))
+    _enabled = True
+
+
+def disable() -> None:
+    """ Restores the original hot path methods. The collected data is kept until reset() """
+    global _enabled
+    for owner, name, phase, method in _HOT_PATHS:
+        setattr(owner, name, method)
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """ Clears the collected data """
+    for stats in _stats.values():
+        stats[0] = stats[1] = 0
+    if _trace is not None:
+        _trace.clear()
+
+
+def stats() -> Dict[str, Tuple[int, float]]:
+    """ Returns {phase: (calls, total seconds)} for the phases called so far """
+    return {phase: (calls, total / 1e9) for phase, (calls, total) in _stats.items() if calls}
+
+
+def summary() -> str:
+    """ Returns a table of the phases' calls, total time and time per call, by decreasing total time """
+    rows = sorted(stats().items(), key=lambda item: item[1][1], reverse=True)
+    if not rows:
+        return "No instrumented phase was called"
+    width = max(len(phase) for phase, _ in rows)
+    lines = [f"{'phase':<{width}}  {'calls':>10}  {'total (s)':>10}  {'per call (us)':>13}"]
+    for phase, (calls, total) in rows:
+        lines.append(f"{phase:<{width}}  {calls:>10}  {total:>10.3f}  {total / calls * 1e6:>13.2f}")
+    return '\n'.join(lines)
+
+
+def export_chrome_trace(path: str) -> None:
+    """ Writes the recorded calls in the Chrome trace event format (chrome://tracing, Perfetto) """
+    if _trace is None:
+        raise RuntimeError("Calls weren't recorded, enable the instrumentation with trace=True")
+    pid = os.getpid()
+    events = [{'name': phase, 'ph': 'X', 'pid': pid, 'tid': thread, 'ts': start / 1e3, 'dur': duration / 1e3}
+              for phase, thread, start, duration in _trace]
+    with open(path, 'w') as trace_file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file)
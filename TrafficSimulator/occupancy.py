@@ -0,0 +1,73 @@
+from typing import Dict, Iterable, Set
+
+
+class OccupancyTracker:
+    """
+    Tracks the non-empty roads and the intersections between them. The active intersections map is
+    updated incrementally, only when a road changes between empty and non-empty, instead of being
+    rebuilt from the non-empty roads on every simulation tick.
+    """
+
+    def __init__(self):
+        self._non_empty_roads: Set[int] = set()
+        self._intersections: Dict[int, Set[int]] = {}  # {Road index: [intersecting roads' indexes]}
+        self._intersected_by: Dict[int, Set[int]] = {}  # {Road index: [roads listing it as intersecting]}
+        self._active: Dict[int, Set[int]] = {}  # {non-empty road index: [non-empty intersecting roads indexes]}
+
+    @property
+    def non_empty_roads(self) -> Set[int]:
+        """ Returns the set of non-empty road indexes. Should only be modified through the tracker """
+        return self._non_empty_roads
+
+    @property
+    def active_intersections(self) -> Dict[int, Set[int]]:
+        """ Returns a dictionary of {non-empty road index: [non-empty intersecting roads indexes]}.
+        Should only be modified through the tracker """
+        return self._active
+
+    def set_intersections(self, intersections: Dict[int, Set[int]]) -> None:
+        """ Sets the intersections dict and rebuilds the active intersections """
+        self._intersections = intersections
+        self._intersected_by = {}
+        for main, others in intersections.items():
+            for other in others:
+                self._intersected_by.setdefault(other, set()).add(main)
+
+        self._active = {}
+        for road in self._non_empty_roads:
+            self._activate(road)
+
+    def add(self, road: int) -> None:
+        """ Marks a road as non-empty """
+        if road not in self._non_empty_roads:
+            self._non_empty_roads.add(road)
+            self._activate(road)
+
+    def remove(self, road: int) -> None:
+        """ Marks a road as empty """
+        if road in self._non_empty_roads:
+            self._non_empty_roads.discard(road)
+            self._active.pop(road, None)
+            for main in self._intersected_by.get(road, ()):
+                others = self._active.get(main)
+                if others:
+                    others.discard(road)
+                    if not others:
+                        del self._active[main]
+
+    def update(self, new_empty_roads: Iterable[int], new_non_empty_roads: Iterable[int]) -> None:
+        """ Marks the new empty roads as empty, then the new non-empty roads as non-empty """
+        for road in new_empty_roads:
+            self.remove(road)
+        for road in new_non_empty_roads:
+            self.add(road)
+
+    def _activate(self, road: int) -> None:
+        """ Adds a new non-empty road to the active intersections """
+        if road in self._intersections:
+            others = self._intersections[road] & self._non_empty_roads
+            if others:
+                self._active[road] = others
+        for main in self._intersected_by.get(road, ()):
+            if main in self._non_empty_roads:
+                self._active.setdefault(main, set()).add(road)
@@ -0,0 +1,124 @@
+"""
+Headless recording of a simulation, without a display server.
+
+Every `every` updates, the simulation queues an immutable Frame of its state, which costs a snapshot and a
+ring buffer append. A writer process draws the frames onto an offscreen surface and writes them as a PNG
+image sequence, or as a raw RGB24 frame stream: like the Renderer, it draws outside of the simulation process,
+so the drawing and encoding don't hold its GIL. Whenever the writer is ready for a new frame, the simulation
+sends it the oldest queued one. When the writer falls behind, the ring buffer drops the oldest frames instead
+of slowing the simulation down.
+"""
+import collections
+import json
+import multiprocessing as mp
+import os
+from typing import Deque, List, Tuple
+
+import pygame
+
+from TrafficSimulator.instrumentation import hot_path
+from TrafficSimulator.renderer import READY, build_network, network_description
+from TrafficSimulator.window import Frame, Window
+
+FORMATS = ('png', 'raw')
+RAW_FILE = 'frames.rgb'
+RAW_METADATA_FILE = 'frames.json'
+WRITER_NICENESS = 10  # Scheduling priority decrease of the writer process, below the simulation's
+
+
+def _run_writer(roads: List[Tuple], signals: List[Tuple], directory: str, frame_format: str, fps: float,
+                connection) -> None:
+    """ Writer process: draws and writes the frames sent by the simulation, until it sends None """
+    if hasattr(os, 'nice'):
+        os.nice(WRITER_NICENESS)  # Frames are dropped rather than slowing the simulation, on a busy CPU too
+    window = Window(*build_network(roads, signals), headless=True)
+    raw_file = open(os.path.join(directory, RAW_FILE), 'wb') if frame_format == 'raw' else None
+    n_frames = 0
+    connection.send(READY)
+    while True:
+        frame = connection.recv()
+        if frame is None:
+            break
+        surface = window.draw(frame)
+        if raw_file:
+            raw_file.write(pygame.image.tobytes(surface, 'RGB'))
+        else:
+            pygame.image.save(surface, os.path.join(directory, f'frame_{n_frames:06d}.png'))
+        n_frames += 1
+        connection.send(READY)
+
+    if raw_file:
+        raw_file.close()
+        width, height = window.size
+        metadata = {'width': width, 'height': height, 'pixel_format': 'rgb24', 'n_frames': n_frames, 'fps': fps}
+        with open(os.path.join(directory, RAW_METADATA_FILE), 'w') as metadata_file:
+            json.dump(metadata, metadata_file, indent=2)
+
+
+class Recorder:
+    def __init__(self, simulation, directory: str, every: int = 10, frame_format: str = 'png',
+                 buffer_size: int = 64):
+        """
+        :param directory: output directory, created if needed
+        :param every: number of simulation updates between recorded frames
+        :param frame_format: 'png' for a frame_<n>.png image sequence, 'raw' for an RGB24 frames.rgb stream
+        :param buffer_size: number of frames waiting for the writer, beyond which the oldest are dropped
+        """
+        if frame_format not in FORMATS:
+            raise ValueError(f"Unknown frame format {frame_format}, expected one of {FORMATS}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory: str = directory
+        self.every: int = every
+        self.frame_format: str = frame_format
+        self.n_frames: int = 0  # Frames sent to the writer, which writes all of them
+        self.n_dropped_frames: int = 0
+        self._n_updates: int = 0
+
+        self._frames: Deque[Frame] = collections.deque()
+        self._buffer_size: int = buffer_size
+        self._ready: bool = False  # Whether the writer is waiting for a frame
+        context = mp.get_context('spawn')
+        self._connection, writer_connection = context.Pipe()
+        self._process = context.Process(target=_run_writer,
+                                        args=(*network_description(simulation), directory, frame_format,
+                                              1 / (simulation.dt * every), writer_connection),
+                                        daemon=True)
+        self._process.start()
+        writer_connection.close()
+
+    @hot_path('simulation.recording')
+    def update(self, simulation) -> None:
+        """ Queues the simulation's current state every `every` calls, and sends the writer the oldest frame """
+        self._n_updates += 1
+        if self._n_updates >= self.every:
+            self._n_updates = 0
+            if len(self._frames) == self._buffer_size:
+                self._frames.popleft()
+                self.n_dropped_frames += 1
+            self._frames.append(simulation.frame())
+        if self._frames:
+            self._send(wait=False)
+
+    def _send(self, wait: bool) -> None:
+        """ Sends the oldest queued frame if the writer is ready for it, or once it is with wait """
+        if not self._ready and (wait or self._connection.poll()):
+            self._ready = self._connection.recv() == READY
+        if self._ready:
+            self._ready = False
+            self._connection.send(self._frames.popleft())
+            self.n_frames += 1
+
+    def close(self) -> None:
+        """ Writes the queued frames and stops the writer process """
+        try:
+            while self._frames:
+                self._send(wait=True)
+            self._connection.send(None)
+        except (EOFError, OSError):  # The writer process exited
+            pass
+        self._process.join()
+        self._connection.close()
+        if self._process.exitcode:
+            print(f"Warning: the frame writer failed with exit code {self._process.exitcode}")
+        if self.n_dropped_frames:
+            print(f"Warning: {self.n_dropped_frames} recorded frames were dropped, the writer fell behind")
@@ -0,0 +1,130 @@
+"""
+Rendering in a separate process, decoupled from the simulation speed.
+
+The renderer process owns the window. Whenever it is ready for a new frame and the frame interval elapsed,
+the simulation sends it an immutable Frame of its current state; every tick in between is skipped. The
+simulation never waits for the drawing, so it runs at full speed, faster than real time, while the window
+shows its latest state at up to fps frames per second.
+"""
+import multiprocessing as mp
+import time
+from typing import List, Tuple
+
+from TrafficSimulator.instrumentation import hot_path
+from TrafficSimulator.road import Road
+from TrafficSimulator.traffic_signal import TrafficSignal
+from TrafficSimulator.window import Window
+
+# Messages of the renderer process
+READY = 'ready'
+CLOSED = 'closed'
+
+
+def network_description(simulation) -> Tuple[List[Tuple], List[Tuple]]:
+    """ Returns the picklable (roads, signals) description of a simulation's network drawn by a window """
+    roads = [(road.start, road.end) for road in simulation.roads]
+    signals = [([[road.index for road in group] for group in signal.roads], signal.cycle)
+               for signal in simulation.traffic_signals]
+    return roads, signals
+
+
+def build_network(roads: List[Tuple], signals: List[Tuple]) -> Tuple[List[Road], List[TrafficSignal]]:
+    """ Rebuilds the roads and traffic signals of a network_description(), e.g. in another process """
+    roads = [Road(start, end, index) for index, (start, end) in enumerate(roads)]
+    traffic_signals = [TrafficSignal([[roads[i] for i in group] for group in groups], cycle, 0, 0, 0)
+                       for groups, cycle in signals]
+    return roads, traffic_signals
+
+
+def _run_renderer(roads: List[Tuple], signals: List[Tuple], fps: float, connection) -> None:
+    """ Renderer process: draws the frames sent by the simulation, at most fps per second """
+    window = Window(*build_network(roads, signals))
+    frame_interval = 1 / fps
+    next_frame_time = time.perf_counter()
+    connection.send(READY)
+    while not window.closed:
+        # Keep the window responsive while waiting for the simulation
+        if not connection.poll(frame_interval):
+            window.handle_events()
+            continue
+        frame = connection.recv()
+        if frame is None:
+            return
+        window.show(frame)
+
+        # Frame rate cap
+        next_frame_time = max(next_frame_time + frame_interval, time.perf_counter())
+        while not window.closed and time.perf_counter() < next_frame_time:
+            window.handle_events()
+            time.sleep(min(0.01, max(0.0, next_frame_time - time.perf_counter())))
+        connection.send(READY)
+    connection.send(CLOSED)
+
+
+class Renderer:
+    """
+    Draws a simulation in a separate process at up to fps frames per second, see the module docstring.
+    Used by Simulation in place of a Window, through the same update() and closed interface
+    """
+
+    def __init__(self, simulation, fps: float = 30):
+        roads, signals = network_description(simulation)
+        context = mp.get_context('spawn')
+        self._connection, renderer_connection = context.Pipe()
+        self._process = context.Process(target=_run_renderer, args=(roads, signals, fps, renderer_connection),
+                                        daemon=True)
+        self._process.start()
+        renderer_connection.close()
+        self.closed: bool = False
+        self.n_frames: int = 0  # Frames sent to the renderer
+        self._frame_interval: float = 1 / fps
+        self._next_check: float = 0  # Time before which the renderer isn't asked for readiness
+        self._ready: bool = False
+
+    @hot_path('simulation.gui')
+    def update(self, simulation) -> None:
+        """ Sends the current state of the simulation if the renderer is ready for a new frame """
+        now = time.perf_counter()
+        if now < self._next_check or self.closed:
+            return
+        self._receive()
+        if self._ready:
+            self._ready = False
+            self._connection.send(simulation.frame())
+            self.n_frames += 1
+            self._next_check = now + self._frame_interval  # The renderer isn't ready before the interval
+        else:
+            self._next_check = now + self._frame_interval / 4
+
+    def _receive(self) -> None:
+        try:
+            while self._connection.poll():
+                message = self._connection.recv()
+                if message == READY:
+                    self._ready = True
+                elif message == CLOSED:
+                    self.closed = True
+        except (EOFError, OSError):  # The renderer process exited
+            self.closed = True
+
+    def wait_until_ready(self, timeout: float = 10) -> bool:
+        """ Waits for the renderer to be ready for a frame, e.g. while its window opens """
+        deadline = time.perf_counter() + timeout
+        while not self._ready and not self.closed and time.perf_counter() < deadline:
+            if self._connection.poll(0.05):
+                self._receive()
+        self._next_check = 0
+        return self._ready
+
+    def close(self) -> None:
+        """ Closes the window and stops the renderer process """
+        if self._process.is_alive():
+            try:
+                self._connection.send(None)
+            except OSError:
+                pass
+            self._process.join(timeout=5)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._connection.close()
+        self.closed = True
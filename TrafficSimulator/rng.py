@@ -0,0 +1,42 @@
+import zlib
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+
+class RngContext:
+    """
+    Random number streams of one simulation and learning run, derived from a single seed.
+
+    Each component draws from its own named numpy Generator, e.g. 'traffic' for the vehicle generators and
+    'learner' for the exploration of a Q-learner, so the draws of one component never shift another's.
+    Workers get independent contexts through spawn(): a run seeded with the same seed is reproducible bit for
+    bit, whatever the number of components drawing in between.
+    """
+
+    def __init__(self, seed: Union[None, int, np.random.SeedSequence] = None):
+        """
+        :param seed: integer seed, or a SeedSequence, e.g. spawned from another context. None for fresh entropy
+        """
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed_sequence: np.random.SeedSequence = seed
+        self._generators: Dict[str, np.random.Generator] = {}
+
+    def generator(self, name: str) -> np.random.Generator:
+        """Returns the stream of a component, the same Generator on every call with that name"""
+        if name not in self._generators:
+            # Keyed by a stable hash of the name, independent of the order the streams are created in
+            stream_seed = np.random.SeedSequence(self.seed_sequence.entropy,
+                                                 spawn_key=(*self.seed_sequence.spawn_key, zlib.crc32(name.encode())))
+            self._generators[name] = np.random.default_rng(stream_seed)
+        return self._generators[name]
+
+    def spawn(self, n: int) -> List['RngContext']:
+        """Returns n independent child contexts, e.g. one per worker process"""
+        return [RngContext(child) for child in self.seed_sequence.spawn(n)]
+
+
+def generator_of(rng: Optional[RngContext], name: str) -> Optional[np.random.Generator]:
+    """Returns the named stream of a context, None without a context"""
+    return rng.generator(name) if rng is not None else None
@@ -39,32 +39,45 @@ class Road:
             return self.traffic_signal.current_cycle[i]
         return True
 
-    def update(self, dt, sim_t):
-        n = len(self.vehicles)
-        if n > 0:
-            lead: Vehicle = self.vehicles[0]
+    def regulate_lead(self, sim_t) -> bool:
+        """ Applies the traffic signal rules to the lead vehicle of a non-empty road
+        :return: True if the traffic signal is green (or doesn't exist), i.e. every vehicle should be unslowed
+        """
+        lead: Vehicle = self.vehicles[0]
+
+        # Check for traffic signal
+        if self.traffic_signal_state:
+            # If traffic signal is green (or doesn't exist), let vehicles pass
+            lead.unstop(sim_t)
+            return True
+        if self.has_traffic_signal:
+            # The traffic signal is red (existence checked to access its stop_distance)
+            lead_can_stop_safely = lead.x <= self.length - self.traffic_signal.stop_distance / 1.5
+            # This check is to ensure that we don't stop vehicles that are too close to the traffic
+            # signal when it turns to yellow. In such a case, the vehicle should pass as quickly as possible,
+            # without being even slowed down
+            if lead_can_stop_safely:
+                lead.slow(self.traffic_signal.slow_factor)  # slow vehicles in slow zone
+                lead_in_stop_zone = self.length - self.traffic_signal.stop_distance <= lead.x
+                if lead_in_stop_zone:
+                    lead.stop(sim_t)
+        return False
 
-            # Check for traffic signal
-            if self.traffic_signal_state:
-                # If traffic signal is green (or doesn't exist), let vehicles pass
-                lead.unstop(sim_t)
+    def update(self, dt, sim_t):
+        if self.vehicles:
+            if self.regulate_lead(sim_t):
                 for vehicle in self.vehicles:
                     vehicle.unslow()
-            elif self.has_traffic_signal:
-                # The traffic signal is red (existence checked to access its stop_distance)
-                lead_can_stop_safely = lead.x <= self.length - self.traffic_signal.stop_distance / 1.5
-                # This check is to ensure that we don't stop vehicles that are too close to the traffic
-                # signal when it turns to yellow. In such a case, the vehicle should pass as quickly as possible,
-                # without being even slowed down
-                if lead_can_stop_safely:
-                    lead.slow(self.traffic_signal.slow_factor)  # slow vehicles in slow zone
-                    lead_in_stop_zone = self.length - self.traffic_signal.stop_distance <= lead.x
-                    if lead_in_stop_zone:
-                        lead.stop(sim_t)
+            self.update_vehicles(dt)
+
+    def update_vehicles(self, dt):
+        """ Advances the vehicles of a non-empty road, without applying the traffic signal rules """
+        n = len(self.vehicles)
+        lead: Vehicle = self.vehicles[0]
 
-            # Update first vehicle
-            lead.update(None, dt, self)
-            # Update other vehicles
-            for i in range(1, n):
-                lead = self.vehicles[i - 1]
-                self.vehicles[i].update(lead, dt, self)
+        # Update first vehicle
+        lead.update(None, dt, self)
+        # Update other vehicles
+        for i in range(1, n):
+            lead = self.vehicles[i - 1]
+            self.vehicles[i].update(lead, dt, self)
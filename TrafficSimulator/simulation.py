@@ -1,18 +1,53 @@
-from itertools import chain
-from typing import List, Dict, Tuple, Set, Optional
+import math
+from typing import List, Dict, Tuple, Set, Optional, Iterator, Iterable, Union, NamedTuple, Callable, Sequence
 
-from scipy.spatial import distance
+import numpy as np
 
+from TrafficSimulator.collision import ConflictIndex
+from TrafficSimulator.instrumentation import hot_path
+from TrafficSimulator.occupancy import OccupancyTracker
+from TrafficSimulator.recorder import Recorder
+from TrafficSimulator.renderer import Renderer
 from TrafficSimulator.road import Road
 from TrafficSimulator.traffic_signal import TrafficSignal
-from TrafficSimulator.vehicle_generator import VehicleGenerator
-from TrafficSimulator.window import Window
+from TrafficSimulator.vehicle import Vehicle
+from TrafficSimulator.vehicle_engine import VehicleEngine, EngineVehicle
+from TrafficSimulator.vehicle_generator import VehicleGenerator, ArrivalProcess
+from TrafficSimulator.window import Window, Frame
+
+# Adaptive time-stepping: a vehicle follows the vehicle ahead when it is closer than FOLLOWING_FACTOR times its
+# IDM desired gap, and a single update can't change a vehicle's velocity by more than MAX_VELOCITY_CHANGE (m/s)
+FOLLOWING_FACTOR = 2
+MAX_VELOCITY_CHANGE = 0.5
+RECHECK_INTERVAL = 0.1  # Seconds of single ticks after a check found an event, before checking again
+OUTBOUND_COUNTER = 0  # Index of the outbound roads vehicle counter
+
+
+class SimulationSnapshot(NamedTuple):
+    """ The dynamic state of a simulation, see Simulation.snapshot() """
+    t: float
+    n_ticks: int
+    collision_detected: bool
+    n_vehicles_generated: int
+    n_vehicles_on_map: int
+    waiting_times_sum: float
+    fine_until: float
+    vehicles: Dict[int, List[Vehicle]]  # {non-empty road index: detached copies of its vehicles}
+    signal_cycle_indexes: List[int]
+    generator_states: List[Tuple]
 
 
 class Simulation:
-    def __init__(self, max_gen: int = None):
+    def __init__(self, max_gen: int = None, engine: Optional[VehicleEngine] = None,
+                 max_dt: Optional[float] = None, rng: Optional[np.random.Generator] = None):
         self.t = 0.0  # Time
         self.dt = 1 / 60  # Time step
+        # Adaptive time-stepping: while every vehicle is cruising away from stop lines, road ends and
+        # conflict zones, run() advances by up to max_dt seconds per update. None to always use dt
+        self.max_dt: Optional[float] = max_dt
+        self.n_ticks: int = 0  # Number of updates computed
+        self._tick_dt: float = self.dt  # Time step of the current update
+        self._fine_until: float = 0  # Time before which adaptive time-stepping uses single ticks
         self.roads: List[Road] = []
         self.generators: List[VehicleGenerator] = []
         self.traffic_signals: List[TrafficSignal] = []
@@ -21,44 +56,99 @@ class Simulation:
         self.n_vehicles_generated: int = 0
         self.n_vehicles_on_map: int = 0
 
-        self._gui: Optional[Window] = None
+        self._gui: Optional[Union[Window, Renderer]] = None
+        self._recorder: Optional[Recorder] = None
 
-        self._non_empty_roads: Set[int] = set()
+        # Tracks the non-empty roads and the intersections between them
+        self._occupancy: OccupancyTracker = OccupancyTracker()
+        self._non_empty_roads: Set[int] = self._occupancy.non_empty_roads  # Modified through self._occupancy
         # To calculate the number of vehicles in the junction, use:
         # n_vehicles_on_map - _inbound_roads vehicles - _outbound_roads vehicles
         self._inbound_roads: Set[int] = set()
         self._outbound_roads: Set[int] = set()
+        # Vehicle counters, updated as vehicles enter, move between and leave roads: the outbound roads counter,
+        # then per traffic signal, one counter per road group followed by its junction roads counter
+        self._vehicle_counts: List[int] = [0]
+        self._road_counters: List[List[int]] = []  # {Road index: indexes of the counters counting its vehicles}
+        self._signal_counters: List[slice] = []  # {Traffic signal index: slice of its road groups counters}
 
         self._intersections: Dict[int, Set[int]] = {}  # {Road index: [intersecting roads' indexes]}
+        self._conflicts: Optional[ConflictIndex] = None  # Built from the roads geometry and the intersections
+        self._conflict_roads: Set[int] = set()  # Roads having conflict zones
         self.max_gen: Optional[int] = max_gen  # Vehicle generation limit
+        self.rng: Optional[np.random.Generator] = rng  # Generator of the vehicle arrivals, None for np.random
         self._waiting_times_sum: float = 0  # for vehicles that completed the journey
+        # Called with each vehicle completing its journey and the simulation time, e.g. to log the trips
+        self.trip_listener: Optional[Callable[[Vehicle, float], None]] = None
+
+        # Optional vectorized vehicle dynamics, replacing the per-road Road.update() loop
+        self._engine: Optional[VehicleEngine] = engine
+        self._engine_keys: List[int] = []  # {Road index: engine road key}
+        self._engine_roads: Dict[int, int] = {}  # {Engine road key: road index}
 
     def add_intersections(self, intersections_dict: Dict[int, Set[int]]) -> None:
         self._intersections.update(intersections_dict)
+        self._occupancy.set_intersections(self._intersections)
+        self._conflicts = ConflictIndex.for_network(self.roads, self._intersections)
+        self._conflict_roads = {road.index for road in self.roads if self._conflicts.span(road.index)}
+        if self._engine:
+            for i in self._conflict_roads:
+                self._engine.set_conflict_span(self._engine_keys[i], *self._conflicts.span(i))
 
     def add_road(self, start: Tuple[int, int], end: Tuple[int, int]) -> None:
         road = Road(start, end, index=len(self.roads))
         self.roads.append(road)
+        self._road_counters.append([])
+        if self._engine:
+            self._engine_keys.append(self._engine.add_road(road))
+            self._engine_roads[self._engine_keys[-1]] = road.index
 
     def add_roads(self, roads: List[Tuple[int, int]]) -> None:
         for road in roads:
             self.add_road(*road)
 
-    def add_generator(self, vehicle_rate, paths: List[List]) -> None:
+    def add_generator(self, vehicle_rate, paths: List[List],
+                      arrival_process: Union[str, ArrivalProcess] = 'periodic') -> None:
         inbound_roads: List[Road] = [self.roads[roads[0]] for weight, roads in paths]
         inbound_dict: Dict[int: Road] = {road.index: road for road in inbound_roads}
-        vehicle_generator = VehicleGenerator(vehicle_rate, paths, inbound_dict)
+        vehicle_class = EngineVehicle if self._engine else Vehicle
+        vehicle_generator = VehicleGenerator(vehicle_rate, paths, inbound_dict, vehicle_class, arrival_process,
+                                             rng=self.rng)
         self.generators.append(vehicle_generator)
 
         for (weight, roads) in paths:
             self._inbound_roads.add(roads[0])
-            self._outbound_roads.add(roads[-1])
+            if roads[-1] not in self._outbound_roads:
+                self._outbound_roads.add(roads[-1])
+                self._add_counted_road(OUTBOUND_COUNTER, roads[-1])
 
     def add_traffic_signal(self, roads: List[List[int]], cycle: List[Tuple],
-                           slow_distance: float, slow_factor: float, stop_distance: float) -> None:
+                           slow_distance: float, slow_factor: float, stop_distance: float,
+                           junction_roads: Sequence[int] = ()) -> None:
+        """
+        :param roads: the road groups controlled by the signal, whose lead vehicles it regulates
+        :param junction_roads: the roads crossing the junction, from the signal roads to the junction exits
+        """
         roads: List[List[Road]] = [[self.roads[i] for i in road_group] for road_group in roads]
         traffic_signal = TrafficSignal(roads, cycle, slow_distance, slow_factor, stop_distance)
         self.traffic_signals.append(traffic_signal)
+        if self._engine:
+            keys = [self._engine_keys[road.index] for road_group in roads for road in road_group]
+            self._engine.set_traffic_signal(keys, stop_distance, slow_factor)
+            self._apply_signals_to_engine([len(self.traffic_signals) - 1])
+
+        first_counter = len(self._vehicle_counts)
+        for road_group in [[road.index for road in road_group] for road_group in roads] + [junction_roads]:
+            counter = len(self._vehicle_counts)
+            self._vehicle_counts.append(0)
+            for road_index in road_group:
+                self._add_counted_road(counter, road_index)
+        self._signal_counters.append(slice(first_counter, len(self._vehicle_counts) - 1))
+
+    def _add_counted_road(self, counter: int, road_index: int) -> None:
+        """ Counts the vehicles of a road in a vehicle counter """
+        self._road_counters[road_index].append(counter)
+        self._vehicle_counts[counter] += len(self.roads[road_index].vehicles)
 
     @property
     def gui_closed(self) -> bool:
@@ -80,20 +170,29 @@ class Simulation:
                                                and not self.n_vehicles_on_map)
         return self.collision_detected
 
+    @property
+    def n_outbound_vehicles(self) -> int:
+        """ Returns the number of vehicles on the outbound roads, the last roads of the vehicle paths """
+        return self._vehicle_counts[OUTBOUND_COUNTER]
+
+    def signal_vehicle_counts(self, signal_index: int) -> List[int]:
+        """
+        Returns the number of vehicles on each road group of a traffic signal.
+        Maintained incrementally, it doesn't depend on the number of roads
+        """
+        return self._vehicle_counts[self._signal_counters[signal_index]]
+
+    def junction_vehicle_count(self, signal_index: int) -> int:
+        """ Returns the number of vehicles on the junction roads of a traffic signal """
+        return self._vehicle_counts[self._signal_counters[signal_index].stop]
+
     @property
     def intersections(self) -> Dict[int, Set[int]]:
         """
-        Reduces the intersections' dict to non-empty roads
+        Reduces the intersections' dict to non-empty roads. Maintained incrementally by the occupancy tracker
         :return: a dictionary of {non-empty road index: [non-empty intersecting roads indexes]}
         """
-        output: Dict[int, Set[int]] = {}
-        non_empty_roads: Set[int] = self._non_empty_roads
-        for road in non_empty_roads:
-            if road in self._intersections:
-                intersecting_roads = self._intersections[road].intersection(non_empty_roads)
-                if intersecting_roads:
-                    output[road] = intersecting_roads
-        return output
+        return self._occupancy.active_intersections
 
     @property
     def current_average_wait_time(self) -> float:
@@ -119,114 +218,458 @@ class Simulation:
     def outbound_roads(self) -> Set[int]:
         return self._outbound_roads
 
-    def init_gui(self) -> None:
-        """ Initializes the GUI and updates the display """
+    def init_gui(self, fps: Optional[float] = None) -> None:
+        """ Initializes the GUI and updates the display
+        :param fps: None to draw every update in a window, else the frame rate cap of a renderer process,
+        drawing the latest state while the simulation runs at full speed
+        """
         if not self._gui:
-            self._gui = Window(self)
-        self._gui.update()
+            if fps:
+                self._gui = Renderer(self, fps)
+                self._gui.wait_until_ready()
+            else:
+                self._gui = Window(self.roads, self.traffic_signals)
+        self._gui.update(self)
+
+    def close_gui(self) -> None:
+        """ Closes the GUI, if any """
+        if isinstance(self._gui, Renderer):
+            self._gui.close()
+        self._gui = None
+
+    def start_recording(self, directory: str, every: int = 10, frame_format: str = 'png') -> None:
+        """ Records a frame every `every` updates, drawn offscreen and written in the background, see Recorder.
+        Like the GUI, recording disables adaptive time-stepping and idle ticks skipping """
+        if not self._recorder:
+            self._recorder = Recorder(self, directory, every, frame_format)
+
+    def stop_recording(self) -> None:
+        """ Writes the remaining recorded frames and stops recording """
+        if self._recorder:
+            self._recorder.close()
+            self._recorder = None
+
+    def frame(self) -> Frame:
+        """ Returns an immutable snapshot of the vehicles, traffic signals and counters drawn by the GUI """
+        vehicles = tuple((i, vehicle.x, vehicle.length, vehicle.width)
+                         for i in self._non_empty_roads for vehicle in self.roads[i].vehicles)
+        return Frame(self.t, self.max_gen, self.n_vehicles_generated, self.n_vehicles_on_map,
+                     self.current_average_wait_time, vehicles,
+                     tuple(signal.current_cycle_index for signal in self.traffic_signals))
+
+    @hot_path('simulation.run')
+    def run(self, action: Union[int, Sequence[int], None] = None) -> None:
+        """ Performs n simulation updates. Terminates early upon completion or GUI closing.
+        With max_dt set and no GUI, uneventful stretches are covered by fewer, larger updates
+        :param action: an action from a reinforcement learning environment action space, switching every
+        traffic signal, or a joint action with one action per traffic signal
+        """
+        for _ in self.run_ticks(action):
+            self._step_engine()
 
-    def run(self, action: Optional[int] = None) -> None:
-        """ Performs n simulation updates. Terminates early upon completion or GUI closing
-        :param action: an action from a reinforcement learning environment action space
+    def run_ticks(self, action: Union[int, Sequence[int], None] = None) -> Iterator[None]:
+        """
+        Generator version of run(), used to advance several simulations sharing a vehicle engine in lockstep.
+        Yields once per update, before the vehicles are advanced. Before resuming the generator, the caller is
+        expected to apply the traffic signals and to step the engine by dt (see VehicleEngine.regulate() and
+        VehicleEngine.step()), so the simulation is expected not to use adaptive time-stepping
+        :param action: an action from a reinforcement learning environment action space, see run()
         """
         n = 180  # 3 simulation seconds
-        if action:
-            self._update_signals()
-            self._loop(n)
+        if np.ndim(action):
+            switched_signals = [i for i, signal_action in enumerate(action) if signal_action]
+        else:
+            switched_signals = range(len(self.traffic_signals)) if action else []
+        if switched_signals:
+            self._update_signals(switched_signals)
+            yield from self._loop(n)
             if self.collision_detected or self.gui_closed:
                 return
-            self._update_signals()
+            self._update_signals(switched_signals)
             if self.completed or self.gui_closed:
                 return
-        self._loop(n)
+        yield from self._loop(n)
 
+    @hot_path('simulation.update')
     def update(self) -> None:
         """ Updates the roads, generates vehicles, detect collisions and updates the gui """
-        # Update every road
+        self._tick_dt = self.dt
+        self._update_roads()
+        self._update_vehicles()
+        self._step_engine()
+        self._complete_update()
+
+    def snapshot(self) -> SimulationSnapshot:
+        """ Copies the dynamic state of the simulation: its vehicles, traffic signals cycle, generators' state,
+        time and counters. The roads, intersections and conflict zones are static and aren't copied """
+        return SimulationSnapshot(
+            t=self.t,
+            n_ticks=self.n_ticks,
+            collision_detected=self.collision_detected,
+            n_vehicles_generated=self.n_vehicles_generated,
+            n_vehicles_on_map=self.n_vehicles_on_map,
+            waiting_times_sum=self._waiting_times_sum,
+            fine_until=self._fine_until,
+            vehicles={i: [vehicle.copy() for vehicle in self.roads[i].vehicles] for i in self._non_empty_roads},
+            signal_cycle_indexes=[signal.current_cycle_index for signal in self.traffic_signals],
+            generator_states=[gen.state for gen in self.generators]
+        )
+
+    def restore(self, snapshot: SimulationSnapshot) -> None:
+        """ Restores a state returned by snapshot(). The snapshot isn't modified, and can be restored again.
+        The generators' already sampled arrivals are part of the snapshot, later ones are drawn anew """
+        self._clear_vehicles()
+        for i, vehicles in snapshot.vehicles.items():
+            road = self.roads[i]
+            for vehicle in vehicles:
+                vehicle = vehicle.copy()
+                if self._engine:
+                    lead = road.vehicles[-1] if road.vehicles else None
+                    self._engine.insert(vehicle, self._engine_keys[i], lead)
+                road.vehicles.append(vehicle)
+            for counter in self._road_counters[i]:
+                self._vehicle_counts[counter] += len(vehicles)
+        self._occupancy.update((), snapshot.vehicles)
+
+        for signal, cycle_index in zip(self.traffic_signals, snapshot.signal_cycle_indexes):
+            signal.current_cycle_index = cycle_index
+        self._apply_signals_to_engine(range(len(self.traffic_signals)))
+        for gen, state in zip(self.generators, snapshot.generator_states):
+            gen.restore(state)
+
+        self.t = snapshot.t
+        self.n_ticks = snapshot.n_ticks
+        self.collision_detected = snapshot.collision_detected
+        self.n_vehicles_generated = snapshot.n_vehicles_generated
+        self.n_vehicles_on_map = snapshot.n_vehicles_on_map
+        self._waiting_times_sum = snapshot.waiting_times_sum
+        self._fine_until = snapshot.fine_until
+
+    def reseed(self, rng: np.random.Generator) -> None:
+        """ Draws the vehicle arrivals from rng from now on, e.g. a new episode's stream. The arrivals already
+        sampled are kept until the next reset() """
+        self.rng = rng
+        for gen in self.generators:
+            gen.rng = rng
+
+    def reset(self) -> None:
+        """ Restarts the simulation from an empty map, with newly sampled vehicle arrivals. Reuses the roads,
+        intersections and conflict zones, which is much cheaper than building a new simulation """
+        self._clear_vehicles()
+        for signal in self.traffic_signals:
+            signal.reset()
+        self._apply_signals_to_engine(range(len(self.traffic_signals)))
+        for gen in self.generators:
+            gen.reset()
+
+        self.t = 0.0
+        self.n_ticks = 0
+        self.collision_detected = False
+        self.n_vehicles_generated = 0
+        self.n_vehicles_on_map = 0
+        self._waiting_times_sum = 0
+        self._fine_until = 0
+
+    def _clear_vehicles(self) -> None:
+        """ Removes every vehicle from the roads, and from the vehicle engine """
         for i in self._non_empty_roads:
-            self.roads[i].update(self.dt, self.t)
+            vehicles = self.roads[i].vehicles
+            if self._engine:
+                for vehicle in vehicles:
+                    self._engine.remove(vehicle)
+            vehicles.clear()
+        self._occupancy.update(list(self._non_empty_roads), ())
+        self._vehicle_counts = [0] * len(self._vehicle_counts)
+
+    def release_engine(self) -> None:
+        """ Unregisters the simulation roads, and the vehicles on them, from its vehicle engine """
+        if self._engine:
+            self._engine.remove_roads(self._engine_keys)
+            self._engine_keys = []
+            self._engine_roads = {}
+            self._engine = None
 
-        # Add vehicles
-        for gen in self.generators:
-            if self.max_gen and self.n_vehicles_generated == self.max_gen:
-                break
-            road_index = gen.update(self.t, self.n_vehicles_generated)
-            if road_index is not None:
-                self.n_vehicles_generated += 1
-                self.n_vehicles_on_map += 1
-                self._non_empty_roads.add(road_index)
+    @property
+    def engine_keys(self) -> List[int]:
+        """ Returns the vehicle engine keys of the roads, by road index """
+        return self._engine_keys
+
+    @hot_path('simulation.roads')
+    def _update_roads(self) -> None:
+        """ Applies the traffic signals to the lead vehicles of every road, and unslows the vehicles of the roads
+        with a green signal. With a vehicle engine, the signals are applied by VehicleEngine.regulate() """
+        if self._engine:
+            return
+        for i in self._non_empty_roads:
+            road = self.roads[i]
+            if road.regulate_lead(self.t):
+                for vehicle in road.vehicles:
+                    vehicle.unslow()
+
+    @hot_path('simulation.vehicles')
+    def _update_vehicles(self) -> None:
+        """ Advances the vehicles of every road by the current time step, unless they're advanced by an engine """
+        if not self._engine:
+            for i in self._non_empty_roads:
+                self.roads[i].update_vehicles(self._tick_dt)
+
+    @hot_path('simulation.engine')
+    def _step_engine(self) -> None:
+        """ Applies the traffic signals and advances every vehicle of the vehicle engine at once, if exists """
+        if self._engine:
+            self._engine.regulate()
+            self._engine.step(self._tick_dt)
+
+    def _complete_update(self) -> None:
+        """ Generates vehicles, moves vehicles between roads, detect collisions and updates the gui """
+        self._generate_vehicles()
 
         self._check_out_of_bounds_vehicles()
 
         self._detect_collisions()
 
         # Increment time
-        self.t += self.dt
+        self.t += self._tick_dt
+        self.n_ticks += 1
 
         # Update the display
         if self._gui:
-            self._gui.update()
+            self._gui.update(self)
+        if self._recorder:
+            self._recorder.update(self)
 
-    def _loop(self, n: int) -> None:
-        """ Performs n simulation updates. Terminates early upon completion or GUI closing"""
-        for _ in range(n):
-            self.update()
+    @hot_path('simulation.generators')
+    def _generate_vehicles(self) -> None:
+        """ Updates the generators, adding the generated vehicles to the map """
+        for gen in self.generators:
+            if self.max_gen and self.n_vehicles_generated == self.max_gen:
+                break
+            road_index = gen.update(self.t, self.n_vehicles_generated)
+            if road_index is not None:
+                self.n_vehicles_generated += 1
+                self.n_vehicles_on_map += 1
+                for counter in self._road_counters[road_index]:
+                    self._vehicle_counts[counter] += 1
+                self._occupancy.add(road_index)
+                if self._engine:
+                    vehicles = self.roads[road_index].vehicles
+                    lead = vehicles[-2] if len(vehicles) > 1 else None
+                    self._engine.insert(vehicles[-1], self._engine_keys[road_index], lead)
+
+    def _loop(self, n: int) -> Iterator[None]:
+        """ Performs n simulation updates (fewer with adaptive time-stepping, covering the same duration).
+        Terminates early upon completion or GUI closing.
+        Yields between the roads update and the engine step, see run_ticks() """
+        remaining = n
+        every_tick = self._gui or self._recorder  # Displayed or recorded updates aren't skipped or merged
+        while remaining:
+            if not self.n_vehicles_on_map and not every_tick:
+                remaining -= self._skip_idle_ticks(remaining)
+                if not remaining:
+                    return
+            self._update_roads()
+            n_merged = self._adaptive_ticks(remaining) if self.max_dt and not every_tick else 1
+            self._tick_dt = n_merged * self.dt
+            self._update_vehicles()
+            yield
+            self._complete_update()
+            remaining -= n_merged
             if self.completed or self.gui_closed:
                 return
 
-    def _update_signals(self) -> None:
-        """ Updates all the simulation traffic signals and updates the gui, if exists """
-        for traffic_signal in self.traffic_signals:
-            traffic_signal.update()
+    def _skip_idle_ticks(self, remaining: int) -> int:
+        """ Advances the time of an empty map until a vehicle generation is due, at most remaining ticks.
+        Updating an empty map changes nothing else, so the skipped ticks aren't computed
+        :return: the number of ticks skipped
+        """
+        if not self.n_vehicles_generated:
+            return 0
+        if self.max_gen and self.n_vehicles_generated == self.max_gen:
+            n_skipped = remaining
+        else:
+            next_generation_time = min(gen.next_generation_time for gen in self.generators)
+            n_skipped = min(remaining, max(0, math.ceil((next_generation_time - self.t) / self.dt)))
+        self.t += n_skipped * self.dt
+        if n_skipped < remaining and not any(gen.is_due(self.t, self.n_vehicles_generated)
+                                             for gen in self.generators):
+            # Rounding left t just short of the generation
+            self.t += self.dt
+            n_skipped += 1
+        return n_skipped
+
+    @hot_path('simulation.adaptive_dt')
+    def _adaptive_ticks(self, remaining: int) -> int:
+        """ Returns how many dt ticks the next update can cover, at most max_dt and remaining ticks.
+        Drops back to a single tick while a vehicle is inside a conflict zone, following another vehicle
+        or braking hard, and stops short of road ends, red signals' stop zones and vehicle generations,
+        so those events happen at the same dt resolution """
+        if self.t < self._fine_until or not self.n_vehicles_generated:
+            return 1
+        if self._engine:
+            # The horizon depends on the signals' effect, regulating again before the step changes nothing
+            self._engine.regulate()
+        n_ticks = self._merged_ticks(remaining)
+        if n_ticks == 1:
+            # Not worth checking again at the next tick
+            self._fine_until = max(self._fine_until, self.t + RECHECK_INTERVAL)
+        return n_ticks
+
+    def _merged_ticks(self, remaining: int) -> int:
+        """ Computes _adaptive_ticks() from the vehicles' state, or from the vehicle engine arrays """
+        # Vehicles inside conflict zones, checked first as they're the most common reason for single ticks
+        exit_time = self._engine.conflict_exit_time() if self._engine else self._conflict_exit_time()
+        if exit_time is not None:
+            # Not worth checking again before the vehicles could have left the conflict zone
+            self._fine_until = self.t + exit_time
+            return 1
+
+        horizon = min(remaining, int(self.max_dt / self.dt)) * self.dt
+        if not (self.max_gen and self.n_vehicles_generated == self.max_gen):
+            for gen in self.generators:
+                horizon = min(horizon, gen.next_generation_time - self.t)
+        if self._engine:
+            horizon = min(horizon, self._engine.event_horizon(FOLLOWING_FACTOR, MAX_VELOCITY_CHANGE))
+        else:
+            horizon = self._event_horizon(horizon)
+        if horizon < 2 * self.dt:
+            return 1
+        return int(horizon / self.dt)
+
+    def _conflict_exit_time(self) -> Optional[float]:
+        """ Returns the time the vehicles inside a conflict zone need to leave it at their free-road max velocity,
+        None if no vehicle is inside one """
+        exit_time = None
+        for i in self._conflict_roads & self._non_empty_roads:
+            start, end = self._conflicts.span(i)
+            for vehicle in self.roads[i].vehicles:  # Ordered by decreasing x
+                x = vehicle.x
+                if x < start:
+                    break
+                if x <= end:
+                    exit_time = max(exit_time or 0, (end - x) / vehicle.free_v_max)
+        return exit_time
+
+    def _event_horizon(self, horizon: float) -> float:
+        """ Shortens the horizon to the time a vehicle reaches a conflict zone, a road end or a red signal's stop
+        zone, or closes in on the vehicle ahead of it, and to the time the velocity of a vehicle changes by
+        MAX_VELOCITY_CHANGE. Returns 0 as soon as a vehicle follows another one, see
+        VehicleEngine.event_horizon() """
+        for i in self._non_empty_roads:
+            road = self.roads[i]
+            green = road.traffic_signal_state
+            span = self._conflicts.span(i) if self._conflicts else None
+            lead = None
+            for vehicle in road.vehicles:
+                x, v = vehicle.x, vehicle.v
+                if span and v > 0 and x < span[0]:  # Time to reach the conflict zone, if ahead
+                    horizon = min(horizon, (span[0] - x) / v)
+                a = abs(vehicle.acceleration(lead))
+                if a:
+                    horizon = min(horizon, MAX_VELOCITY_CHANGE / a)
+                if lead:
+                    gap = lead.x - x - lead.length
+                    delta_v = v - lead.v
+                    following_gap = FOLLOWING_FACTOR * (vehicle.s0 + max(0, vehicle.T * v
+                                                                        + delta_v * v / vehicle.sqrt_ab))
+                    if gap < following_gap and (v or lead.v):
+                        return 0
+                    if delta_v > 0:
+                        horizon = min(horizon, (gap - following_gap) / delta_v)
+                if v > 0:
+                    horizon = min(horizon, (road.length - x) / v)
+                lead = vehicle
+
+            # A red signal stops the lead vehicle once it enters the stop zone
+            lead = road.vehicles[0]
+            if not green and road.has_traffic_signal and lead.v > 0:
+                stop_x = road.length - road.traffic_signal.stop_distance
+                if lead.x < stop_x:
+                    horizon = min(horizon, (stop_x - lead.x) / lead.v)
+            if horizon < 2 * self.dt:
+                return horizon
+        return horizon
+
+    def _update_signals(self, signal_indexes: Optional[Sequence[int]] = None) -> None:
+        """ Updates the given simulation traffic signals, all of them by default, and updates the gui, if exists """
+        if signal_indexes is None:
+            signal_indexes = range(len(self.traffic_signals))
+        for i in signal_indexes:
+            self.traffic_signals[i].update()
+        self._apply_signals_to_engine(signal_indexes)
         if self._gui:
-            self._gui.update()
+            self._gui.update(self)
 
+    def _apply_signals_to_engine(self, signal_indexes: Iterable[int]) -> None:
+        """ Copies the current state of the given traffic signals to the vehicle engine, if exists """
+        if self._engine:
+            for i in signal_indexes:
+                signal = self.traffic_signals[i]
+                for road_group, green in zip(signal.roads, signal.current_cycle):
+                    self._engine.set_green([self._engine_keys[road.index] for road in road_group], green)
+
+    @hot_path('simulation.collisions')
     def _detect_collisions(self) -> None:
-        """ Detects collisions by checking all non-empty intersecting vehicle paths.
-        Updates the self.collision_detected attribute """
-        radius = 3
-        for main_road, intersecting_roads in self.intersections.items():
-            vehicles = self.roads[main_road].vehicles
-            intersecting_vehicles = chain.from_iterable(
-                self.roads[i].vehicles for i in intersecting_roads)
-            for vehicle in vehicles:
-                for intersecting in intersecting_vehicles:
-                    if distance.euclidean(vehicle.position, intersecting.position) < radius:
-                        self.collision_detected = True
-                        return
+        """ Detects collisions by checking the vehicles inside the conflict zones of non-empty
+        intersecting roads. Updates the self.collision_detected attribute """
+        if self._conflicts and self._conflicts.detect(self.roads, self.intersections):
+            self.collision_detected = True
 
+    @hot_path('simulation.out_of_bounds')
     def _check_out_of_bounds_vehicles(self):
-        """ Check roads for out-of-bounds vehicles, updates self.non_empty_roads """
+        """ Check roads for out-of-bounds vehicles, updates self.non_empty_roads. With a vehicle engine, the roads
+        are found by the engine step, and only their lead vehicles are read """
+        if self._engine:
+            exited_roads = {self._engine_roads.get(key) for key in self._engine.exited_roads}
+            if not exited_roads:
+                return
+            exited_roads = [i for i in self._non_empty_roads if i in exited_roads]
+        else:
+            exited_roads = [i for i in self._non_empty_roads if self.roads[i].vehicles[0].x >= self.roads[i].length]
+
         new_non_empty_roads = set()
         new_empty_roads = set()
-        for i in self._non_empty_roads:
+        vehicle_counts = self._vehicle_counts
+        for i in exited_roads:
+            # The first vehicle is out of road bounds
             road = self.roads[i]
             lead = road.vehicles[0]
-            # If first vehicle is out of road bounds
-            if lead.x >= road.length:
-                # If vehicle has a next road
-                if lead.current_road_index + 1 < len(lead.path):
-                    # Remove it from its road
-                    road.vehicles.popleft()
-                    # Reset the position relative to the road
-                    lead.x = 0
-                    # Add it to the next road
-                    lead.current_road_index += 1
-                    next_road_index = lead.path[lead.current_road_index]
-                    new_non_empty_roads.add(next_road_index)
-                    self.roads[next_road_index].vehicles.append(lead)
-                    # road.vehicles.popleft()
-                    if not road.vehicles:
-                        new_empty_roads.add(road.index)
-                else:
-                    # Remove it from its road
-                    road.vehicles.popleft()
-                    # Remove from non_empty_roads if it has no vehicles
-                    if not road.vehicles:
-                        new_empty_roads.add(road.index)
-                    self.n_vehicles_on_map -= 1
-                    # Update the waiting times sum
-                    self._waiting_times_sum += lead.get_wait_time(self.t)
-
-        self._non_empty_roads.difference_update(new_empty_roads)
-        self._non_empty_roads.update(new_non_empty_roads)
+            for counter in self._road_counters[i]:
+                vehicle_counts[counter] -= 1
+            # If vehicle has a next road
+            if lead.current_road_index + 1 < len(lead.path):
+                # Remove it from its road
+                road.vehicles.popleft()
+                # Reset the position relative to the road
+                lead.x = 0
+                # Add it to the next road
+                lead.current_road_index += 1
+                next_road_index = lead.path[lead.current_road_index]
+                new_non_empty_roads.add(next_road_index)
+                for counter in self._road_counters[next_road_index]:
+                    vehicle_counts[counter] += 1
+                next_road_vehicles = self.roads[next_road_index].vehicles
+                if self._engine:
+                    next_lead = next_road_vehicles[-1] if next_road_vehicles else None
+                    self._engine.move(lead, self._engine_keys[next_road_index], next_lead)
+                    if road.vehicles:
+                        self._engine.detach_lead(road.vehicles[0])
+                next_road_vehicles.append(lead)
+                if not road.vehicles:
+                    new_empty_roads.add(road.index)
+            else:
+                # Remove it from its road
+                road.vehicles.popleft()
+                if self._engine:
+                    if road.vehicles:
+                        self._engine.detach_lead(road.vehicles[0])
+                    self._engine.remove(lead)
+                # Remove from non_empty_roads if it has no vehicles
+                if not road.vehicles:
+                    new_empty_roads.add(road.index)
+                self.n_vehicles_on_map -= 1
+                # Update the waiting times sum
+                self._waiting_times_sum += lead.get_wait_time(self.t)
+                if self.trip_listener:
+                    self.trip_listener(lead, self.t)
+
+        self._occupancy.update(new_empty_roads, new_non_empty_roads)
@@ -20,5 +20,9 @@ class TrafficSignal:
     def current_cycle(self) -> Tuple:
         return self.cycle[self.current_cycle_index]
 
+    def reset(self):
+        self.current_cycle_index = 0
+        self.prev_update_time = 0
+
     def update(self):
         self.current_cycle_index = (self.current_cycle_index + 1) % len(self.cycle)
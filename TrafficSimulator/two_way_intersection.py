@@ -148,16 +148,18 @@ INTERSECTIONS_DICT = {
 
 # Signals
 SIGNAL_ROADS = [[0, 2], [1, 3]]  # WEST, EAST, SOUTH NORTH
+JUNCTION_ROADS = range(8, len(ROADS))  # Straight and turn roads
 CYCLE = [(False, True), (False, False), (True, False), (False, False)]
 SLOW_DISTANCE = 50
 SLOW_FACTOR = 0.4
 STOP_DISTANCE = 15
 
 
-def two_way_intersection_setup(max_gen=None):
-    sim = Simulation(max_gen)
+def two_way_intersection_setup(max_gen=None, engine=None, max_dt=None, vehicle_rate=VEHICLE_RATE,
+                               arrival_process='periodic', rng=None):
+    sim = Simulation(max_gen, engine, max_dt, rng)
     sim.add_roads(ROADS)
-    sim.add_generator(VEHICLE_RATE, PATHS)
-    sim.add_traffic_signal(SIGNAL_ROADS, CYCLE, SLOW_DISTANCE, SLOW_FACTOR, STOP_DISTANCE)
+    sim.add_generator(vehicle_rate, PATHS, arrival_process)
+    sim.add_traffic_signal(SIGNAL_ROADS, CYCLE, SLOW_DISTANCE, SLOW_FACTOR, STOP_DISTANCE, JUNCTION_ROADS)
     sim.add_intersections(INTERSECTIONS_DICT)
     return sim
@@ -1,3 +1,4 @@
+import copy
 from typing import List, Tuple
 
 import numpy as np
@@ -15,7 +16,7 @@ class Vehicle:
         self.a_max = 1.44  # Max positive acceleration
         self.b_max = 4.61  # Max negative acceleration
         self.sqrt_ab = 2 * np.sqrt(self.a_max * self.b_max)
-        self._v_max = self.v_max
+        self.free_v_max = self.v_max  # Max velocity when no traffic signal slows the vehicle down
 
         self.v = self.v_max  # Velocity
         self.a = 0  # Acceleration
@@ -24,6 +25,7 @@ class Vehicle:
         self.is_stopped = False
         self._last_time_stopped = None
         self._waiting_time = 0
+        self.generation_time = 0  # Simulation time at which it entered the map
 
         self.path: List[int] = path  # Road indexes
         self.current_road_index = 0
@@ -34,6 +36,10 @@ class Vehicle:
     def __str__(self):
         return f'Vehicle {self.index}'
 
+    def copy(self) -> 'Vehicle':
+        """ Returns a copy of the vehicle's state, detached from any road """
+        return copy.copy(self)
+
     def get_wait_time(self, sim_t):
         if self.is_stopped:
             return self._waiting_time + (sim_t - self._last_time_stopped)
@@ -55,6 +61,19 @@ class Vehicle:
             self.x += self.v * dt + self.a * dt * dt / 2
 
         # Update acceleration
+        self.a = self.acceleration(lead)
+
+        # Update position
+        sin, cos = road.angle_sin, road.angle_cos
+        x = road.start[0] + cos * self.x
+        y = road.start[1] + sin * self.x
+        self.position = x, y
+
+    def acceleration(self, lead) -> float:
+        """
+        Computes the IDM acceleration of the vehicle from its current position and velocity
+        :param lead: the vehicle ahead of it on its road, None for the road's lead vehicle
+        """
         alpha = 0
         if lead:
             delta_x = lead.x - self.x - lead.length
@@ -62,16 +81,9 @@ class Vehicle:
 
             alpha = (self.s0 + max(0, self.T * self.v + delta_v * self.v / self.sqrt_ab)) / delta_x
 
-        self.a = self.a_max * (1 - (self.v / self.v_max) ** 4 - alpha ** 2)
-
         if self.is_stopped:
-            self.a = -self.b_max * self.v / self.v_max
-
-        # Update position
-        sin, cos = road.angle_sin, road.angle_cos
-        x = road.start[0] + cos * self.x
-        y = road.start[1] + sin * self.x
-        self.position = x, y
+            return -self.b_max * self.v / self.v_max
+        return self.a_max * (1 - (self.v / self.v_max) ** 4 - alpha ** 2)
 
     def stop(self, t):
         if not self.is_stopped:
@@ -85,7 +97,7 @@ class Vehicle:
             self.is_stopped = False
 
     def slow(self, traffic_light_slow_factor):
-        self.v_max = self._v_max * traffic_light_slow_factor
+        self.v_max = self.free_v_max * traffic_light_slow_factor
 
     def unslow(self):
-        self.v_max = self._v_max
+        self.v_max = self.free_v_max
@@ -0,0 +1,397 @@
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from TrafficSimulator.road import Road
+from TrafficSimulator.vehicle import Vehicle
+
+# Maximum absolute deviation (in meters / meters per second) of the engine's positions and velocities
+# from the scalar Vehicle.update() dynamics. Both implementations evaluate the same IDM expressions
+# in the same order, the remaining difference comes from numpy's vectorized pow() implementation.
+TOLERANCE = 1e-6
+
+
+class _EngineField:
+    """ A vehicle attribute stored in the engine arrays while the vehicle is on the map,
+    and in a regular instance attribute otherwise """
+
+    def __set_name__(self, owner, name):
+        self._name = name
+        self._local = f'_local_{name}'
+
+    def __get__(self, vehicle, owner=None):
+        if vehicle is None:
+            return self
+        if vehicle._slot < 0:
+            return getattr(vehicle, self._local)
+        return getattr(vehicle._engine, self._name).item(vehicle._slot)
+
+    def __set__(self, vehicle, value):
+        if vehicle._slot < 0:
+            setattr(vehicle, self._local, value)
+        else:
+            getattr(vehicle._engine, self._name)[vehicle._slot] = value
+
+
+class EngineVehicle(Vehicle):
+    """ A vehicle whose dynamic state lives in a VehicleEngine once it is inserted into a road """
+    x = _EngineField()
+    v = _EngineField()
+    a = _EngineField()
+    v_max = _EngineField()
+    is_stopped = _EngineField()
+    waiting_time = _EngineField()  # Accumulated by VehicleEngine.step() while the vehicle is stopped
+
+    def __init__(self, path: List[int]):
+        self._engine: Optional['VehicleEngine'] = None
+        self._slot: int = -1
+        self._local_position = (None, None)
+        super().__init__(path)
+        self.waiting_time = 0
+
+    def get_wait_time(self, sim_t):
+        return self.waiting_time
+
+    @property
+    def position(self):
+        if self._slot < 0:
+            return self._local_position
+        return self._engine.px.item(self._slot), self._engine.py.item(self._slot)
+
+    @position.setter
+    def position(self, value):
+        self._local_position = value
+
+    def copy(self) -> 'EngineVehicle':
+        """ Returns a copy of the vehicle's state, detached from any road and engine """
+        vehicle = super().copy()
+        vehicle._engine, vehicle._slot = None, -1
+        vehicle.x, vehicle.v, vehicle.a, vehicle.v_max, vehicle.is_stopped, vehicle.waiting_time, vehicle.position = \
+            self.x, self.v, self.a, self.v_max, self.is_stopped, self.waiting_time, self.position
+        return vehicle
+
+
+class VehicleEngine:
+    """
+    Structure-of-arrays vehicle dynamics. Every vehicle's x, v, a, v_max, is_stopped and road key is kept in
+    contiguous numpy arrays, regulate() applies the traffic signal rules to every road at once, and step()
+    advances all the running vehicles in one batched IDM update.
+    Each vehicle stores the slot of the vehicle ahead of it on its road (-1 for a road's lead vehicle),
+    which replaces the deque traversal of Road.update().
+
+    The fixed cost of the numpy calls makes an engine tick slower than the per-vehicle update of a few
+    vehicles: the engine pays off from a few dozen vehicles, e.g. on grid networks or with several
+    simulations sharing it (see the simulation.update and grid benchmarks).
+
+    The dynamics match Vehicle.update() within TOLERANCE: positions and velocities are updated first,
+    then the accelerations are computed from the updated positions and velocities, exactly as the
+    sequential road update computes a follower's acceleration after its lead vehicle moved.
+
+    Roads are registered with add_road(), which returns the road's engine key. A single engine can be
+    shared between several simulations, each holding its own road keys.
+    The slots are kept compact: removing a vehicle moves the last slot into the freed one.
+    """
+    _VEHICLE_FIELDS = ('x', 'v', 'a', 'v_max', 'free_v_max', 'length', 's0', 'T', 'a_max', 'b_max', 'sqrt_ab',
+                       'px', 'py', 'is_stopped', 'waiting_time', 'road', 'lead',
+                       'start_x', 'start_y', 'cos', 'sin')  # The geometry of the vehicle's road
+    _ROAD_FIELDS = ('road_start_x', 'road_start_y', 'road_cos', 'road_sin', 'road_length', 'road_running',
+                    'road_green', 'road_safe_x', 'road_slow_x', 'road_stop_x', 'road_slow_factor',
+                    'road_conflict_start', 'road_conflict_end')
+
+    def __init__(self, capacity: int = 64):
+        self._n: int = 0  # Number of vehicles, i.e. used slots
+        self._vehicles: List[EngineVehicle] = []  # Slot owners
+        self._free_keys: List[int] = []
+        self._n_roads: int = 0
+        self._n_paused: int = 0
+        # Keys of the roads whose lead vehicle passed the road end during the last step()
+        self.exited_roads: List[int] = []
+
+        # Road geometry and traffic signal rules, indexed by road key
+        self.road_start_x = np.zeros(0)
+        self.road_start_y = np.zeros(0)
+        self.road_cos = np.zeros(0)
+        self.road_sin = np.zeros(0)
+        self.road_length = np.zeros(0)
+        self.road_running = np.zeros(0, dtype=bool)
+        self.road_green = np.zeros(0, dtype=bool)  # Whether the road's signal is green, True without a signal
+        self.road_safe_x = np.zeros(0)  # A red signal slows the lead vehicle down if it's behind this position
+        self.road_slow_x = np.zeros(0)  # road_safe_x while the signal is red, -inf otherwise
+        self.road_stop_x = np.zeros(0)  # A slowed down lead vehicle is stopped past this position
+        self.road_slow_factor = np.zeros(0)
+        self.road_conflict_start = np.zeros(0)  # The x range covering the road's conflict zones, see ConflictIndex
+        self.road_conflict_end = np.zeros(0)
+
+        # Vehicle state, indexed by slot
+        self._allocate_slots(capacity)
+
+    def _allocate_slots(self, capacity: int) -> None:
+        for name in self._VEHICLE_FIELDS:
+            dtype = bool if name == 'is_stopped' else np.int64 if name in ('road', 'lead') else float
+            array = np.zeros(capacity, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                array[:len(old)] = old
+            setattr(self, name, array)
+        # Positions read by the following vehicles, followed by an infinite position read by the roads' lead vehicles
+        self._x_ahead = np.full(capacity + 1, np.inf)
+
+    @property
+    def n_vehicles(self) -> int:
+        return self._n
+
+    def add_road(self, road: Road) -> int:
+        """ Registers a road's geometry and returns its engine key """
+        if self._free_keys:
+            key = self._free_keys.pop()
+        else:
+            key = self._n_roads
+            self._n_roads += 1
+            for name in self._ROAD_FIELDS:
+                array = getattr(self, name)
+                setattr(self, name, np.append(array, np.zeros(1, dtype=array.dtype)))
+        self.road_start_x[key], self.road_start_y[key] = road.start
+        self.road_cos[key] = road.angle_cos
+        self.road_sin[key] = road.angle_sin
+        self.road_length[key] = road.length
+        self.road_running[key] = True
+        self.road_green[key] = True
+        self.road_safe_x[key] = self.road_stop_x[key] = road.length
+        self.road_slow_x[key] = -np.inf
+        self.road_slow_factor[key] = 1
+        self.road_conflict_start[key], self.road_conflict_end[key] = np.inf, -np.inf
+        return key
+
+    def set_conflict_span(self, key: int, start: float, end: float) -> None:
+        """ Sets the x range covering the conflict zones of a road """
+        self.road_conflict_start[key], self.road_conflict_end[key] = start, end
+
+    def set_traffic_signal(self, keys: Sequence[int], stop_distance: float, slow_factor: float) -> None:
+        """ Sets the rules of the traffic signal regulating the given roads, see Road.regulate_lead() """
+        keys = list(keys)
+        self.road_safe_x[keys] = self.road_length[keys] - stop_distance / 1.5
+        self.road_stop_x[keys] = self.road_length[keys] - stop_distance
+        self.road_slow_factor[keys] = slow_factor
+        self.set_green(keys, self.road_green[keys])
+
+    def set_green(self, keys: Sequence[int], green: Union[bool, np.ndarray]) -> None:
+        """ Sets the state of the traffic signal of the given roads """
+        keys = list(keys)
+        self.road_green[keys] = green
+        self.road_slow_x[keys] = np.where(green, -np.inf, self.road_safe_x[keys])
+
+    def remove_roads(self, keys: Sequence[int]) -> None:
+        """ Unregisters roads, dropping the vehicles that are still on them """
+        on_roads = np.flatnonzero(np.isin(self.road[:self._n], keys))
+        for slot in on_roads[::-1]:
+            self._free_slot(int(slot))
+        self.set_running(keys, True)
+        self._free_keys.extend(keys)
+
+    def set_running(self, keys: Sequence[int], running: bool) -> None:
+        """ Pauses (or resumes) the dynamics of the vehicles on the given roads """
+        self.road_running[list(keys)] = running
+        self._n_paused = int(np.count_nonzero(~self.road_running))
+
+    def insert(self, vehicle: EngineVehicle, road_key: int, lead: Optional[EngineVehicle]) -> None:
+        """ Moves a vehicle's state into the engine arrays
+        :param lead: the vehicle ahead of it on the road, None if the road was empty
+        """
+        if self._n == len(self.x):
+            self._allocate_slots(2 * len(self.x))
+        slot = self._n
+        self._n += 1
+
+        x, y = vehicle.position
+        self.x[slot], self.v[slot], self.a[slot] = vehicle.x, vehicle.v, vehicle.a
+        self.v_max[slot], self.free_v_max[slot] = vehicle.v_max, vehicle.free_v_max
+        self.is_stopped[slot], self.waiting_time[slot] = vehicle.is_stopped, vehicle.waiting_time
+        self.length[slot], self.s0[slot], self.T[slot] = vehicle.length, vehicle.s0, vehicle.T
+        self.a_max[slot], self.b_max[slot], self.sqrt_ab[slot] = vehicle.a_max, vehicle.b_max, vehicle.sqrt_ab
+        self.px[slot] = np.nan if x is None else x
+        self.py[slot] = np.nan if y is None else y
+        self._set_road(slot, road_key, lead)
+
+        vehicle._engine, vehicle._slot = self, slot
+        self._vehicles.append(vehicle)
+
+    def move(self, vehicle: EngineVehicle, road_key: int, lead: Optional[EngineVehicle]) -> None:
+        """ Hands a vehicle over to the tail of another road """
+        self._set_road(vehicle._slot, road_key, lead)
+
+    def _set_road(self, slot: int, road_key: int, lead: Optional[EngineVehicle]) -> None:
+        self.road[slot] = road_key
+        self.lead[slot] = lead._slot if lead is not None else -1
+        self.start_x[slot], self.start_y[slot] = self.road_start_x[road_key], self.road_start_y[road_key]
+        self.cos[slot], self.sin[slot] = self.road_cos[road_key], self.road_sin[road_key]
+
+    def detach_lead(self, vehicle: EngineVehicle) -> None:
+        """ Marks a vehicle as the lead vehicle of its road, after the vehicle ahead of it left the road """
+        self.lead[vehicle._slot] = -1
+
+    def remove(self, vehicle: EngineVehicle) -> None:
+        """ Moves a vehicle's state out of the engine arrays, when it leaves the map """
+        self._free_slot(vehicle._slot)
+
+    def _free_slot(self, slot: int) -> None:
+        vehicle = self._vehicles[slot]
+        state = (vehicle.x, vehicle.v, vehicle.a, vehicle.v_max, vehicle.is_stopped, vehicle.waiting_time,
+                 vehicle.position)
+        vehicle._engine, vehicle._slot = None, -1
+        vehicle.x, vehicle.v, vehicle.a, vehicle.v_max, vehicle.is_stopped, vehicle.waiting_time, vehicle.position = \
+            state
+
+        # Move the last slot into the freed one
+        last = self._n - 1
+        moved = self._vehicles.pop()
+        if slot != last:
+            for name in self._VEHICLE_FIELDS:
+                array = getattr(self, name)
+                array[slot] = array[last]
+            leads = self.lead[:last]
+            leads[leads == last] = slot
+            self._vehicles[slot] = moved
+            moved._slot = slot
+        self._n = last
+
+    def regulate(self) -> None:
+        """ Applies the traffic signal rules of Road.regulate_lead() to the lead vehicle of every running road,
+        and restores the free-road max velocity of every vehicle of the running roads with a green signal """
+        n = self._n
+        if not n:
+            return
+        road = self.road[:n]
+        green = self.road_green[road]
+        is_lead = self.lead[:n] < 0
+        if self._n_paused:
+            running = self.road_running[road]
+            green &= running
+            is_lead &= running
+        v_max, free_v_max, is_stopped = self.v_max[:n], self.free_v_max[:n], self.is_stopped[:n]
+
+        # A green signal (or no signal) lets the lead vehicle pass, and every vehicle is unslowed
+        np.copyto(is_stopped, False, where=green & is_lead)
+        np.copyto(v_max, free_v_max, where=green)
+
+        # A red signal slows the lead vehicle down unless it's too close to stop safely, and stops it in the
+        # stop zone
+        x = self.x[:n]
+        slowed = is_lead & (x <= self.road_slow_x[road])
+        if slowed.any():
+            np.copyto(v_max, free_v_max * self.road_slow_factor[road], where=slowed)
+            is_stopped |= slowed & (self.road_stop_x[road] <= x)
+
+    def step(self, dt: float) -> None:
+        """ Updates the position, velocity and acceleration of every running vehicle, and the waiting time of the
+        stopped ones. Sets exited_roads """
+        n = self._n
+        if not n:
+            self.exited_roads = []
+            return
+        x, v, a, lead = self.x[:n], self.v[:n], self.a[:n], self.lead[:n]
+
+        # Update position and velocity
+        a_dt = a * dt
+        new_v = v + a_dt
+        new_x = np.add(x, new_v * dt + a_dt * dt / 2, out=self._x_ahead[:n])
+        halted = new_v < 0
+        if halted.any():
+            halted_v = v[halted]
+            new_x[halted] = x[halted] - 1 / 2 * halted_v * halted_v / a[halted]
+            new_v[halted] = 0
+
+        # Update acceleration, using the updated lead vehicles' state
+        delta_x, _, desired_gap = self._interaction(new_x, new_v)
+        new_a = self._acceleration(new_v, delta_x, desired_gap)
+        is_stopped = self.is_stopped[:n]
+
+        # Update position
+        new_px = self.start_x[:n] + self.cos[:n] * new_x
+        new_py = self.start_y[:n] + self.sin[:n] * new_x
+
+        if self._n_paused:
+            running = self.road_running[self.road[:n]]
+            new_x, new_v, new_a = np.where(running, new_x, x), np.where(running, new_v, v), np.where(running, new_a, a)
+            new_px = np.where(running, new_px, self.px[:n])
+            new_py = np.where(running, new_py, self.py[:n])
+            is_stopped = is_stopped & running
+        x[:], v[:], a[:] = new_x, new_v, new_a
+        self.px[:n], self.py[:n] = new_px, new_py
+        waiting_time = self.waiting_time[:n]
+        np.add(waiting_time, dt, out=waiting_time, where=is_stopped)
+
+        exited = (x >= self.road_length[self.road[:n]]) & (lead < 0)
+        self.exited_roads = self.road[:n][exited].tolist() if exited.any() else []
+
+    def _interaction(self, x: np.ndarray, v: np.ndarray):
+        """ Returns every vehicle's gap to the vehicle ahead of it, their velocity difference and the IDM desired
+        gap, see Vehicle.acceleration(). The lead vehicles of the roads have an infinite gap
+        :param x: the positions, a view on self._x_ahead
+        """
+        n = self._n
+        lead = self.lead[:n]
+        delta_x = self._x_ahead[lead] - x - self.length[lead]
+        delta_v = v - v[lead]
+        desired_gap = self.s0[:n] + np.maximum(0, self.T[:n] * v + delta_v * v / self.sqrt_ab[:n])
+        return delta_x, delta_v, desired_gap
+
+    def _acceleration(self, v: np.ndarray, delta_x: np.ndarray, desired_gap: np.ndarray) -> np.ndarray:
+        """ Returns every vehicle's IDM acceleration, see Vehicle.acceleration() """
+        n = self._n
+        v_max = self.v_max[:n]
+        alpha = desired_gap / delta_x
+        a = self.a_max[:n] * (1 - (v / v_max) ** 4 - alpha ** 2)
+        np.copyto(a, -self.b_max[:n] * v / v_max, where=self.is_stopped[:n])
+        return a
+
+    def conflict_exit_time(self) -> Optional[float]:
+        """ Returns the time the vehicles inside a conflict zone need to leave it at their free-road max velocity,
+        None if no vehicle is inside one """
+        n = self._n
+        x, road = self.x[:n], self.road[:n]
+        end = self.road_conflict_end[road]
+        inside = (self.road_conflict_start[road] <= x) & (x <= end)
+        if not inside.any():
+            return None
+        return float(np.max((end[inside] - x[inside]) / self.free_v_max[:n][inside]))
+
+    def event_horizon(self, following_factor: float, max_velocity_change: float) -> float:
+        """
+        Returns how long the vehicles can be advanced in a single step before one of them reaches a conflict zone,
+        a road end or a red signal's stop zone, or closes in on the vehicle ahead of it, and before the velocity
+        of one of them changes by more than max_velocity_change. Returns 0 if a vehicle follows another one
+        closer than following_factor times its desired gap. Computed over every vehicle of the engine, see
+        Simulation._adaptive_ticks()
+        """
+        n = self._n
+        if not n:
+            return np.inf
+        x, v, road = self._x_ahead[:n], self.v[:n], self.road[:n]
+        x[:] = self.x[:n]
+        delta_x, delta_v, desired_gap = self._interaction(x, v)
+
+        # Following vehicles
+        following_gap = following_factor * desired_gap
+        if ((delta_x < following_gap) & ((v > 0) | (v[self.lead[:n]] > 0))).any():
+            return 0.
+        horizon = np.inf
+        closing_in = delta_v > 0
+        if closing_in.any():
+            horizon = np.min((delta_x - following_gap)[closing_in] / delta_v[closing_in])
+
+        # Velocity changes
+        max_a = np.max(np.abs(self._acceleration(v, delta_x, desired_gap)))
+        if max_a:
+            horizon = min(horizon, max_velocity_change / max_a)
+
+        # Distances to the conflict zones, the road ends and the red signals' stop zones
+        distance = self.road_length[road] - x
+        to_conflict = self.road_conflict_start[road] - x
+        distance = np.where(to_conflict > 0, np.minimum(distance, to_conflict), distance)
+        red_lead = (self.lead[:n] < 0) & ~self.road_green[road]
+        to_stop = np.where(red_lead, self.road_stop_x[road] - x, np.inf)
+        distance = np.where(to_stop > 0, np.minimum(distance, to_stop), distance)
+        moving = v > 0
+        if moving.any():
+            horizon = min(horizon, np.min(distance[moving] / v[moving]))
+        return float(horizon)
@@ -1,44 +1,112 @@
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple, Type, Union
 
-from numpy.random import randint
+import numpy as np
 
 from TrafficSimulator.road import Road
 from TrafficSimulator.vehicle import Vehicle
 
+# Arrival processes: (vehicle rate in vehicles per minute, number of arrivals, random generator) -> headways in
+# seconds
+ArrivalProcess = Callable[[float, int, np.random.Generator], np.ndarray]
+ARRIVAL_PROCESSES: Dict[str, ArrivalProcess] = {
+    'periodic': lambda vehicle_rate, size, rng: np.full(size, 60 / vehicle_rate),
+    'poisson': lambda vehicle_rate, size, rng: rng.exponential(60 / vehicle_rate, size),
+}
+
 
 class VehicleGenerator:
-    def __init__(self, vehicle_rate: int, paths: List[List], inbound_roads: Dict[int, Road]):
+    def __init__(self, vehicle_rate: int, paths: List[List], inbound_roads: Dict[int, Road],
+                 vehicle_class: Type[Vehicle] = Vehicle,
+                 arrival_process: Union[str, ArrivalProcess] = 'periodic', batch_size: int = 64,
+                 rng: Optional[np.random.Generator] = None):
+        """
+        :param rng: generator of the arrivals, e.g. an RngContext stream. None to draw from the global numpy
+        random state
+        """
         self._vehicle_rate: int = vehicle_rate
         self._paths: List[List] = paths
         self._prev_gen_time: float = 0
+        self._vehicle_class: Type[Vehicle] = vehicle_class
+        self.rng = rng if rng is not None else np.random  # Same sampling methods as a Generator
 
         # Storing the list of the first roads of the vehicle paths. Used in the update() function
         # upon vehicle generation to check if there's sufficient space in the road to add a vehicle
         self._inbound_roads: Dict[int, Road] = inbound_roads
 
-    def _generate_vehicle(self) -> Vehicle:
-        """Returns a random vehicle from self.vehicles with random proportions"""
-        total = sum(weight for weight, path in self._paths)
-        r = randint(0, total)
-        for (weight, path) in self._paths:
-            r -= weight
-            if r <= 0:
-                return Vehicle(path)
+        # Arrivals are sampled batch_size at a time: the headway after the previous generation, and the path
+        if isinstance(arrival_process, str):
+            arrival_process = ARRIVAL_PROCESSES[arrival_process]
+        self._arrival_process: ArrivalProcess = arrival_process
+        self._batch_size: int = batch_size
+        weights = np.array([weight for weight, path in paths], dtype=float)
+        self._path_probabilities: np.ndarray = weights / weights.sum()
+        self._headways: List[float] = []
+        self._path_indexes: List[int] = []
+        self._next_arrival: int = 0
+        self._sample_arrivals()
+        self._headway: float = self._headways[0]  # Headway of the next arrival
+        self._pending_vehicle: Optional[Vehicle] = None  # Next arrival, built once it was due
+
+    def _sample_arrivals(self) -> None:
+        """Draws the headways and paths of the next batch of arrivals"""
+        self._headways = self._arrival_process(self._vehicle_rate, self._batch_size, self.rng).tolist()
+        self._path_indexes = self.rng.choice(len(self._paths), self._batch_size, p=self._path_probabilities).tolist()
+        self._next_arrival = 0
+
+    def reset(self) -> None:
+        """Restarts the generator from time 0, with newly sampled arrivals"""
+        self._prev_gen_time = 0
+        self._pending_vehicle = None
+        self._sample_arrivals()
+        self._headway = self._headways[0]
+
+    @property
+    def state(self) -> Tuple:
+        """The generator's dynamic state, including its sampled arrivals, see restore()"""
+        pending_vehicle = self._pending_vehicle.copy() if self._pending_vehicle else None
+        return (self._prev_gen_time, self._headways, self._path_indexes, self._next_arrival, self._headway,
+                pending_vehicle)
+
+    def restore(self, state: Tuple) -> None:
+        """Restores a state returned by the state property"""
+        (self._prev_gen_time, self._headways, self._path_indexes, self._next_arrival, self._headway,
+         pending_vehicle) = state
+        self._pending_vehicle = pending_vehicle.copy() if pending_vehicle else None
+
+    @property
+    def next_generation_time(self) -> float:
+        """Earliest simulation time at which the next vehicle can be generated"""
+        return self._prev_gen_time + self._headway
+
+    def is_due(self, curr_t: float, n_vehicles_generated: int) -> bool:
+        """Whether update() would try to generate a vehicle at curr_t"""
+        return not n_vehicles_generated or curr_t - self._prev_gen_time >= self._headway
 
     def update(self, curr_t: float, n_vehicles_generated: int) -> Optional[int]:
         """Generates a vehicle if the generation conditions are satisfied
         :return: road index if a vehicle was generated, else None
         """
         # If there's no vehicles on the map, or if the time elapsed after last
-        # generation is greater than the vehicle rate, generate a vehicle
-        time_elapsed = curr_t - self._prev_gen_time >= 60 / self._vehicle_rate
-        if not n_vehicles_generated or time_elapsed:
-            vehicle: Vehicle = self._generate_vehicle()
-            road: Road = self._inbound_roads[vehicle.path[0]]
-            # If the road is empty, or there's sufficient space for the generated vehicle, add it
-            if not road.vehicles or road.vehicles[-1].x > vehicle.s0 + vehicle.length:
-                vehicle.index = n_vehicles_generated
-                road.vehicles.append(vehicle)
-                self._prev_gen_time = curr_t
-                return road.index
+        # generation is greater than the next arrival headway, generate a vehicle
+        if n_vehicles_generated and curr_t - self._prev_gen_time < self._headway:
+            return None
+
+        if self._pending_vehicle is None:
+            path = self._paths[self._path_indexes[self._next_arrival]][1]
+            self._pending_vehicle = self._vehicle_class(path)
+        vehicle: Vehicle = self._pending_vehicle
+        road: Road = self._inbound_roads[vehicle.path[0]]
+        # If the road is empty, or there's sufficient space for the generated vehicle, add it.
+        # Otherwise, the vehicle waits for space at the road entrance
+        if not road.vehicles or road.vehicles[-1].x > vehicle.s0 + vehicle.length:
+            vehicle.index = n_vehicles_generated
+            vehicle.generation_time = curr_t
+            road.vehicles.append(vehicle)
+            self._prev_gen_time = curr_t
+            self._pending_vehicle = None
+            self._next_arrival += 1
+            if self._next_arrival == self._batch_size:
+                self._sample_arrivals()
+            self._headway = self._headways[self._next_arrival]
+            return road.index
         return None
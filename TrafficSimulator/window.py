@@ -1,7 +1,17 @@
+from typing import List, NamedTuple, Optional, Tuple
+
 import numpy as np
 import pygame
 from pygame.draw import polygon
 
+from TrafficSimulator.instrumentation import hot_path
+from TrafficSimulator.road import Road
+from TrafficSimulator.traffic_signal import TrafficSignal
+
+
+# Corners of a centered box, in units of its half length and half width, see Window._rotated_box()
+BOX_CORNERS = np.array([(-1, -1), (-1, 1), (1, 1), (1, -1)], dtype=float)
+VEHICLE_COLOR = (0, 0, 255)
 
 # # For debugging purposes
 # DRAW_VEHICLE_IDS = True
@@ -9,29 +19,73 @@ from pygame.draw import polygon
 # FILL_POLYGONS = True
 
 
+class Frame(NamedTuple):
+    """ An immutable snapshot of the simulation state drawn by the window, see Simulation.frame() """
+    t: float
+    max_gen: Optional[int]
+    n_vehicles_generated: int
+    n_vehicles_on_map: int
+    average_wait_time: float
+    vehicles: Tuple[Tuple[int, float, float, float], ...]  # (road index, position on the road, length, width)
+    signal_cycle_indexes: Tuple[int, ...]
+
+
 class Window:
-    def __init__(self, simulation):
+    def __init__(self, roads: List[Road], traffic_signals: List[TrafficSignal], headless: bool = False):
+        """
+        :param headless: draws onto an offscreen surface, see draw(), instead of opening a display
+        """
         self._width = 1000
         self._height = 630
 
         self.closed: bool = False
-        self._sim = simulation
+        self._headless: bool = headless
+        self._roads: List[Road] = roads
+        self._traffic_signals: List[TrafficSignal] = traffic_signals
 
         self._background_color = (235, 235, 235)
-        self._screen = pygame.display.set_mode((self._width, self._height))
-        pygame.display.set_caption('Dynamic Traffic Signal Control System')
-        pygame.display.flip()
+        if headless:
+            self._screen = pygame.Surface((self._width, self._height))
+        else:
+            self._screen = pygame.display.set_mode((self._width, self._height))
+            pygame.display.set_caption('Dynamic Traffic Signal Control System')
+            pygame.display.flip()
         pygame.font.init()
         font = f'Lucida Console'
         self._text_font = pygame.font.SysFont(font, 16)
         self._zoom = 5
         self._offset = (0, 0)
+        # The background and the roads, drawn once for the current zoom and offset
+        self._static_layer: Optional[pygame.Surface] = None
+        self._static_layer_view: Optional[Tuple] = None
+        # Roads' (start x, start y, cos, sin), to place the vehicles of a frame in one transform
+        self._road_geometry: np.ndarray = np.array(
+            [(road.start[0], road.start[1], road.angle_cos, road.angle_sin) for road in roads], dtype=float
+        ).reshape(-1, 4)
         self._mouse_last = (0, 0)
         self._mouse_down = False
 
-    def update(self) -> None:
-        self._draw()
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self._width, self._height
+
+    @hot_path('simulation.gui')
+    def update(self, simulation) -> None:
+        """ Draws the current state of the simulation """
+        self.show(simulation.frame())
+
+    def show(self, frame: Frame) -> None:
+        """ Draws a frame and handles the window events """
+        self._draw(frame)
         pygame.display.update()
+        self.handle_events()
+
+    def draw(self, frame: Frame) -> pygame.Surface:
+        """ Draws a frame without updating the display, and returns the drawn surface """
+        self._draw(frame)
+        return self._screen
+
+    def handle_events(self) -> None:
         for event in pygame.event.get():
             # Quit program if window is closed
             if event.type == pygame.QUIT:
@@ -124,7 +178,7 @@ class Window:
 
     def _draw_roads(self) -> None:
         # road_index_coordinates = [] # For debugging purposes
-        for road in self._sim.roads:
+        for road in self._roads:
             # Draw road background
             self._rotated_box(
                 road.start,
@@ -152,12 +206,25 @@ class Window:
         #         text_road_index = self._text_font.render(f'{cords[0]}', True, (0, 0, 0))
         #         self._screen.blit(text_road_index, (cords[1] - 5, cords[2] - 5))
 
-    def _draw_vehicle(self, vehicle, road) -> None:
-        l, h = vehicle.length, vehicle.width
-        sin, cos = road.angle_sin, road.angle_cos
-        x = road.start[0] + cos * vehicle.x
-        y = road.start[1] + sin * vehicle.x
-        self._rotated_box((x, y), (l, h), cos=cos, sin=sin, centered=True)
+    def _vehicle_polygons(self, frame: Frame) -> np.ndarray:
+        """
+        Computes the screen coordinates of every vehicle's corners at once
+        :return: an integer array of shape (number of vehicles, 4 corners, 2)
+        """
+        vehicles = np.array(frame.vehicles, dtype=float).reshape(-1, 4)
+        road_indexes, positions, l, h = vehicles.T
+        start_x, start_y, cos, sin = self._road_geometry[road_indexes.astype(int)].T
+        x = start_x + cos * positions
+        y = start_y + sin * positions
+
+        # Same vertices as _rotated_box(centered=True), for every vehicle and corner
+        e1, e2 = BOX_CORNERS[:, 0], BOX_CORNERS[:, 1]
+        l, h, cos, sin = l[:, None], h[:, None], cos[:, None], sin[:, None]
+        corners_x = x[:, None] + (e1 * l * cos + e2 * h * sin) / 2
+        corners_y = y[:, None] + (e1 * l * sin - e2 * h * cos) / 2
+        screen_x = self._width / 2 + (corners_x + self._offset[0]) * self._zoom
+        screen_y = self._height / 2 + (corners_y + self._offset[1]) * self._zoom
+        return np.stack((screen_x, screen_y), axis=-1).astype(int)
 
         # # For debugging purposes
         # screen_x, screen_y = self._rotated_box((x, y), (l, h), cos=cos, sin=sin, centered=True)
@@ -166,22 +233,21 @@ class Window:
         #                                              (0, 0, 0))
         #     self._screen.blit(text_road_index, (screen_x - 5, screen_y - 5))
 
-    def _draw_vehicles(self) -> None:
-        for i in self._sim.non_empty_roads:
-            road = self._sim.roads[i]
-            for vehicle in road.vehicles:
-                self._draw_vehicle(vehicle, road)
+    def _draw_vehicles(self, frame: Frame) -> None:
+        for points in self._vehicle_polygons(frame).tolist():
+            polygon(self._screen, VEHICLE_COLOR, points)
 
-    def _draw_signals(self) -> None:
-        for signal in self._sim.traffic_signals:
+    def _draw_signals(self, frame: Frame) -> None:
+        for signal, cycle_index in zip(self._traffic_signals, frame.signal_cycle_indexes):
+            current_cycle = signal.cycle[cycle_index]
             for i in range(len(signal.roads)):
                 red, green = (255, 0, 0), (0, 255, 0)
-                if signal.current_cycle == (False, False):
+                if current_cycle == (False, False):
                     # Temp state, yellow color
                     yellow = (255, 255, 0)
-                    color = yellow if signal.cycle[signal.current_cycle_index - 1][i] else red
+                    color = yellow if signal.cycle[cycle_index - 1][i] else red
                 else:
-                    color = green if signal.current_cycle[i] else red
+                    color = green if current_cycle[i] else red
                 for road in signal.roads[i]:
                     a = 0
                     position = ((1 - a) * road.end[0] + a * road.start[0],
@@ -189,25 +255,38 @@ class Window:
                     self._rotated_box(position, (1, 3),
                                       cos=road.angle_cos, sin=road.angle_sin, color=color)
 
-    def _draw_status(self):
+    def _draw_status(self, frame: Frame):
         def render(text, color=(0, 0, 0), background=self._background_color):
             return self._text_font.render(text, True, color, background)
 
-        t = render(f'Time: {self._sim.t:.1f}')
-        if self._sim.max_gen:
-            n_max_gen = render(f'Max Gen: {self._sim.max_gen}')
+        t = render(f'Time: {frame.t:.1f}')
+        if frame.max_gen:
+            n_max_gen = render(f'Max Gen: {frame.max_gen}')
             self._screen.blit(n_max_gen, (10, 50))
-        n_vehicles_generated = render(f'Vehicles Generated: {self._sim.n_vehicles_generated}')
-        n_vehicles_on_map = render(f'Vehicles On Map: {self._sim.n_vehicles_on_map}')
-        average_wait_time = render(f'Current Wait Time: {self._sim.current_average_wait_time:.1f}')
+        n_vehicles_generated = render(f'Vehicles Generated: {frame.n_vehicles_generated}')
+        n_vehicles_on_map = render(f'Vehicles On Map: {frame.n_vehicles_on_map}')
+        average_wait_time = render(f'Current Wait Time: {frame.average_wait_time:.1f}')
         self._screen.blit(t, (10, 20))
         self._screen.blit(n_vehicles_generated, (10, 70))
         self._screen.blit(n_vehicles_on_map, (10, 90))
         self._screen.blit(average_wait_time, (10, 120))
 
-    def _draw(self):
-        self._screen.fill(self._background_color)
-        self._draw_roads()
-        self._draw_vehicles()
-        self._draw_signals()
-        self._draw_status()
+    def _draw_static_layer(self) -> None:
+        """ Draws the background and the roads, from the cache unless the zoom or the offset changed """
+        view = (self._zoom, self._offset)
+        if self._static_layer_view != view:
+            screen = self._screen
+            self._static_layer = self._screen = pygame.Surface((self._width, self._height))
+            if not self._headless:
+                self._static_layer = self._screen = self._screen.convert()
+            self._screen.fill(self._background_color)
+            self._draw_roads()
+            self._screen = screen
+            self._static_layer_view = view
+        self._screen.blit(self._static_layer, (0, 0))
+
+    def _draw(self, frame: Frame):
+        self._draw_static_layer()
+        self._draw_vehicles(frame)
+        self._draw_signals(frame)
+        self._draw_status(frame)
@@ -1,15 +1,227 @@
-from argparse import ArgumentParser
+import asyncio
+import os
+import sys
+from argparse import ArgumentParser, ArgumentTypeError
 
 from Reinf_Learn import launch_q_learning_simulation
+from Reinf_Learn.utils import check_training_options
+from TrafficSimulator import instrumentation
+
+
+def run_bench(args) -> None:
+    """Runs the benchmark suite, saves its results and compares them against the baseline, if exists"""
+    from Benchmarks import run_benchmarks, save_results, load_results, compare_results, print_results
+
+    results = run_benchmarks(args.only, args.quick)
+    save_results(args.output, results)
+    comparisons = []
+    if args.baseline and os.path.exists(args.baseline):
+        comparisons = compare_results(load_results(args.baseline), results, args.threshold)
+    print_results(results, comparisons)
+    print(f"Results saved to {args.output}")
+    if args.baseline and not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, the results were not compared. "
+              f"Copy {args.output} to {args.baseline} to compare the next runs against them")
+    if any(regressed for *_, regressed in comparisons):
+        sys.exit(f"Regression of more than {args.threshold:.0%} against {args.baseline}")
+
+
+def run_serve(args) -> None:
+    """Serves the actions of a model's greedy policy until interrupted"""
+    from Reinf_Learn.serving import serve, load_served_policy
+
+    policy = load_served_policy(args.model)
+    try:
+        asyncio.run(serve(policy, args.host, args.port, args.unix, args.max_batch_size, args.report_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+def run_sweep(args) -> None:
+    """Trains one model per hyperparameter configuration of the search space, and saves the results table"""
+    from Reinf_Learn.sweep import parse_parameter, sweep_configs, run_sweep
+
+    try:
+        space = dict(parse_parameter(parameter) for parameter in args.param)
+        configs = sweep_configs(space, args.random, args.seed)
+    except ValueError as error:
+        sys.exit(f"Invalid search space: {error}")
+    print(f"Sweeping {len(configs)} configurations with {args.workers} workers")
+    results = run_sweep(configs, args.episodes, args.workers, args.output, args.seed,
+                        early_stopping=not args.no_early_stopping, grace_episodes=args.grace,
+                        checkpoint_interval=args.checkpoint_interval, dense=args.dense, max_dt=args.max_dt)
+    print(results.head(args.top).to_string(index=False))
+    print(f"Results saved to {args.output}")
+
+
+def grid_size(value: str):
+    """Parses a NxM grid size"""
+    try:
+        n_rows, n_cols = map(int, value.lower().split('x'))
+    except ValueError:
+        raise ArgumentTypeError(f"invalid grid size {value!r}, expected NxM, e.g. 3x4")
+    if n_rows < 1 or n_cols < 1 or n_rows * n_cols < 2:
+        raise ArgumentTypeError(f"invalid grid size {value!r}, a grid needs several junctions")
+    return n_rows, n_cols
+
 
 if __name__ == '__main__':
     parser = ArgumentParser(description="Dynamic Traffic Signal Control System")
+    subparsers = parser.add_subparsers(dest='command')
+
+    bench_parser = subparsers.add_parser("bench", help="Measures the simulator and learner throughput")
+    bench_parser.add_argument(
+        "--output",
+        metavar='PATH',
+        default="bench_results.json",
+        help="JSON file the results are saved to"
+    )
+    bench_parser.add_argument(
+        "--baseline",
+        metavar='PATH',
+        default="bench_baseline.json",
+        help="JSON results of a previous run to compare against"
+    )
+    bench_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative slowdown against the baseline reported as a regression"
+    )
+    bench_parser.add_argument(
+        "--only",
+        nargs='+',
+        choices=['simulation', 'environment', 'grid', 'training', 'q_learning', 'model_io'],
+        help="Benchmark groups to run, all of them by default"
+    )
+    bench_parser.add_argument(
+        "--quick",
+        action='store_true',
+        help="Shorter measurements, for smoke testing"
+    )
+
+    serve_parser = subparsers.add_parser("serve", help="Serves a model's actions over a local socket")
+    serve_parser.add_argument(
+        "model",
+        nargs='?',
+        default="model_10000.qtb",
+        help="Model file (.qtb, legacy .dat) or frozen policy (.npz, see --export-policy)"
+    )
+    serve_parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Address to listen on"
+    )
+    serve_parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="TCP port to listen on"
+    )
+    serve_parser.add_argument(
+        "--unix",
+        metavar='PATH',
+        help="Listens on a Unix socket instead of a TCP port"
+    )
+    serve_parser.add_argument(
+        "--max-batch-size",
+        metavar='N',
+        type=int,
+        default=1024,
+        help="Largest number of concurrent requests decided together"
+    )
+    serve_parser.add_argument(
+        "--report-interval",
+        metavar='SECONDS',
+        type=float,
+        default=10,
+        help="Interval between the decision count and latency (p50, p99) reports"
+    )
+
+    sweep_parser = subparsers.add_parser("sweep", help="Searches the training hyperparameters in parallel")
+    sweep_parser.add_argument(
+        "--param",
+        metavar='NAME=VALUES',
+        action='append',
+        default=[],
+        help="Values of a hyperparameter (alpha, gamma, epsilon, epsilon_min, epsilon_decay) to search: a "
+             "list, e.g. alpha=0.05,0.1,0.2, or with --random a range sampled uniformly, e.g. gamma=0.3:0.9"
+    )
+    sweep_parser.add_argument(
+        "--random",
+        metavar='N',
+        type=int,
+        help="Random search of N configurations instead of a grid search of every combination"
+    )
+    sweep_parser.add_argument(
+        "--episodes",
+        metavar='N',
+        type=int,
+        default=1000,
+        help="Number of training episodes of each configuration"
+    )
+    sweep_parser.add_argument(
+        "--workers",
+        metavar='K',
+        type=int,
+        default=os.cpu_count(),
+        help="Number of configurations trained in parallel (default: number of CPUs)"
+    )
+    sweep_parser.add_argument(
+        "--output",
+        metavar='PATH',
+        default="sweep_results.csv",
+        help="CSV file the results table is saved to"
+    )
+    sweep_parser.add_argument(
+        "--grace",
+        metavar='N',
+        type=int,
+        default=300,
+        help="Number of episodes every configuration is trained for before it can be stopped early"
+    )
+    sweep_parser.add_argument(
+        "--checkpoint-interval",
+        metavar='N',
+        type=int,
+        default=100,
+        help="Number of episodes between the early stopping checks"
+    )
+    sweep_parser.add_argument(
+        "--no-early-stopping",
+        action='store_true',
+        help="Trains every configuration for all the episodes"
+    )
+    sweep_parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the random search and of the training runs"
+    )
+    sweep_parser.add_argument(
+        "--top",
+        metavar='N',
+        type=int,
+        default=10,
+        help="Number of best configurations printed"
+    )
+    sweep_parser.add_argument(
+        "--dense",
+        action='store_true',
+        help="Stores the Q-tables in dense arrays instead of dicts"
+    )
+    sweep_parser.add_argument(
+        "--max-dt",
+        metavar='SECONDS',
+        type=float,
+        default=None,
+        help="Headless adaptive time-stepping: largest simulation time step while traffic is free-flowing"
+    )
 
     parser.add_argument(
         "-e", "--episodes",
         metavar='N',
         type=int,
-        required=True,
         help="Number of evaluation episodes to run"
     )
 
@@ -18,12 +230,164 @@ if __name__ == '__main__':
         action='store_true',
         help="Displays the simulation window"
     )
+    parser.add_argument(
+        "--render-fps",
+        metavar='FPS',
+        type=float,
+        help="With --render, draws in a separate process at most FPS frames per second, skipping the updates "
+             "in between, instead of drawing every update"
+    )
+    parser.add_argument(
+        "--record",
+        metavar='DIR',
+        help="Records the evaluation episodes offscreen, without a display, as images in DIR"
+    )
+    parser.add_argument(
+        "--every",
+        metavar='N',
+        type=int,
+        default=10,
+        help="With --record, number of simulation updates between recorded frames (default: 10)"
+    )
+    parser.add_argument(
+        "--record-format",
+        choices=['png', 'raw'],
+        default='png',
+        help="With --record, a PNG image sequence or a raw RGB24 frame stream (default: png)"
+    )
     parser.add_argument(
         "-t", "--train-only", 
         action='store_true',  
         dest='run_evaluation',  
 )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Seed of the training and evaluation runs, which are then reproducible, fresh entropy by default"
+    )
+    parser.add_argument(
+        "--eval-workers",
+        metavar='K',
+        type=int,
+        default=1,
+        help="Spreads the headless evaluation episodes over K processes, reporting bootstrap confidence intervals"
+    )
+    parser.add_argument(
+        "--eval-seed",
+        type=int,
+        default=0,
+        help="With --eval-workers, seed of the evaluation episodes"
+    )
+    parser.add_argument(
+        "--training-episodes",
+        metavar='N',
+        type=int,
+        default=10000,
+        help="Number of training episodes, e.g. the best of a sweep, which also names the model file"
+    )
+    parser.add_argument(
+        "--envs",
+        metavar='N',
+        type=int,
+        default=1,
+        help="Number of training environments stepped in lockstep"
+    )
+    parser.add_argument(
+        "--workers",
+        metavar='K',
+        type=int,
+        default=1,
+        help="Number of actor processes running training episodes"
+    )
+    parser.add_argument(
+        "--max-dt",
+        metavar='SECONDS',
+        type=float,
+        default=None,
+        help="Headless adaptive time-stepping: largest simulation time step while traffic is free-flowing"
+    )
+    parser.add_argument(
+        "--profile",
+        action='store_true',
+        help="Times the simulation and learning hot paths, and prints a summary"
+    )
+    parser.add_argument(
+        "--trace",
+        metavar='PATH',
+        help="Like --profile, also saving every timed call as a Chrome trace (chrome://tracing, Perfetto)"
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar='DIR',
+        help="Streams the episode and vehicle trip records to columnar files in DIR"
+    )
+    parser.add_argument(
+        "--dense",
+        action='store_true',
+        help="Stores the Q-table in a dense array instead of a dict"
+    )
+    parser.add_argument(
+        "--replay",
+        metavar='CAPACITY',
+        type=int,
+        default=0,
+        help="Trains on minibatches replayed from a buffer of the last CAPACITY transitions"
+    )
+    parser.add_argument(
+        "--prioritized",
+        action='store_true',
+        help="With --replay, replays the transitions with the largest TD errors more often"
+    )
+    parser.add_argument(
+        "--export-policy",
+        metavar='PATH',
+        help="Saves the evaluated model compiled into a frozen greedy policy, loadable without the learner"
+    )
+    parser.add_argument(
+        "--grid",
+        metavar='NxM',
+        type=grid_size,
+        help="Controls an N×M grid of intersections, with one Q-learner per traffic signal"
+    )
+    parser.add_argument(
+        "--shared-table",
+        action='store_true',
+        help="With --grid, the signal agents share a single Q-table"
+    )
 
     args = parser.parse_args()
 
-    launch_q_learning_simulation(num_episodes=args.episodes, render=args.render, mode=args.run_evaluation)
+    if args.command == "bench":
+        run_bench(args)
+        sys.exit()
+    if args.command == "serve":
+        run_serve(args)
+        sys.exit()
+    if args.command == "sweep":
+        run_sweep(args)
+        sys.exit()
+    if args.episodes is None:
+        parser.error("the following arguments are required: -e/--episodes")
+    try:
+        check_training_options(args.envs, args.workers, args.dense, args.grid, args.replay)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.profile or args.trace:
+        instrumentation.enable(trace=bool(args.trace))
+    try:
+        launch_q_learning_simulation(num_episodes=args.episodes, render=args.render, mode=args.run_evaluation,
+                                     n_envs=args.envs, n_workers=args.workers, dense=args.dense,
+                                     max_dt=args.max_dt, metrics_dir=args.metrics, render_fps=args.render_fps,
+                                     record_dir=args.record, record_every=args.every,
+                                     record_format=args.record_format, grid=args.grid,
+                                     shared_table=args.shared_table, replay_capacity=args.replay,
+                                     prioritized=args.prioritized, policy_path=args.export_policy,
+                                     training_cycles=args.training_episodes, eval_workers=args.eval_workers,
+                                     eval_seed=args.eval_seed, seed=args.seed)
+    finally:
+        if instrumentation.is_enabled():
+            print(instrumentation.summary())
+            if args.trace:
+                instrumentation.export_chrome_trace(args.trace)
+                print(f"Trace saved to {args.trace}")